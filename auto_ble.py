@@ -1,5 +1,7 @@
 from enum import IntEnum
-from typing import Callable, Mapping, Set, Tuple
+from functools import lru_cache
+from itertools import permutations
+from typing import Callable, Mapping, NamedTuple, Optional, Sequence, Set, Tuple
 
 
 from data_model import (
@@ -10,46 +12,128 @@ from data_model import (
     LUT_IN_C,
     LUT_IN_D,
 )
-from build_lut import LUT4, Expr, pick
+from build_lut import LUT4, LUT_MASK, Expr, VAR_TT
 
 Four_LUT = Tuple[bool, bool, bool, bool]
 FourLUT_Bit_Fn = Callable[[bool, bool, bool, bool], bool]
 
 
+@lru_cache(maxsize=None)
+def _expand_rows(order: tuple, merged: tuple) -> Tuple[int, ...]:
+    """Row of a table over *order* read by each row of a table over
+    *merged*."""
+    pos = {sig: i for i, sig in enumerate(merged)}
+    idx = [pos[sig] for sig in order]
+    return tuple(
+        sum((row >> i & 1) << j for j, i in enumerate(idx))
+        for row in range(1 << len(merged))
+    )
+
+
+def _expand(stt: int, order: tuple, merged: tuple) -> int:
+    """Truth table *stt* over the signals *order* as a table over *merged*
+    (a superset, variable ``i`` is ``merged[i]``). Signals are given by
+    value: ``LUT_IN`` overloads ``==``."""
+    if order == merged:
+        return stt
+    out = 0
+    for row, src in enumerate(_expand_rows(order, merged)):
+        out |= (stt >> src & 1) << row
+    return out
+
+
+def _xnor(x: int, y: int) -> int:
+    return ~(x ^ y)
+
+
+@lru_cache(maxsize=4096)
+def _combine(
+    op: Callable[[int, int], int],
+    x_order: tuple,
+    x_stt: int,
+    y_order: tuple,
+    y_stt: int,
+) -> Tuple[tuple, int]:
+    """``op`` of two signal tables, a constant has an empty order and the
+    table 0 or 1."""
+    order = tuple(sorted(set(x_order) | set(y_order)))
+    rows = (1 << (1 << len(order))) - 1
+    x = _expand(x_stt, x_order, order)
+    y = _expand(y_stt, y_order, order) if y_order else rows * y_stt
+    return order, op(x, y) & rows
+
+
 class _SigExpr(Expr):
-    __slots__ = ("signals",)
+    """Expression of ``LUT_IN`` signals.
+
+    ``tt`` is the table over the ports the signals natively sit on, which
+    is only exact when no two signals share a port. ``sig_tt`` is the table
+    over the signals themselves (variable ``i`` is the signal of value
+    ``sig_order[i]``), or ``None`` when the expression was mixed with a
+    non-constant plain ``Expr``.
+    """
 
-    def __init__(self, fn: Callable[[Four_LUT], bool], signals: Set["LUT_IN"]) -> None:
-        super().__init__(fn)
+    __slots__ = ("signals", "sig_order", "sig_tt")
+
+    def __init__(
+        self,
+        tt: int,
+        signals: Set["LUT_IN"],
+        sig_order: Tuple[int, ...] = (),
+        sig_tt: Optional[int] = None,
+    ) -> None:
+        super().__init__(tt)
         self.signals: Set["LUT_IN"] = signals
+        self.sig_order = sig_order
+        self.sig_tt = sig_tt
 
-    def _lift(self, other: "Expr", op) -> "_SigExpr":
+    def _lift(self, other: "Expr", op: Callable[[int, int], int]) -> "_SigExpr":
         coerced_other = LUT_IN._coerce(other)
 
-        other_signals = coerced_other.signals if isinstance(coerced_other, _SigExpr) else set()
+        if isinstance(coerced_other, _SigExpr):
+            other_signals = coerced_other.signals
+            other_order, other_stt = coerced_other.sig_order, coerced_other.sig_tt
+        else:
+            other_signals = set()
+            # only constants mean the same over signals as over ports
+            other_order = ()
+            other_stt = {0: 0, LUT_MASK: 1}.get(coerced_other.tt & LUT_MASK)
+
+        if self.sig_tt is not None and other_stt is not None:
+            order, sig_tt = _combine(
+                op, self.sig_order, self.sig_tt, other_order, other_stt
+            )
+        else:
+            order = tuple(sorted(set(self.sig_order) | set(other_order)))
+            sig_tt = None
 
         return _SigExpr(
-            lambda v, l=self, r=coerced_other, p=op: p(l(v), r(v)),
+            op(self.tt, coerced_other.tt),
             self.signals | other_signals,
+            order,
+            sig_tt,
         )
 
     def __and__(self, o):
-        return self._lift(o, bool.__and__)
+        return self._lift(o, int.__and__)
 
     def __or__(self, o):
-        return self._lift(o, bool.__or__)
+        return self._lift(o, int.__or__)
 
     def __xor__(self, o):
-        return self._lift(o, bool.__xor__)
+        return self._lift(o, int.__xor__)
 
     def __invert__(self):
-        return _SigExpr(lambda v, s=self: not s(v), set(self.signals))
+        sig_tt = self.sig_tt
+        if sig_tt is not None:
+            sig_tt ^= (1 << (1 << len(self.sig_order))) - 1
+        return _SigExpr(~self.tt, set(self.signals), self.sig_order, sig_tt)
 
     def __eq__(self, o):
-        return self._lift(o, lambda x, y: x == y)  # XNOR
+        return self._lift(o, _xnor)
 
     def __ne__(self, o):
-        return self._lift(o, lambda x, y: x != y)  # XOR
+        return self._lift(o, int.__xor__)  # XOR
 
     def __bool__(self) -> bool:
         raise TypeError("Expr objects are symbolic; use &, |, ~, ^, ==, !=")
@@ -170,7 +254,7 @@ class LUT_IN(IntEnum):
 
     def _expr(self):
         idx = "ABCD".index(self._port)
-        return _SigExpr(pick(idx), {self})
+        return _SigExpr(VAR_TT[idx], {self}, (self.value,), 0b10)
 
     @staticmethod
     def _coerce(x):
@@ -206,6 +290,63 @@ class LUT_IN(IntEnum):
         raise TypeError("Expr objects are symbolic; use &, |, ~, ^, ==, !=")
 
 
+@lru_cache(maxsize=None)
+def _permute_rows(ports: Tuple[Tuple[int, int], ...]) -> Tuple[int, ...]:
+    return tuple(sum((row >> p & 1) << v for v, p in ports) for row in range(16))
+
+
+_BY_VALUE: dict[int, LUT_IN] = dict(LUT_IN._value2member_map_)
+
+
+def _permute(tt: int, ports: Mapping[int, int]) -> int:
+    """LUT init computing *tt* with its variable ``v`` on port ``ports[v]``
+    (variables not in *ports* read 0)."""
+    out = 0
+    for row, src in enumerate(_permute_rows(tuple(ports.items()))):
+        out |= (tt >> src & 1) << row
+    return out
+
+
+def _signal_ports() -> dict[str, int]:
+    ports: dict[str, int] = {}
+    for port, enum_cls in enumerate((LUT_IN_A, LUT_IN_B, LUT_IN_C, LUT_IN_D)):
+        for member in enum_cls:
+            ports[member.name] = ports.get(member.name, 0) | 1 << port
+    return ports
+
+
+# Signal name -> bit mask of the LUT ports (A = bit 0) that can select it
+SIGNAL_PORTS: dict[str, int] = _signal_ports()
+
+
+class PortAssignment(NamedTuple):
+    ports: Tuple[int, ...]  # port (0-3 = A-D) of each signal, in the order given
+    # the signal cannot be selected on its port and has to be passed through
+    # a BLE of that port's group (BLE 8 * port ... 8 * port + 7)
+    routed: Tuple[bool, ...]
+
+
+@lru_cache(maxsize=None)
+def _assign(values: Tuple[int, ...]) -> PortAssignment:
+    reach = [SIGNAL_PORTS[LUT_IN(v)._enum_member.name] for v in values]
+    best = None
+    for ports in permutations(range(4), len(reach)):
+        routed = tuple(not mask >> p & 1 for mask, p in zip(reach, ports))
+        if best is None or sum(routed) < sum(best.routed):
+            best = PortAssignment(ports, routed)
+            if not any(routed):
+                break
+    return best
+
+
+def assign_ports(signals: Sequence[LUT_IN]) -> PortAssignment:
+    """Give each of up to four distinct signals its own LUT port, with as
+    few route-through BLEs as possible."""
+    if len(signals) > 4:
+        raise ValueError("A 4‑input LUT can drive only four distinct signals.")
+    return _assign(tuple(sig.value for sig in signals))
+
+
 def AutoBLE(expr: LUT_IN | _SigExpr, flopsel: bool | FLOPSEL | None = None) -> BLE_CFG:
 
     # normalise FLOPSEL
@@ -225,25 +366,42 @@ def AutoBLE(expr: LUT_IN | _SigExpr, flopsel: bool | FLOPSEL | None = None) -> B
     if not isinstance(expr, _SigExpr):
         raise TypeError("AutoBLE() expects a LUT_IN or a boolean expression thereof.")
 
-    used = expr.signals
-    if len(used) > 4:
+    if len(expr.signals) > 4:
         raise ValueError("A 4‑input LUT can drive only four distinct signals.")
 
-    # ensure each port is used at most once
-    port_map: Mapping[str, LUT_IN] = {}
-    for sig in used:
-        if sig._port in port_map:  # noinspection PyProtectedMember
-            raise ValueError(
-                f"Port {sig._port} used twice ({port_map[sig._port].name} & {sig.name})."  # noinspection PyProtectedMember
-            )
-        port_map[sig._port] = sig  # noinspection PyProtectedMember
+    if expr.sig_tt is None:
+        # mixed with a plain Expr: only the table over the native ports is
+        # known, so each signal has to stay on its port
+        order = sorted(expr.signals)
+        ports = {i: "ABCD".index(sig._port) for i, sig in enumerate(order)}
+        routed = [False] * len(order)
+        for i, sig in enumerate(order):
+            clash = [o for j, o in enumerate(order[:i]) if ports[j] == ports[i]]
+            if clash:
+                raise ValueError(
+                    f"Port {sig._port} used twice ({clash[0].name} & {sig.name})."
+                )
+        tt = LUT4(expr).tt
+    else:
+        order = [_BY_VALUE[v] for v in expr.sig_order]
+        assignment = _assign(expr.sig_order)
+        ports = dict(enumerate(assignment.ports))
+        routed = assignment.routed
+        tt = _permute(expr.sig_tt, ports)
+    if any(routed):
+        names = " & ".join(sig.name for sig in order)
+        raise ValueError(
+            f"{names} cannot all reach a port of one BLE; clb_place.place() "
+            "inserts the route-through BLEs this needs."
+        )
 
     # build keyword arguments for BLE_CFG
     cfg_kwargs = {
-        "LUT_CONFIG": LUT4(expr).bitstream(),
+        "LUT_CONFIG": f"{tt:016b}",
         "FLOPSEL": flopsel_val,
     }
-    for port_letter, sig in port_map.items():
+    for i, sig in enumerate(order):
+        port_letter = "ABCD"[ports[i]]
         cfg_kwargs[f"LUT_I_{port_letter}"] = sig._enum_member  # noinspection PyProtectedMember
 
     return BLE_CFG(**cfg_kwargs)
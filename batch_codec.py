@@ -0,0 +1,238 @@
+"""Vectorised decoding and encoding of many bitstreams at once.
+
+All designs of a batch are held as one ``uint16[N, 102]`` word array (file
+order, as in the ``*.result.json`` files) and every field of the layout in
+``data_model`` is gathered (or scattered) for all N designs with a single
+NumPy indexing operation per field group.
+"""
+
+from pathlib import Path
+from typing import Iterable, Iterator, Sequence
+
+import numpy as np
+
+from bitstream import (
+    BITSTREAM_WORDS,
+    Bitstream,
+    _asm_text,
+    _int_to_words,
+    _json_text,
+    _words_to_int,
+)
+from data_model import (
+    BITSTREAM_LAYOUT,
+    BitField,
+    LUT_CONFIG_FIELDS,
+    FLOPSEL_FIELDS,
+    LUT_INPUT_FIELDS,
+    MUX_CLBIN_FIELDS,
+    MUX_INSYNC_FIELDS,
+    PPS_OUT_FIELDS,
+    IRQ_OUT_FIELDS,
+    CNT_STOP_FIELD,
+    CNT_RESET_FIELD,
+    COUNT_MUX_FIELDS,
+    CLKDIV_FIELD,
+)
+
+# One record per design, column names follow the Bitstream attributes.
+# ``lut_inputs[..., p]`` is LUT_I_A..LUT_I_D, ``count_mux`` follows
+# ``COUNT_MUX_FIELDS`` (COUNT_IS_A1 ... COUNT_IS_D2).
+DESIGN_DTYPE = np.dtype(
+    [
+        ("lut_config", np.uint16, (32,)),
+        ("flopsel", np.bool_, (32,)),
+        ("lut_inputs", np.uint8, (32, 4)),
+        ("mux_clbin", np.uint8, (16,)),
+        ("mux_insync", np.uint8, (16,)),
+        ("pps_out", np.uint8, (8,)),
+        ("irq_out", np.uint8, (4,)),
+        ("cnt_stop", np.uint8),
+        ("cnt_reset", np.uint8),
+        ("count_mux", np.uint8, (8,)),
+        ("clkdiv", np.uint8),
+    ]
+)
+
+
+def _word_runs(f: BitField) -> list[tuple[int, int, int]]:
+    """``BitField.runs`` split so that no run crosses a 16 bit word."""
+    runs = []
+    for src, run_mask, dst in f.runs:
+        width = run_mask.bit_length()
+        while width:
+            n = min(width, 16 - src % 16)
+            runs.append((src, (1 << n) - 1, dst))
+            src, dst, width = src + n, dst + n, width - n
+    return runs
+
+
+class _FieldGroup:
+    """A set of equally wide fields stored in one ``DESIGN_DTYPE`` column.
+
+    Each field is broken into runs of consecutive bits inside one word, so a
+    run is read or written for all N designs with a single shift-and-mask on
+    a contiguous row of the ``[102, N]`` (bit order) word array.
+    """
+
+    def __init__(self, column: str, fields: Sequence[BitField], shape: tuple) -> None:
+        self.column = column
+        self.shape = shape
+        self.count = len(fields)
+        self.width = fields[0].width
+        # (field, word row in bit order, bit shift in word, run mask, value shift)
+        self.runs = [
+            (i, src // 16, src % 16, run_mask, dst)
+            for i, f in enumerate(fields)
+            for src, run_mask, dst in _word_runs(f)
+        ]
+
+    def decode(self, words_t: np.ndarray) -> np.ndarray:
+        """Gather the column from ``[102, N]`` words (bit order)."""
+        values = np.zeros((self.count, words_t.shape[1]), dtype=np.uint16)
+        for i, row, shift, run_mask, dst in self.runs:
+            values[i] |= ((words_t[row] >> shift) & run_mask) << dst
+        return values.T.reshape((words_t.shape[1], *self.shape))
+
+    def encode(self, words_t: np.ndarray, values: np.ndarray) -> None:
+        """OR the column into ``[102, N]`` words (bit order, fields cleared)."""
+        values = np.asarray(values, dtype=np.uint16).reshape(words_t.shape[1], -1)
+        if (values >> self.width).any():
+            raise ValueError(f"{self.column} value does not fit into {self.width} bits")
+        values = np.ascontiguousarray(values.T)
+        for i, row, shift, run_mask, dst in self.runs:
+            words_t[row] |= ((values[i] >> dst) & run_mask) << shift
+
+
+_FIELD_GROUPS = (
+    _FieldGroup("lut_config", LUT_CONFIG_FIELDS, (32,)),
+    _FieldGroup("flopsel", FLOPSEL_FIELDS, (32,)),
+    _FieldGroup(
+        "lut_inputs", [f for fields in LUT_INPUT_FIELDS for f in fields], (32, 4)
+    ),
+    _FieldGroup("mux_clbin", MUX_CLBIN_FIELDS, (16,)),
+    _FieldGroup("mux_insync", MUX_INSYNC_FIELDS, (16,)),
+    _FieldGroup("pps_out", PPS_OUT_FIELDS, (8,)),
+    _FieldGroup("irq_out", IRQ_OUT_FIELDS, (4,)),
+    _FieldGroup("cnt_stop", [CNT_STOP_FIELD], ()),
+    _FieldGroup("cnt_reset", [CNT_RESET_FIELD], ()),
+    _FieldGroup("count_mux", list(COUNT_MUX_FIELDS.values()), (8,)),
+    _FieldGroup("clkdiv", [CLKDIV_FIELD], ()),
+)
+
+
+class DecodedBatch:
+    """Decoded fields of N designs plus their raw words (file order).
+
+    ``fields`` is a structured array of ``DESIGN_DTYPE``.  Values are raw field
+    values and are not checked against the enums; that only happens when a
+    design is materialised as a :class:`Bitstream`.
+    """
+
+    def __init__(self, words: np.ndarray, fields: np.ndarray) -> None:
+        self.words = words
+        self.fields = fields
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def __getitem__(self, column: str) -> np.ndarray:
+        return self.fields[column]
+
+    def bitstream(self, i: int) -> Bitstream:
+        """Materialise design *i* as a :class:`Bitstream`."""
+        return Bitstream._from_bits(_words_to_int(self.words[i].tolist()))
+
+    def bitstreams(self) -> Iterator[Bitstream]:
+        """Lazily materialise every design."""
+        return (self.bitstream(i) for i in range(len(self)))
+
+
+def _as_words(words: np.ndarray | Sequence[Sequence[int]]) -> np.ndarray:
+    words = np.asarray(words, dtype=np.uint16)
+    if words.ndim != 2 or words.shape[1] != BITSTREAM_WORDS:
+        raise ValueError(
+            f"expected a [N, {BITSTREAM_WORDS}] word array, got {words.shape}"
+        )
+    return words
+
+
+def decode_batch(words: np.ndarray | Sequence[Sequence[int]]) -> DecodedBatch:
+    """Decode every field of N designs given as a ``[N, 102]`` word array."""
+    words = _as_words(words)
+    words_t = np.ascontiguousarray(words[:, ::-1].T)
+    fields = np.empty(len(words), dtype=DESIGN_DTYPE)
+    for group in _FIELD_GROUPS:
+        fields[group.column] = group.decode(words_t)
+    return DecodedBatch(words, fields)
+
+
+# Bits of each word (bit order) that do not belong to any field.
+_KEEP_MASK = np.array(
+    [
+        ~(sum(f.mask for f in BITSTREAM_LAYOUT.values()) >> (16 * k)) & 0xFFFF
+        for k in range(BITSTREAM_WORDS)
+    ],
+    dtype=np.uint16,
+)
+
+
+def encode_batch(
+    fields: np.ndarray, base_words: np.ndarray | None = None
+) -> np.ndarray:
+    """Encode a ``DESIGN_DTYPE`` structured array into ``[N, 102]`` words.
+
+    Bits that are not part of any field are taken from *base_words* (zero
+    when not given), the same way ``Bitstream._update_bitstream`` only
+    overwrites the fields of an existing image.
+    """
+    fields = np.asarray(fields)
+    if fields.dtype != DESIGN_DTYPE:
+        fields = fields.astype(DESIGN_DTYPE)
+    fields = fields.reshape(-1)
+    if base_words is not None:
+        base_words = _as_words(base_words)
+        if len(base_words) != len(fields):
+            raise ValueError(
+                f"{len(base_words)} base designs given for {len(fields)} designs"
+            )
+
+    # work on [102, N] in bit order so each run updates one contiguous row
+    if base_words is None:
+        words_t = np.zeros((BITSTREAM_WORDS, len(fields)), dtype=np.uint16)
+    else:
+        words_t = base_words[:, ::-1].T & _KEEP_MASK[:, np.newaxis]
+    for group in _FIELD_GROUPS:
+        group.encode(words_t, fields[group.column])
+    return np.ascontiguousarray(words_t[::-1].T)
+
+
+def write_json(words: np.ndarray, json_files: Iterable[Path]) -> None:
+    """Write each row of *words* as a ``{"bitstream": [...]}`` JSON file."""
+    words = _as_words(words)
+    for row, json_file in zip(words.tolist(), json_files, strict=True):
+        Path(json_file).write_text(_json_text(row), encoding="utf8")
+
+
+def write_s(
+    words: np.ndarray,
+    out_files: Iterable[Path],
+    *,
+    device_macros: list[str] | None = None,
+    psect: str = "clb_config",
+) -> None:
+    """Write each row of *words* as an assembler file, see ``save_bitstream_s``."""
+    words = _as_words(words)
+    for row, out_file in zip(words.tolist(), out_files, strict=True):
+        Path(out_file).write_text(
+            _asm_text(row, device_macros=device_macros, psect=psect),
+            encoding="utf8",
+        )
+
+
+def load_words(json_files: Iterable[Path]) -> np.ndarray:
+    """Read ``*.result.json`` bitstreams into a ``[N, 102]`` word array."""
+    rows = [
+        _int_to_words(Bitstream._load_bitstream_from_json(Path(f))) for f in json_files
+    ]
+    return np.array(rows, dtype=np.uint16).reshape(-1, BITSTREAM_WORDS)
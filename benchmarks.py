@@ -0,0 +1,313 @@
+"""Benchmarks of the hot paths: codec, FASM parsing, LUT building, graphs.
+
+The designs are a fixed synthetic corpus drawn (derandomized, so every run
+sees the same designs) from the ``bitstreams()`` strategy of
+``design_fixtures``. Each benchmark reports operations per second (best of
+``--repeat`` runs) and the peak memory traced while running it once.
+
+    python benchmarks.py [-k NAME] [--save BASELINE.json] [--compare BASELINE.json]
+
+``--compare`` prints the change against a saved baseline and exits with 1
+when a benchmark got slower by more than ``--tolerance``.
+"""
+
+import argparse
+import copy
+import json
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+from pathlib import Path
+from typing import Callable, NamedTuple, Optional
+
+from hypothesis import HealthCheck, Phase, given, settings
+
+from auto_ble import AutoBLE, LUT_IN
+from batch_codec import decode_batch
+from bitstream import Bitstream
+from build_lut import LUT4, a, b, c, d
+from clb_graph import generate_dot_from_config
+from clb_place import Cell, place
+from data_model import BLEXY, FASM
+from design_archive import Archive, write_archive
+from design_fixtures import bitstreams
+
+# name -> setup(corpus) returning (run, operations per run)
+_BENCHMARKS: dict[str, Callable[[list[Bitstream]], tuple[Callable[[], None], int]]] = {}
+
+
+def benchmark(name: str):
+    def register(setup):
+        _BENCHMARKS[name] = setup
+        return setup
+
+    return register
+
+
+class Result(NamedTuple):
+    ops_per_sec: float
+    peak_kib: float
+
+
+def make_corpus(size: int) -> list[Bitstream]:
+    """*size* designs, the same ones on every call."""
+    corpus: list[Bitstream] = []
+
+    @settings(
+        max_examples=size,
+        derandomize=True,
+        database=None,
+        phases=[Phase.generate],
+        suppress_health_check=list(HealthCheck),
+        deadline=None,
+    )
+    @given(bs=bitstreams())
+    def collect(bs: Bitstream) -> None:
+        if len(corpus) < size:
+            bs._update_bitstream()
+            corpus.append(bs)
+
+    collect()
+    return corpus
+
+
+@benchmark("bitstream.parse")
+def _parse(corpus):
+    def run():
+        for bs in corpus:
+            bs._parse_bitstream()
+
+    return run, len(corpus)
+
+
+@benchmark("bitstream.update_full")
+def _update_full(corpus):
+    def run():
+        for bs in corpus:
+            bs._forget_sync()
+            bs._update_bitstream()
+
+    return run, len(corpus)
+
+
+@benchmark("bitstream.update_one_lut")
+def _update_one_lut(corpus):
+    ble = BLEXY.BLE_7_X4Y3
+
+    def run():
+        for bs in corpus:
+            bs.LUTS[ble].LUT_CONFIG = bs.LUTS[ble].LUT_CONFIG
+            bs._update_bitstream()
+
+    return run, len(corpus)
+
+
+@benchmark("bitstream.load_json")
+def _load_json(corpus):
+    tmp = tempfile.TemporaryDirectory()  # removed with the closure
+    paths = []
+    for i, bs in enumerate(corpus):
+        paths.append(Path(tmp.name) / f"{i}.json")
+        bs.save_bitstream(paths[-1])
+
+    def run():
+        assert tmp
+        for path in paths:
+            Bitstream(path)
+
+    return run, len(paths)
+
+
+@benchmark("archive.view_one_lut")
+def _archive_view(corpus):
+    tmp = tempfile.TemporaryDirectory()
+    path = Path(tmp.name) / "corpus.clba"
+    write_archive(path, corpus)
+    ble = BLEXY.BLE_5_X2Y3
+
+    def run():
+        assert tmp
+        with Archive(path) as archive:
+            for i in range(len(archive)):
+                archive.view(i).LUTS[ble].LUT_CONFIG
+
+    return run, len(corpus)
+
+
+@benchmark("batch.decode")
+def _batch_decode(corpus):
+    words = [bs._words() for bs in corpus]
+    return (lambda: decode_batch(words)), len(words)
+
+
+@benchmark("fasm.parse")
+def _fasm_parse(corpus):
+    texts = [bs.to_fasm().splitlines() for bs in corpus]
+
+    def run():
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            for lines in texts:
+                FASM(lines)
+
+    return run, len(texts)
+
+
+@benchmark("lut4.expr")
+def _lut4_expr(corpus):
+    def run():
+        for _ in range(1000):
+            LUT4((a ^ b) & c | ~d).bitstream()
+
+    return run, 1000
+
+
+@benchmark("lut4.callable")
+def _lut4_callable(corpus):
+    def run():
+        for _ in range(1000):
+            LUT4(lambda a, b, c, d: (a and b) or (c != d)).bitstream()
+
+    return run, 1000
+
+
+@benchmark("auto_ble")
+def _auto_ble(corpus):
+    def run():
+        for _ in range(1000):
+            AutoBLE(
+                LUT_IN.CLB_BLE_5 ^ LUT_IN.IN4 | LUT_IN.CLB_BLE_16 & ~LUT_IN.IN12,
+                True,
+            )
+
+    return run, 1000
+
+
+@benchmark("place.32_cells")
+def _place(corpus):
+    # a 4 bit counter slice per group plus a compare tree, every BLE used
+    cells = {}
+    for i in range(28):
+        prev = f"c{i - 1}" if i else "c27"
+        cells[f"c{i}"] = Cell(a ^ b, f"c{i}", prev, flopsel=True)
+    for i in range(4):
+        cells[f"m{i}"] = Cell(
+            a & b & c, *(f"c{4 * i + k}" for k in range(3)), flopsel=True
+        )
+
+    def run():
+        for _ in range(100):
+            place(cells)
+
+    return run, 100
+
+
+@benchmark("graph.dot")
+def _graph_dot(corpus):
+    def run():
+        for bs in corpus:
+            # a copy is not in the netlist cache, measure the uncached path
+            generate_dot_from_config(copy.copy(bs))
+
+    return run, len(corpus)
+
+
+def run_benchmarks(
+    corpus: list[Bitstream],
+    *,
+    names: Optional[list[str]] = None,
+    repeat: int = 5,
+    min_time: float = 0.2,
+) -> dict[str, Result]:
+    """Time the benchmarks called *names* (all by default)."""
+    results = {}
+    for name, setup in _BENCHMARKS.items():
+        if names is not None and name not in names:
+            continue
+        run, ops = setup(corpus)
+        run()  # warm up caches and imports
+
+        loops = 1
+        while True:
+            start = time.perf_counter()
+            for _ in range(loops):
+                run()
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_time or loops >= 1 << 16:
+                break
+            loops *= 2
+        best = elapsed
+        for _ in range(repeat - 1):
+            start = time.perf_counter()
+            for _ in range(loops):
+                run()
+            best = min(best, time.perf_counter() - start)
+
+        tracemalloc.start()
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results[name] = Result(ops * loops / best, peak / 1024)
+    return results
+
+
+def compare(
+    results: dict[str, Result], baseline: dict[str, Result], tolerance: float
+) -> list[str]:
+    """Names of the benchmarks more than *tolerance* (0.1 = 10 %) slower
+    than *baseline*."""
+    return [
+        name
+        for name, r in results.items()
+        if name in baseline
+        and r.ops_per_sec < baseline[name].ops_per_sec * (1 - tolerance)
+    ]
+
+
+def _load_baseline(path: Path) -> dict[str, Result]:
+    data = json.loads(path.read_text(encoding="utf8"))
+    return {name: Result(**r) for name, r in data["results"].items()}
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-k", dest="names", action="append", help="only NAME")
+    parser.add_argument("--corpus", type=int, default=200, help="designs")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--save", type=Path, help="write results as a baseline")
+    parser.add_argument("--compare", type=Path, help="baseline to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    args = parser.parse_args(argv)
+
+    baseline = _load_baseline(args.compare) if args.compare else {}
+    results = run_benchmarks(
+        make_corpus(args.corpus), names=args.names, repeat=args.repeat
+    )
+    for name, r in results.items():
+        line = f"{name:28} {r.ops_per_sec:14,.0f} ops/s {r.peak_kib:10,.0f} KiB"
+        if name in baseline:
+            line += f" {r.ops_per_sec / baseline[name].ops_per_sec - 1:+8.1%}"
+        print(line)
+
+    if args.save:
+        args.save.write_text(
+            json.dumps(
+                {
+                    "corpus": args.corpus,
+                    "python": sys.version.split()[0],
+                    "results": {n: r._asdict() for n, r in results.items()},
+                },
+                indent=2,
+            ),
+            encoding="utf8",
+        )
+    slower = compare(results, baseline, args.tolerance)
+    if slower:
+        print(f"slower than baseline: {', '.join(slower)}")
+    return 1 if slower else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
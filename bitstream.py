@@ -1,7 +1,9 @@
 import json
+import struct
+import weakref
 from collections import defaultdict
 from pathlib import Path
-from typing import Callable, Dict, Optional, Type, Union
+from typing import Dict, Iterator, NamedTuple, Optional, Sequence, Type, Union
 
 from data_model import (
     FASM,
@@ -32,17 +34,19 @@ from data_model import (
     FLOPSEL,
     CNTMUX,
     CLKDIV,
-    get_lut_setting_bits,
-    get_lut_input_bit_addresses,
-    get_flopsel,
-    PPS_OUT_BITS,
-    COUNT_MUX_CFG_bits,
-    CLKDIV_bits,
-    COUNT_STOP_bits,
-    COUNT_RESET_bits,
-    IRQ_bits,
-    MUX_CFG_bits,
     IRQ_OUT_NUM,
+    PPS_OUT_NUM,
+    LUT_CONFIG_FIELDS,
+    FLOPSEL_FIELDS,
+    LUT_INPUT_FIELDS,
+    MUX_CLBIN_FIELDS,
+    MUX_INSYNC_FIELDS,
+    PPS_OUT_FIELDS,
+    IRQ_OUT_FIELDS,
+    CNT_STOP_FIELD,
+    CNT_RESET_FIELD,
+    COUNT_MUX_FIELDS,
+    CLKDIV_FIELD,
     CLBPPSOUT3,
     CLBPPSOUT0,
     CLBPPSOUT1,
@@ -52,35 +56,198 @@ from data_model import (
     CLBPPSOUT6,
     CLBPPSOUT7,
     _CLB_ENUM,
+    BitField,
+    edit_stamp,
 )
 
-BITSTREAM_LENGTH = 102 * 16  # 102 16 bit (actually 14 bit) words
+BITSTREAM_WORDS = 102
+BITSTREAM_LENGTH = BITSTREAM_WORDS * 16  # 102 16 bit (actually 14 bit) words
 
+_WORDS_STRUCT = struct.Struct(f">{BITSTREAM_WORDS}H")
 
-def _bits_to_int(get_bit: Callable[[int], str], bit_map: dict[int, int]) -> int:
-    """Return an integer whose binary value is found in *bit_map* (LSB first)."""
-    return int("".join(get_bit(bit_map[i]) for i in reversed(sorted(bit_map))), 2)
 
+def _words_to_int(words: Sequence[int]) -> int:
+    """Pack words (file order) into an int whose bit ``i`` is bitstream bit ``i``."""
+    return int.from_bytes(_WORDS_STRUCT.pack(*words), "big")
 
-def _int_to_bits(
-    set_bit: Callable[[int, int | str], None],
-    value: int,
-    bit_map: dict[int, int],
+
+def _int_to_words(bits: int) -> tuple[int, ...]:
+    """Inverse of :func:`_words_to_int`."""
+    return _WORDS_STRUCT.unpack(bits.to_bytes(_WORDS_STRUCT.size, "big"))
+
+
+def _json_text(words: Sequence[int]) -> str:
+    """``json.dumps({"bitstream": [...]}, indent=2)`` of the hex words, without
+    going through the JSON encoder."""
+    body = '",\n    "'.join(f"{w:04x}" for w in words)
+    return f'{{\n  "bitstream": [\n    "{body}"\n  ]\n}}'
+
+
+def _changed_words(diff: int) -> list[int]:
+    """Indices (file order) of the words holding a set bit of *diff*."""
+    return [i for i, w in enumerate(_int_to_words(diff)) if w]
+
+
+class WordChange(NamedTuple):
+    """One word of a partial reprogramming patch."""
+
+    index: int  # file order, same as the JSON / assembler output
+    old: int
+    new: int
+
+
+def diff_words(old: Sequence[int], new: Sequence[int]) -> list[WordChange]:
+    """The words that have to be rewritten to turn *old* into *new*."""
+    return [WordChange(i, a, b) for i, (a, b) in enumerate(zip(old, new)) if a != b]
+
+
+def _patch_json_text(changes: Sequence[WordChange]) -> str:
+    return json.dumps(
+        {
+            "patch": [
+                {"word": c.index, "old": f"{c.old:04x}", "new": f"{c.new:04x}"}
+                for c in changes
+            ]
+        },
+        indent=2,
+    )
+
+
+def load_patch(json_file: Path) -> list[WordChange]:
+    """Read a patch written by :meth:`Bitstream.save_patch`."""
+    data = json.loads(json_file.read_text(encoding="utf8"))
+    changes = [
+        WordChange(int(c["word"]), int(c["old"], 16), int(c["new"], 16))
+        for c in data["patch"]
+    ]
+    if any(not 0 <= c.index < BITSTREAM_WORDS for c in changes):
+        raise ValueError(f"patch word index outside 0..{BITSTREAM_WORDS - 1}")
+    return changes
+
+
+class _Sync(NamedTuple):
+    """What a ``Bitstream`` image was last encoded from (see ``_SYNC``)."""
+
+    stamp: int  # edit_stamp() taken right after encoding
+    objects: dict  # slot -> the BLE_CFG/MUX_CFG/... object encoded into it
+    clkdiv: Optional[CLKDIV]
+    saved_bits: int  # image as last loaded or saved
+
+
+# Kept outside the instances so it never shows up in vars() or __str__.
+_SYNC: "weakref.WeakKeyDictionary[Bitstream, _Sync]" = weakref.WeakKeyDictionary()
+
+_BLE_FIELDS = ("LUT_CONFIG", "FLOPSEL", "LUT_I_A", "LUT_I_B", "LUT_I_C", "LUT_I_D")
+_MUX_FIELDS = ("CLBIN", "INSYNC")
+_COUNTER_FIELDS = ("CNT_STOP", "CNT_RESET", *COUNT_MUX_FIELDS)
+
+
+class _EnumTable(dict):
+    """``table[v]`` is ``enum_cls(v)`` through a dict hit; invalid values
+    still raise the enum's ``ValueError``."""
+
+    def __init__(self, enum_cls) -> None:
+        super().__init__(enum_cls._value2member_map_)
+        self.enum_cls = enum_cls
+
+    def __missing__(self, value):
+        return self.enum_cls(value)
+
+
+_FLOPSEL = _EnumTable(FLOPSEL)  # keyed by the bools, so 0/1 work too
+_LUT_IN = tuple(map(_EnumTable, (LUT_IN_A, LUT_IN_B, LUT_IN_C, LUT_IN_D)))
+_CLBIN = _EnumTable(CLBIN)
+_INSYNC = _EnumTable(CLBInputSync)
+_COUNTERIN = _EnumTable(COUNTERIN)
+_CNTMUX = _EnumTable(CNTMUX)
+
+
+DEFAULT_DEVICE_MACROS = [
+    "_16F13113",
+    "_16F13114",
+    "_16F13115",
+    "_16F13123",
+    "_16F13124",
+    "_16F13125",
+    "_16F13143",
+    "_16F13144",
+    "_16F13145",
+]
+
+
+def _device_guard(device_macros: list[str] | None) -> str:
+    guard = " || ".join(f"defined({m})" for m in device_macros or DEFAULT_DEVICE_MACROS)
+    return f"""\
+#if !({guard})
+    #error This module is only suitable for PIC16F13145 family devices
+#endif
+
+"""
+
+
+def _asm_patch_text(
+    changes: Sequence[WordChange],
+    *,
+    device_macros: list[str] | None = None,
+    psect: str = "clb_patch",
+) -> str:
+    """Assembler (``.s``) table of *changes*: the number of changed words,
+    then ``word index, new value`` pairs, the index counted from the start
+    of the CLB configuration."""
+    tpl = _device_guard(device_macros) + f"""\
+    psect {psect},global,class=STRCODE,delta=2,noexec,split=0,merge=0,keep
+
+global _start_{psect}
+
+psect   {psect}
+
+_start_{psect}:
+    dw  0x{len(changes):04X};
+"""
+    return tpl + "\n".join(f"    dw  0x{c.index:04X}, 0x{c.new:04X};" for c in changes)
+
+
+def _asm_text(
+    words: Sequence[int],
     *,
-    num_bits: Optional[int] = None,
-) -> None:
-    """Write *value* into *bit_map* (LSB first)."""
-    num_bits = num_bits or len(bit_map)
-    bits = f"{value:0{num_bits}b}"[::-1]
-    if len(bits) > len(bit_map):
-        raise ValueError(f"{value} does not fit into {len(bit_map)} bits")
-    for i, b in enumerate(bits):
-        set_bit(bit_map[i], b)
+    device_macros: list[str] | None = None,
+    psect: str = "clb_config",
+) -> str:
+    """Assembler (``.s``) source placing *words* in *psect*."""
+    tpl = _device_guard(device_macros) + f"""\
+#ifdef CLB_CONFIG_ADDR
+    psect {psect},global,class=STRCODE,abs,ovrld,delta=2,noexec,split=0,merge=0,keep
+#else
+    psect {psect},global,class=STRCODE,delta=2,noexec,split=0,merge=0,keep
+#endif
+
+global _start_{psect}
+
+psect   {psect}
+#ifdef CLB_CONFIG_ADDR
+    ORG CLB_CONFIG_ADDR
+#endif
+
+_start_{psect}:
+"""
+    return tpl + "\n".join(f"    dw  0x{w:04X};" for w in words)
 
 
 class Bitstream(FASM):
     # noinspection PyMissingConstructor
     def __init__(self, bitstream_json_file: Optional[Path] = None) -> None:
+        self._init_attrs()
+
+        # bit ``i`` of the image is bit ``i`` of this int
+        self._bits: int = (
+            self._load_bitstream_from_json(bitstream_json_file)
+            if bitstream_json_file
+            else 0
+        )
+
+        self._parse_bitstream()
+
+    def _init_attrs(self) -> None:
         self.LUTS: Dict[BLEXY, BLE_CFG] = defaultdict(BLE_CFG)
         self.PPS_OUT: Dict[
             Type,
@@ -106,176 +273,264 @@ class Bitstream(FASM):
         self.CCP1_IN = self.CCP2_IN = self.ADC_IN = None
         self.OE: Dict[int, OESELn] = {}
 
-        self._bitstream: str = (
-            self._load_bitstream_from_json(bitstream_json_file)
-            if bitstream_json_file
-            else "0" * BITSTREAM_LENGTH
-        )
+    @property
+    def _bitstream(self) -> str:
+        """Bit-string view of the image, index ``i`` is bit ``i``."""
+        return f"{self._bits:0{BITSTREAM_LENGTH}b}"[::-1]
 
-        self._parse_bitstream()
+    @_bitstream.setter
+    def _bitstream(self, bs: str) -> None:
+        if len(bs) != BITSTREAM_LENGTH or set(bs) - {"0", "1"}:
+            raise ValueError(f"expected a {BITSTREAM_LENGTH} character bit string")
+        self._bits = int(bs[::-1], 2)
+        self._forget_sync()
 
     @staticmethod
-    def _load_bitstream_from_json(json_file: Path) -> str:
+    def _load_bitstream_from_json(json_file: Path) -> int:
         if not json_file.exists():
             raise FileNotFoundError(json_file)
+        return Bitstream._bits_from_json_str(
+            json_file.read_text(encoding="utf8"), json_file
+        )
+
+    @staticmethod
+    def _bits_from_json_str(text: str, source: object = "JSON string") -> int:
         try:
-            data = json.loads(json_file.read_text(encoding="utf8"))
+            data = json.loads(text)
         except json.JSONDecodeError as exc:
-            raise ValueError(f"invalid JSON in {json_file}: {exc}") from exc
+            raise ValueError(f"invalid JSON in {source}: {exc}") from exc
 
         words = data["bitstream"] if isinstance(data, dict) else data
         if not isinstance(words, list) or not all(isinstance(w, str) for w in words):
             raise TypeError("'bitstream' must be a list[str] of hexadecimal words")
+        return Bitstream._bits_from_words([int(w, 16) for w in words])
 
-        bs = "".join(f"{int(w, 16):016b}" for w in words)[::-1]
-        if len(bs) != BITSTREAM_LENGTH:
+    @staticmethod
+    def _bits_from_words(vals: Sequence[int]) -> int:
+        if len(vals) != BITSTREAM_WORDS or any(v < 0 or v >> 16 for v in vals):
             raise ValueError(
-                f"bitstream length is {len(bs)}, expected {BITSTREAM_LENGTH}"
+                f"bitstream length is {sum(max(16, v.bit_length()) for v in vals)}, "
+                f"expected {BITSTREAM_LENGTH}"
             )
+        return _words_to_int(vals)
+
+    @classmethod
+    def _from_bits(cls, bits: int) -> "Bitstream":
+        bs = cls.__new__(cls)
+        bs._init_attrs()
+        bs._bits = bits
+        bs._parse_bitstream()
         return bs
 
+    @classmethod
+    def from_words(cls, words: Sequence[int]) -> "Bitstream":
+        """Decode a design from its 102 16 bit words (file order)."""
+        return cls._from_bits(cls._bits_from_words([int(w) for w in words]))
+
+    @classmethod
+    def from_json_str(cls, text: str) -> "Bitstream":
+        """Decode a design from the contents of a ``.json`` bitstream file."""
+        return cls._from_bits(cls._bits_from_json_str(text))
+
+    def to_words(self) -> tuple[int, ...]:
+        """The encoded design as 16 bit words (file order)."""
+        self._update_bitstream()
+        return self._words()
+
+    def to_json_str(self) -> str:
+        """What :meth:`save_bitstream` writes, as a string."""
+        return _json_text(self.to_words())
+
+    def _words(self) -> tuple[int, ...]:
+        """The image as 16 bit words, in file order."""
+        return _int_to_words(self._bits)
+
     def _save_bitstream_to_json(self, json_file: Path) -> None:
-        words = [
-            f"{int(self._bitstream[::-1][i: i + 16], 2):04x}"
-            for i in range(0, BITSTREAM_LENGTH, 16)
-        ]
-        json_file.write_text(
-            json.dumps({"bitstream": words}, indent=2), encoding="utf8"
-        )
+        json_file.write_text(_json_text(self._words()), encoding="utf8")
 
     def _get_bit(self, idx: int) -> str:
         if idx >= BITSTREAM_LENGTH or idx < 0:
             raise IndexError(idx)
-        return self._bitstream[idx]
+        return "01"[(self._bits >> idx) & 1]
 
     def _set_bit(self, idx: int, val: int | str) -> None:
         if idx >= BITSTREAM_LENGTH or idx < 0:
             raise IndexError(idx)
-        v = str(int(val))
-        if v not in "01":
+        v = int(val)
+        if v not in (0, 1):
             raise ValueError("bit must be 0/1")
-        self._bitstream = f"{self._bitstream[:idx]}{v}{self._bitstream[idx + 1:]}"
+        if v:
+            self._bits |= 1 << idx
+        else:
+            self._bits &= ~(1 << idx)
+        self._forget_sync()
 
     def _parse_bitstream(self) -> None:
         self._parse_luts()
         self._parse_pps()
         self._parse_irq()
         self._parse_mux()
-        self.CLKDIV = CLKDIV(_bits_to_int(self._get_bit, CLKDIV_bits))
+        self.CLKDIV = CLKDIV(CLKDIV_FIELD.extract(self._bits))
         self._parse_counter()
+        self._mark_synced(saved=True)
+
+    # The parsers write straight into the instance dicts, skipping the edit
+    # stamps of _Tracked: _parse_bitstream marks the whole image as synced.
 
     def _parse_luts(self) -> None:
+        bits = self._bits
+        luts = self.LUTS
+        lut_a, lut_b, lut_c, lut_d = _LUT_IN
         for ble_idx in BLEXY:
-            cfg = self.LUTS[ble_idx]
+            cfg = luts.get(ble_idx)
+            if cfg is None:
+                cfg = luts[ble_idx] = BLE_CFG.__new__(BLE_CFG)
             idx = ble_idx.value
-            bits_map = get_lut_setting_bits(idx)
-            cfg.LUT_CONFIG = "".join(
-                self._get_bit(bits_map[i]) for i in reversed(range(16))
+            in_a, in_b, in_c, in_d = LUT_INPUT_FIELDS[idx]
+            vars(cfg).update(
+                LUT_CONFIG=f"{LUT_CONFIG_FIELDS[idx].extract(bits):016b}",
+                FLOPSEL=_FLOPSEL[FLOPSEL_FIELDS[idx].extract(bits)],
+                LUT_I_A=lut_a[in_a.extract(bits)],
+                LUT_I_B=lut_b[in_b.extract(bits)],
+                LUT_I_C=lut_c[in_c.extract(bits)],
+                LUT_I_D=lut_d[in_d.extract(bits)],
             )
-            # FLOPSEL
-            cfg.FLOPSEL = FLOPSEL(self._get_bit(get_flopsel(idx)) == "1")
-            in_maps = get_lut_input_bit_addresses(idx)
-            cfg.LUT_I_A = LUT_IN_A(_bits_to_int(self._get_bit, in_maps["LUT_I_A"]))
-            cfg.LUT_I_B = LUT_IN_B(_bits_to_int(self._get_bit, in_maps["LUT_I_B"]))
-            cfg.LUT_I_C = LUT_IN_C(_bits_to_int(self._get_bit, in_maps["LUT_I_C"]))
-            cfg.LUT_I_D = LUT_IN_D(_bits_to_int(self._get_bit, in_maps["LUT_I_D"]))
 
     def _parse_pps(self) -> None:
-        for pps_cls, bit_map in PPS_OUT_BITS.items():
-            raw_val: int = _bits_to_int(self._get_bit, bit_map) & 0b11  # 0-3
+        for idx, pps_cls in PPS_OUT_NUM.items():
+            raw_val: int = PPS_OUT_FIELDS[idx].extract(self._bits)  # 0-3
             inst = pps_cls()
-            enum_cls = _CLB_ENUM[inst.idx]
-            inst.OUT = enum_cls(raw_val)
+            inst.OUT = _CLB_ENUM[idx](raw_val)
             self.PPS_OUT[pps_cls] = inst
 
     def _parse_irq(self) -> None:
-        for idx, bit_map in IRQ_bits.items():
-            val = _bits_to_int(self._get_bit, bit_map)
-            irq_cls = IRQ_OUT_NUM[idx]
+        for idx, irq_cls in IRQ_OUT_NUM.items():
+            val = IRQ_OUT_FIELDS[idx].extract(self._bits)
             inst = irq_cls()
             inst.OUT = irq_cls.__annotations__["OUT"](val)
             self.IRQ_OUT[idx] = inst
 
     def _parse_mux(self) -> None:
-        for idx, maps in MUX_CFG_bits.items():
-            cfg = self.MUXS[idx]
-            cfg.CLBIN = CLBIN(_bits_to_int(self._get_bit, maps["CLBIN"]))
-            cfg.INSYNC = CLBInputSync(_bits_to_int(self._get_bit, maps["INSYNC"]))
+        bits = self._bits
+        muxs = self.MUXS
+        for idx in range(len(MUX_CLBIN_FIELDS)):
+            cfg = muxs.get(idx)
+            if cfg is None:
+                cfg = muxs[idx] = MUX_CFG.__new__(MUX_CFG)
+            vars(cfg).update(
+                INSYNC=_INSYNC[MUX_INSYNC_FIELDS[idx].extract(bits)],
+                CLBIN=_CLBIN[MUX_CLBIN_FIELDS[idx].extract(bits)],
+            )
 
     def _parse_counter(self) -> None:
-        c = self.COUNTER
-        c.CNT_STOP = COUNTERIN(_bits_to_int(self._get_bit, COUNT_STOP_bits))
-        c.CNT_RESET = COUNTERIN(_bits_to_int(self._get_bit, COUNT_RESET_bits))
-        for name, m in COUNT_MUX_CFG_bits.items():
-            setattr(c, name, CNTMUX(_bits_to_int(self._get_bit, m)))
+        bits = self._bits
+        values = vars(self.COUNTER)
+        values["CNT_STOP"] = _COUNTERIN[CNT_STOP_FIELD.extract(bits)]
+        values["CNT_RESET"] = _COUNTERIN[CNT_RESET_FIELD.extract(bits)]
+        for name, f in COUNT_MUX_FIELDS.items():
+            values[name] = _CNTMUX[f.extract(bits)]
+
+    def _mark_synced(self, *, saved: bool = False) -> None:
+        """Record that the image now holds every field of the current objects."""
+        objects: dict = dict(self.LUTS)
+        objects.update((("MUX", idx), mux) for idx, mux in self.MUXS.items())
+        objects.update((("PPS", inst.idx), inst) for inst in self.PPS_OUT.values())
+        objects.update((("IRQ", idx), inst) for idx, inst in self.IRQ_OUT.items())
+        objects["COUNTER"] = self.COUNTER
+        prev = _SYNC.get(self)
+        saved_bits = self._bits if saved or prev is None else prev.saved_bits
+        _SYNC[self] = _Sync(edit_stamp(), objects, self.CLKDIV, saved_bits)
+
+    def _forget_sync(self) -> None:
+        """The image was changed behind the objects' back, re-encode them all."""
+        sync = _SYNC.get(self)
+        if sync is not None:
+            _SYNC[self] = sync._replace(objects={}, clkdiv=None)
+
+    def _pending_fields(self) -> Iterator[tuple[BitField, int]]:
+        """``(field, value)`` of every field assigned since the image was last
+        encoded. Objects that were not the ones encoded (new or replaced
+        entries) count as entirely changed."""
+        sync = _SYNC.get(self)
+        since, objects = (0, {}) if sync is None else (sync.stamp, sync.objects)
+
+        def changed(slot, obj, every: tuple[str, ...]):
+            if objects.get(slot) is not obj:
+                return every
+            # objects filled in by the parser carry no stamps at all
+            return obj.touched_since(since) if "_touched" in vars(obj) else ()
 
-    def _update_bitstream(self) -> None:
-        self._update_luts()
-        self._update_pps()
-        self._update_irq()
-        self._update_mux()
-        _int_to_bits(self._set_bit, self.CLKDIV.value, CLKDIV_bits)
-        self._update_counter()
-
-    def _update_luts(self) -> None:
         for ble_idx, cfg in self.LUTS.items():
+            names = changed(ble_idx, cfg, _BLE_FIELDS)
+            if not names:
+                continue
             idx = ble_idx.value
-            # LUT_CONFIG
-            _int_to_bits(
-                self._set_bit,
-                int(cfg.LUT_CONFIG, 2),
-                get_lut_setting_bits(idx),
-                num_bits=16,
-            )
-            # FLOPSEL
-            self._set_bit(get_flopsel(idx), int(cfg.FLOPSEL == FLOPSEL.ENABLE.value))
-            # inputs
-            maps = get_lut_input_bit_addresses(idx)
-            _int_to_bits(
-                self._set_bit,
-                (0 if cfg.LUT_I_A is None else cfg.LUT_I_A.value),
-                maps["LUT_I_A"],
-            )
-            _int_to_bits(
-                self._set_bit,
-                (0 if cfg.LUT_I_B is None else cfg.LUT_I_B.value),
-                maps["LUT_I_B"],
-            )
-            _int_to_bits(
-                self._set_bit,
-                (0 if cfg.LUT_I_C is None else cfg.LUT_I_C.value),
-                maps["LUT_I_C"],
-            )
-            _int_to_bits(
-                self._set_bit,
-                (0 if cfg.LUT_I_D is None else cfg.LUT_I_D.value),
-                maps["LUT_I_D"],
-            )
-
-    def _update_pps(self) -> None:
-        for cls_, inst in self.PPS_OUT.items():
-            _int_to_bits(self._set_bit, inst.OUT.value, PPS_OUT_BITS[cls_])
+            if "LUT_CONFIG" in names:
+                yield LUT_CONFIG_FIELDS[idx], int(cfg.LUT_CONFIG, 2)
+            if "FLOPSEL" in names:
+                # either the enum or its bool value
+                yield FLOPSEL_FIELDS[idx], int(
+                    cfg.FLOPSEL in (FLOPSEL.ENABLE, FLOPSEL.ENABLE.value)
+                )
+            for name, f in zip(_BLE_FIELDS[2:], LUT_INPUT_FIELDS[idx]):
+                if name in names:
+                    sel = getattr(cfg, name)
+                    yield f, 0 if sel is None else sel.value
+
+        for inst in self.PPS_OUT.values():
+            if "_out" in changed(("PPS", inst.idx), inst, ("_out",)):
+                yield PPS_OUT_FIELDS[inst.idx], inst.OUT.value
 
-    def _update_irq(self) -> None:
         for idx, inst in self.IRQ_OUT.items():
-            _int_to_bits(self._set_bit, inst.OUT.value, IRQ_bits[idx])
+            if "OUT" in changed(("IRQ", idx), inst, ("OUT",)):
+                yield IRQ_OUT_FIELDS[idx], inst.OUT.value
 
-    def _update_mux(self) -> None:
         for idx, cfg in self.MUXS.items():
-            maps = MUX_CFG_bits[idx]
-            _int_to_bits(self._set_bit, cfg.CLBIN.value, maps["CLBIN"])  # type: ignore
-            _int_to_bits(self._set_bit, cfg.INSYNC.value, maps["INSYNC"])  # type: ignore
+            names = changed(("MUX", idx), cfg, _MUX_FIELDS)
+            if "CLBIN" in names:
+                yield MUX_CLBIN_FIELDS[idx], cfg.CLBIN.value  # type: ignore
+            if "INSYNC" in names:
+                yield MUX_INSYNC_FIELDS[idx], cfg.INSYNC.value  # type: ignore
+
+        if sync is None or self.CLKDIV != sync.clkdiv:
+            yield CLKDIV_FIELD, self.CLKDIV.value
 
-    def _update_counter(self) -> None:
         c = self.COUNTER
-        _int_to_bits(self._set_bit, c.CNT_STOP.value, COUNT_STOP_bits)
-        _int_to_bits(self._set_bit, c.CNT_RESET.value, COUNT_RESET_bits)
-        for name, m in COUNT_MUX_CFG_bits.items():
-            _int_to_bits(self._set_bit, getattr(c, name).value, m)
+        names = changed("COUNTER", c, _COUNTER_FIELDS)
+        if "CNT_STOP" in names:
+            yield CNT_STOP_FIELD, c.CNT_STOP.value
+        if "CNT_RESET" in names:
+            yield CNT_RESET_FIELD, c.CNT_RESET.value
+        for name, f in COUNT_MUX_FIELDS.items():
+            if name in names:
+                yield f, getattr(c, name).value
+
+    def _update_bitstream(self) -> None:
+        """Encode the fields edited since the last encode into the image."""
+        bits = self._bits
+        for f, value in self._pending_fields():
+            bits = f.insert(bits, value)
+        self._bits = bits
+        self._mark_synced()
+
+    def dirty_fields(self) -> list[str]:
+        """Layout names (``BLE3.LUT_CONFIG``, ``MUX0.CLBIN`` ...) of the
+        fields the next save will re-encode."""
+        return [f.name for f, _ in self._pending_fields()]
+
+    def changed_words(self) -> list[int]:
+        """Indices (file order) of the words that differ from the image as
+        last loaded or saved, pending edits included."""
+        self._update_bitstream()
+        return _changed_words(self._bits ^ _SYNC[self].saved_bits)
+
+    def _mark_saved(self) -> None:
+        _SYNC[self] = _SYNC[self]._replace(saved_bits=self._bits)
 
     def save_bitstream(self, output_json_file: Path) -> None:
         self._update_bitstream()
         self._save_bitstream_to_json(output_json_file)
+        self._mark_saved()
 
     def save_bitstream_s(
         self,
@@ -285,45 +540,36 @@ class Bitstream(FASM):
         psect: str = "clb_config",
     ) -> None:
         self._update_bitstream()
-        words = [
-            f"{int(self._bitstream[::-1][i: i + 16], 2):04X}"
-            for i in range(0, BITSTREAM_LENGTH, 16)
-        ]
-        device_macros = device_macros or [
-            "_16F13113",
-            "_16F13114",
-            "_16F13115",
-            "_16F13123",
-            "_16F13124",
-            "_16F13125",
-            "_16F13143",
-            "_16F13144",
-            "_16F13145",
-        ]
-        guard = " || ".join(f"defined({m})" for m in device_macros)
-        tpl = f"""\
-#if !({guard})
-    #error This module is only suitable for PIC16F13145 family devices
-#endif
-
-#ifdef CLB_CONFIG_ADDR
-    psect {psect},global,class=STRCODE,abs,ovrld,delta=2,noexec,split=0,merge=0,keep
-#else
-    psect {psect},global,class=STRCODE,delta=2,noexec,split=0,merge=0,keep
-#endif
+        out_file.write_text(
+            _asm_text(self._words(), device_macros=device_macros, psect=psect),
+            encoding="utf8",
+        )
+        self._mark_saved()
 
-global _start_{psect}
+    def diff(self, base: "Bitstream") -> list[WordChange]:
+        """The words that differ from *base* (``old`` is *base*'s value)."""
+        self._update_bitstream()
+        base._update_bitstream()
+        return diff_words(base._words(), self._words())
 
-psect   {psect}
-#ifdef CLB_CONFIG_ADDR
-    ORG CLB_CONFIG_ADDR
-#endif
+    def save_patch(self, base: "Bitstream", out_file: Path) -> None:
+        """Write the JSON patch that turns *base* into this bitstream."""
+        out_file.write_text(_patch_json_text(self.diff(base)), encoding="utf8")
 
-_start_{psect}:
-""" + "\n".join(
-            f"    dw  0x{w};" for w in words
+    def save_patch_s(
+        self,
+        base: "Bitstream",
+        out_file: Path,
+        *,
+        device_macros: list[str] | None = None,
+        psect: str = "clb_patch",
+    ) -> None:
+        """Like :meth:`save_patch`, as an assembler include next to the
+        :meth:`save_bitstream_s` output."""
+        out_file.write_text(
+            _asm_patch_text(self.diff(base), device_macros=device_macros, psect=psect),
+            encoding="utf8",
         )
-        out_file.write_text(tpl, encoding="utf8")
 
     def __str__(self) -> str:  # pragma: no cover
         from pprint import pformat
@@ -1,64 +1,193 @@
-from typing import Callable, Tuple
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, NamedTuple, Optional, Tuple
 
 Four_LUT = Tuple[bool, bool, bool, bool]
 FourLUT_Bit_Fn = Callable[[bool, bool, bool, bool], bool]
 
+LUT_MASK = 0xFFFF
+# Truth tables of the inputs a, b, c, d: bit ``w`` is the input value on row ``w``
+VAR_TT = (0xAAAA, 0xCCCC, 0xF0F0, 0xFF00)
+
+_ROWS: tuple[Four_LUT, ...] = tuple(
+    tuple(bool(w & 1 << k) for k in range(4)) for w in range(16)  # type: ignore
+)
+
+
+def truth_table(fn: Callable[[Four_LUT], bool]) -> int:
+    """Evaluate *fn* on all 16 input rows and return its 16-bit truth table."""
+    val = 0
+    for w, bits in enumerate(_ROWS):
+        if fn(bits):
+            val |= 1 << w
+    return val
+
+
+class CacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    maxsize: Optional[int]
+    currsize: int
+
+
+class LUTCache:
+    """Bounded LRU cache of truth tables built from Python callables.
+
+    ``maxsize=None`` makes the cache unbounded and ``maxsize=0`` disables it,
+    like ``functools.lru_cache``.
+    """
+
+    def __init__(self, maxsize: Optional[int] = 1024) -> None:
+        self._data: OrderedDict[Hashable, int] = OrderedDict()
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Optional[Hashable], build: Callable[[], int]) -> int:
+        """Return the table stored under *key*, building it on a miss."""
+        if key is None or self.maxsize == 0:
+            return build()
+        try:
+            tt = self._data[key]
+        except KeyError:
+            self.misses += 1
+            tt = self._data[key] = build()
+            self._evict()
+        else:
+            self.hits += 1
+            self._data.move_to_end(key)
+        return tt
+
+    def _evict(self) -> None:
+        if self.maxsize is not None:
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def resize(self, maxsize: Optional[int]) -> None:
+        self.maxsize = maxsize
+        self._evict()
+
+    def clear(self) -> None:
+        self._data.clear()
+        self.hits = self.misses = 0
+
+    def info(self) -> CacheInfo:
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._data))
+
+
+# Off by default: a callable's key only covers its code and the values it
+# captures, not state reached through them (attributes of a captured
+# object, globals read by a helper it calls), so a cached table can go stale.
+_LUT_CACHE = LUTCache(maxsize=0)
+
+
+def lut_cache_info() -> CacheInfo:
+    """Hit/miss counters of the truth-table cache used by ``Expr`` and ``LUT4``."""
+    return _LUT_CACHE.info()
+
+
+def lut_cache_clear() -> None:
+    _LUT_CACHE.clear()
+
+
+def configure_lut_cache(maxsize: Optional[int]) -> None:
+    """Resize the truth-table cache (``None``: unbounded, ``0``: disabled,
+    the default). Only enable it when the callables given to ``Expr`` and
+    ``LUT4`` are pure functions of their code and captured values."""
+    _LUT_CACHE.resize(maxsize)
+
+
+def _freeze(v: Any) -> Hashable:
+    """Hashable stand-in for a closure/default value (sets, lists, dicts)."""
+    if isinstance(v, (set, frozenset)):
+        return (frozenset, frozenset(_freeze(x) for x in v))
+    if isinstance(v, (list, tuple)):
+        return (type(v), tuple(_freeze(x) for x in v))
+    if isinstance(v, dict):
+        return (dict, frozenset((k, _freeze(x)) for k, x in v.items()))
+    hash(v)
+    return v
+
+
+def _callable_key(fn: Callable, kind: str) -> Optional[Hashable]:
+    """Structural key of a plain function: its code and the current values of
+    the globals, defaults and closure cells it reads.  ``None`` when *fn*
+    cannot be keyed (builtins, callable objects, unhashable captured values)."""
+    code = getattr(fn, "__code__", None)
+    if code is None:
+        return None
+    try:
+        return (
+            kind,
+            code,
+            _freeze(tuple(fn.__globals__.get(name) for name in code.co_names)),
+            _freeze(fn.__defaults__ or ()),
+            _freeze(fn.__kwdefaults__ or {}),
+            _freeze(tuple(cell.cell_contents for cell in fn.__closure__ or ())),
+        )
+    except (TypeError, ValueError):
+        return None
+
 
 class Expr:
-    """Symbolic Boolean expression on inputs (a, b, c, d)."""
+    """Symbolic Boolean expression on inputs (a, b, c, d).
+
+    The expression is stored as its 16-bit truth table ``tt`` (bit ``w`` is the
+    output for a = w & 1, b = w & 2, c = w & 4, d = w & 8), so every operator
+    is a single integer operation.
+    """
 
-    __slots__ = ("f",)
+    __slots__ = ("tt",)
 
-    def __init__(self, f: FourLUT_Bit_Fn) -> None:
-        self.f = f
+    def __init__(self, tt: int | Callable[[Four_LUT], bool]) -> None:
+        if callable(tt):
+            fn = tt
+            tt = _LUT_CACHE.get(_callable_key(fn, "Expr"), lambda: truth_table(fn))
+        self.tt = tt & LUT_MASK
 
     def __call__(self, bits: Four_LUT) -> bool:
-        return self.f(bits)
+        w = bits[0] | bits[1] << 1 | bits[2] << 2 | bits[3] << 3
+        return bool(self.tt >> w & 1)
 
     def __bool__(self) -> bool:
         raise TypeError("Expr objects are symbolic; use &, |, ~, ^, ==, !=")
 
     def __invert__(self) -> "Expr":
         """Implement ``~a``."""
-        return Expr(lambda v, s=self: not s(v))
+        return Expr(~self.tt)
 
-    def _combine(self, o: "Expr", op) -> "Expr":
-        return Expr(lambda v, l=self, r=o, p=op: p(l(v), r(v)))
+    def _combine(self, o: "Expr", op: Callable[[int, int], int]) -> "Expr":
+        return Expr(op(self.tt, o.tt))
 
     def __and__(self, o: "Expr") -> "Expr":
         """Implement ``a & b``."""
-        return self._combine(o, bool.__and__)
+        return self._combine(o, int.__and__)
 
     def __or__(self, o: "Expr") -> "Expr":
         """Implement ``a | b``."""
-        return self._combine(o, bool.__or__)
+        return self._combine(o, int.__or__)
 
     def __xor__(self, o: "Expr") -> "Expr":
         """Implement ``a ^ b``."""
-        return self._combine(o, bool.__xor__)
+        return self._combine(o, int.__xor__)
 
     def __eq__(self, o: object) -> "Expr":
         """Implement ``a == b`` (XNOR)."""
         return (
-            self._combine(o, lambda x, y: x == y)
+            self._combine(o, lambda x, y: ~(x ^ y))
             if isinstance(o, Expr)
             else NotImplemented
         )
 
     def __ne__(self, o: object) -> "Expr":
         """Implement ``a != b`` (XOR)."""
-        return (
-            self._combine(o, lambda x, y: x != y)
-            if isinstance(o, Expr)
-            else NotImplemented
-        )
+        return self._combine(o, int.__xor__) if isinstance(o, Expr) else NotImplemented
 
     def __repr__(self) -> str:
-        return "Expr(...)"
+        return f"Expr(0x{self.tt:04X})"
 
 
 def pick(i: int) -> Expr:
-    return Expr(lambda bits: bits[i])
+    return Expr(VAR_TT[i])
 
 
 a, b, c, d = (pick(i) for i in range(4))
@@ -67,21 +196,19 @@ a, b, c, d = (pick(i) for i in range(4))
 class LUT4:
     """Create a 16-bit LUT mask from an Expr or callable."""
 
-    __slots__ = ("fn",)
+    __slots__ = ("tt",)
 
     def __init__(self, logic: Expr | FourLUT_Bit_Fn) -> None:
         if isinstance(logic, Expr):
-            self.fn: Callable[[Four_LUT], bool] = logic
+            self.tt: int = logic.tt
         else:
-            self.fn = lambda bits, f=logic: f(*bits)
+            self.tt = _LUT_CACHE.get(
+                _callable_key(logic, "LUT4"),
+                lambda: truth_table(lambda bits: logic(*bits)),
+            )
 
     def bitstream(self) -> str:
-        val = 0
-        for w in range(16):
-            bits: Four_LUT = tuple(bool(w & 1 << k) for k in range(4))  # type: ignore
-            if self.fn(bits):
-                val |= 1 << w
-        return f"{val:016b}"
+        return f"{self.tt:016b}"
 
 
 if __name__ == "__main__":
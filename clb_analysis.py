@@ -0,0 +1,201 @@
+"""Combinational loop and logic depth analysis of a CLB design.
+
+The BLE connectivity graph is built once from the design's netlist (only
+inputs the truth table actually depends on count as edges, see
+``clb_netlist.active_mask``), then a single iterative Tarjan pass yields the
+strongly connected components in topological order. Depth is counted in LUT
+levels: IN/CLBSWIN/COUNT_IS inputs and flip-flop outputs are level 0, every
+combinational BLE adds one level.
+"""
+
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional, Union
+
+from bitstream import Bitstream
+from clb_netlist import (
+    Netlist,
+    SIG_BLE,
+    SINK_PPS,
+    SINK_PERIPH,
+    netlist_of,
+    sink_name,
+)
+from data_model import FASM
+
+
+@dataclass
+class BLEGraph:
+    """BLE to BLE connections of a design."""
+
+    # sources[i]: BLEs read by the active LUT inputs of BLE i
+    sources: list[list[int]]
+    flops: set[int]
+    # endpoint name -> driving BLE, e.g. "PPS_OUT0", "COUNTER.CNT_STOP"
+    endpoints: dict[str, int]
+
+
+@dataclass
+class TimingReport:
+    """Result of :func:`analyze`.
+
+    ``depth`` maps each BLE to the LUT levels up to and including its LUT
+    (``None`` when it sits on or behind a loop). ``endpoints`` holds the
+    depth seen by every PPS/IRQ/OE output, the counter inputs and each
+    flip-flop's D input (``BLE{i}.D``). ``critical_path`` lists the
+    combinational BLEs of the deepest endpoint, from source to endpoint.
+    """
+
+    loops: list[tuple[int, ...]] = field(default_factory=list)
+    order: list[int] = field(default_factory=list)
+    depth: dict[int, Optional[int]] = field(default_factory=dict)
+    endpoints: dict[str, Optional[int]] = field(default_factory=dict)
+    critical_endpoint: Optional[str] = None
+    critical_path: list[int] = field(default_factory=list)
+
+    @property
+    def has_loops(self) -> bool:
+        return bool(self.loops)
+
+    @property
+    def max_depth(self) -> int:
+        return max((d for d in self.endpoints.values() if d is not None), default=0)
+
+    def __str__(self) -> str:
+        lines = [
+            f"loops: {', '.join(str(list(loop)) for loop in self.loops) or 'none'}",
+            f"max depth: {self.max_depth}",
+        ]
+        if self.critical_endpoint is not None:
+            path = " -> ".join(f"BLE{i}" for i in self.critical_path)
+            lines.append(f"critical path: {path} -> {self.critical_endpoint}")
+        lines += [
+            f"  {name}: {'loop' if d is None else d}"
+            for name, d in self.endpoints.items()
+        ]
+        return "\n".join(lines)
+
+
+def build_ble_graph(cfg: Union[Bitstream, FASM, Netlist]) -> BLEGraph:
+    net = netlist_of(cfg)
+    sources: list[list[int]] = [[] for _ in range(32)]
+    for idx in range(32):
+        for port, src in enumerate(net.lut_src[idx]):
+            if net.active[idx] >> port & 1 and src < SIG_BLE + 32:
+                if src not in sources[idx]:
+                    sources[idx].append(src)
+    flops = {idx for idx in range(32) if net.is_flop(idx)}
+
+    endpoints: dict[str, int] = {}
+    for sig, sink in net.edges:
+        if SINK_PPS <= sink < SINK_PERIPH and sig < SIG_BLE + 32:
+            endpoints[sink_name(sink)] = sig
+    return BLEGraph(sources, flops, endpoints)
+
+
+def strongly_connected(succ: list[list[int]]) -> list[list[int]]:
+    """Iterative Tarjan; components come out sinks first (reverse topological
+    order of the condensation when edges point from a node to its successors).
+    """
+    index: list[Optional[int]] = [None] * len(succ)
+    low = [0] * len(succ)
+    on_stack = [False] * len(succ)
+    stack: list[int] = []
+    comps: list[list[int]] = []
+    counter = 0
+    for root in range(len(succ)):
+        if index[root] is not None:
+            continue
+        work = [(root, 0)]
+        while work:
+            v, i = work.pop()
+            if i == 0:
+                index[v] = low[v] = counter
+                counter += 1
+                stack.append(v)
+                on_stack[v] = True
+            recurse = False
+            for j in range(i, len(succ[v])):
+                w = succ[v][j]
+                if index[w] is None:
+                    work.append((v, j + 1))
+                    work.append((w, 0))
+                    recurse = True
+                    break
+                if on_stack[w]:
+                    low[v] = min(low[v], index[w])
+            if recurse:
+                continue
+            if low[v] == index[v]:
+                comp = []
+                while True:
+                    w = stack.pop()
+                    on_stack[w] = False
+                    comp.append(w)
+                    if w == v:
+                        break
+                comps.append(sorted(comp))
+            if work:
+                parent = work[-1][0]
+                low[parent] = min(low[parent], low[v])
+    return comps
+
+
+def analyze(cfg: Union[Bitstream, FASM, BLEGraph]) -> TimingReport:
+    """Find combinational loops and LUT depths of *cfg*."""
+    graph = cfg if isinstance(cfg, BLEGraph) else build_ble_graph(cfg)
+    n = len(graph.sources)
+    # combinational edges only: a flip-flop output starts a new path
+    comb_src = [[s for s in graph.sources[i] if s not in graph.flops] for i in range(n)]
+    report = TimingReport()
+    # edges point from a BLE to the BLEs it reads, so sinks-first is
+    # sources-first in signal flow
+    for comp in strongly_connected(comb_src):
+        v = comp[0]
+        if len(comp) > 1 or v in comb_src[v]:
+            report.loops.append(tuple(comp))
+        report.order.extend(comp)
+
+    looped = {v for loop in report.loops for v in loop}
+    depth: dict[int, Optional[int]] = {}
+    via: dict[int, Optional[int]] = {}
+    for v in report.order:
+        if v in looped or any(depth[s] is None for s in comb_src[v]):
+            depth[v] = None
+            continue
+        best = max(comb_src[v], key=lambda s: depth[s], default=None)
+        depth[v] = 1 + (0 if best is None else depth[best])
+        via[v] = best
+    report.depth = {v: depth[v] for v in sorted(depth)}
+
+    ends = {}
+    for name, ble in graph.endpoints.items():
+        ends[name] = ble
+        report.endpoints[name] = 0 if ble in graph.flops else depth[ble]
+    for ble in sorted(graph.flops):
+        ends[f"BLE{ble}.D"] = ble
+        report.endpoints[f"BLE{ble}.D"] = depth[ble]
+
+    deepest = [(d, name) for name, d in report.endpoints.items() if d]
+    if deepest:
+        _, name = max(deepest, key=lambda t: t[0])
+        path = []
+        cur: Optional[int] = ends[name]
+        while cur is not None:
+            path.append(cur)
+            cur = via[cur]
+        report.critical_endpoint = name
+        report.critical_path = path[::-1]
+    return report
+
+
+if __name__ == "__main__":
+    failed = False
+    for arg in sys.argv[1:]:
+        path = Path(arg)
+        design = Bitstream(path) if path.suffix == ".json" else FASM(path)
+        result = analyze(design)
+        failed |= result.has_loops
+        print(f"{path}:\n{result}")
+    sys.exit(1 if failed else 0)
@@ -1,19 +1,20 @@
+import zlib
 from dataclasses import dataclass, field
-from itertools import cycle
 from pathlib import Path
-from typing import Mapping, MutableMapping, Union, Iterator
+from typing import Callable, Iterator, Mapping, MutableMapping, Optional, Union
 
 from bitstream import Bitstream
-from data_model import (
-    FASM,
-    LUT_IN_A,
-    LUT_IN_B,
-    LUT_IN_C,
-    LUT_IN_D,
-    BLEXY,
-    FLOPSEL,
-    PPS_OUT_NUM,
+from clb_netlist import (
+    Netlist,
+    SIG_BLE,
+    SIG_ZERO,
+    SINK_LUT,
+    SINK_PPS,
+    netlist_of,
+    signal_name,
+    sink_name,
 )
+from data_model import FASM, BLEXY, CLBIN
 
 VAR_ORDER = "ABCD"
 
@@ -37,21 +38,16 @@ COUNTER_OUTPUT_LABELS_ORDERED = [
     ("D1", COUNTER_OUTPUT_PORT_MAP["COUNT_IS_D1"]),
     ("D2", COUNTER_OUTPUT_PORT_MAP["COUNT_IS_D2"]),
 ]
-
-
-def _parse_ble_index_from_name(name_str: str) -> int | None:
-    if name_str is None or not isinstance(name_str, str):
-        return None
-    parts = name_str.split("_")
-    try:
-        for i, part in enumerate(parts):
-            if part.upper() == "BLE" and i + 1 < len(parts) and parts[i + 1].isdigit():
-                return int(parts[i + 1])
-        if parts[-1].isdigit():
-            return int(parts[-1])
-    except (ValueError, IndexError):
-        return None
-    return None
+PERIPHERAL_INPUT_LABELS = {
+    "TIMR0_IN": "Timer0 Input",
+    "TIMR1_IN": "Timer1 Input",
+    "TIMR1_GATE": "Timer1 Gate",
+    "TIMR2_IN": "Timer2 Input",
+    "TIMR2_RST": "Timer2 Reset",
+    "CCP1_IN": "CCP1 Input",
+    "CCP2_IN": "CCP2 Input",
+    "ADC_IN": "ADC Input",
+}
 
 
 def get_lut_equation_str(cfg: str, active: Mapping[str, bool]) -> str:
@@ -109,6 +105,11 @@ def get_active_lut_inputs(cfg: str) -> dict[str, bool]:
     return active
 
 
+def _net_colour(src: str) -> int:
+    """dark28 colour of the net driven by port *src*, stable across renders."""
+    return 1 + zlib.crc32(src.split(":")[0].encode()) % 8
+
+
 @dataclass
 class DotBuilder:
     name: str = "main"
@@ -116,9 +117,6 @@ class DotBuilder:
     edges: list[str] = field(default_factory=list)
     source_rank: set[str] = field(default_factory=set)
     sink_rank: set[str] = field(default_factory=set)
-    _colours: Iterator[int] = field(
-        default_factory=lambda: cycle(range(1, 9)), init=False
-    )
 
     def add_pin(
         self, pin_id: str, label: str, *, cls: str, rank: str | None = None
@@ -150,11 +148,23 @@ class DotBuilder:
         )
 
     def add_edge(self, src: str, dst: str, tooltip: str, *, dashed=False) -> None:
-        style = "style=dashed, color=grey" if dashed else f"color={next(self._colours)}"
+        style = "style=dashed, color=grey" if dashed else f"color={_net_colour(src)}"
         self.edges.append(
             f'  {src} -> {dst} [tooltip="{tooltip}", {style}, class="net"];'
         )
 
+    def merge(self, other: "DotBuilder") -> None:
+        """Append the nodes and edges of *other*; nodes already present win."""
+        for node_id, stmt in other.nodes.items():
+            if node_id in self.nodes:
+                continue
+            self.nodes[node_id] = stmt
+            if node_id in other.source_rank:
+                self.source_rank.add(node_id)
+            elif node_id in other.sink_rank:
+                self.sink_rank.add(node_id)
+        self.edges.extend(other.edges)
+
     def build(self) -> str:
         lines = [
             f'digraph "{self.name}" {{',
@@ -176,504 +186,393 @@ class DotBuilder:
         return "\n".join(lines)
 
 
-def generate_dot_from_config(
-    cfg: Union[Bitstream, FASM], graph_name: str = "main"
-) -> str:
-    dot = DotBuilder(graph_name)
-    all_luts = getattr(cfg, "LUTS", {})
-
-    in_mux: dict[int, str | None] = {
-        idx: (
-            m.CLBIN.name
-            if m.CLBIN is not None and hasattr(m.CLBIN, "name") and bool(m.CLBIN.name)
-            else None
+@dataclass
+class DotDelta:
+    """Changes between two renders of an :class:`IncrementalDot`.
+
+    ``nodes`` maps every added or changed node to its new statement and every
+    removed node to ``None``. The rank sets are only given when they changed.
+    """
+
+    nodes: dict[str, Optional[str]] = field(default_factory=dict)
+    added_edges: list[str] = field(default_factory=list)
+    removed_edges: list[str] = field(default_factory=list)
+    source_rank: Optional[set[str]] = None
+    sink_rank: Optional[set[str]] = None
+
+    def __bool__(self) -> bool:
+        return bool(
+            self.nodes
+            or self.added_edges
+            or self.removed_edges
+            or self.source_rank is not None
+            or self.sink_rank is not None
         )
-        for idx, m in getattr(cfg, "MUXS", {}).items()
-    }
-    for idx in range(16):
-        pin_id = f"pin_IN{idx}"
-        dot.add_pin(pin_id, f"IN{idx}", cls="pin_input in_channel")
-        src_mux_sel_name = in_mux.get(idx)
-        if src_mux_sel_name is not None:
-            src_id = f"pin_{src_mux_sel_name}"
-            dot.add_pin(
-                src_id, src_mux_sel_name, cls="pin_input clbin_pin", rank="source"
-            )
-            dot.add_edge(
-                f"{src_id}:e",
-                f"{pin_id}:w",
-                f"{src_mux_sel_name} -> IN{idx}",
-                dashed=True,
-            )
-        else:
-            unconf_src_id = f"pin_IN{idx}_Unconfigured"
-            dot.add_pin(
-                unconf_src_id,
-                f"IN{idx}_Unconfigured",
-                cls="pin_input clbin_pin",
-                rank="source",
-            )
-            dot.add_edge(
-                f"{unconf_src_id}:e",
-                f"{pin_id}:w",
-                f"IN{idx}_Unconfigured -> IN{idx}",
-                dashed=True,
-            )
 
-    active_bles: dict[BLEXY, dict] = {}
-    for ble_xy, ble_cfg_obj in all_luts.items():
-        idx = ble_xy.value
-        active_ins = get_active_lut_inputs(ble_cfg_obj.LUT_CONFIG)
-        used_elsewhere = _ble_output_used(cfg, idx, ble_xy)
-        if any(active_ins.values()) or used_elsewhere:
-            active_bles[ble_xy] = {
-                "cfg": ble_cfg_obj,
-                "inputs": active_ins,
-                "used_elsewhere": used_elsewhere,
-            }
-
-    for ble_xy, meta in active_bles.items():
-        idx = ble_xy.value
-        ble_cfg_obj = meta["cfg"]
-        active_ins = meta["inputs"]
-        eq = get_lut_equation_str(ble_cfg_obj.LUT_CONFIG, active_ins)
-        tooltip = f"BLE{idx}: {eq}"
-        if ble_cfg_obj.FLOPSEL == FLOPSEL.ENABLE:
-            tooltip += " (DFF Enabled)"
-
-        port_lbl_parts = [
-            f"<{p.lower()}> {p}" for p in VAR_ORDER if active_ins.get(p, False)
-        ]
-        port_lbl = " | ".join(port_lbl_parts)
-        node_label = (
-            f"{{{{{port_lbl}}}|LUT4 : BLE{idx}\\n{eq}|{{<outO> O}}}}"
-            if port_lbl
-            else f"{{LUT4 : BLE{idx}\\n{eq}|{{<outO> O}}}}"
-        )
 
-        is_simple_passthrough = (
-            sum(active_ins.values()) == 1
-            and eq.startswith("O=")
-            and len(eq.split("=")[1].strip()) in [1, 2]
-        )
-        is_const_output_used_elsewhere = (
-            not any(active_ins.values()) and meta["used_elsewhere"]
-        )
-        route_only_flag = (
-            is_simple_passthrough or is_const_output_used_elsewhere
-        ) and ble_cfg_obj.FLOPSEL != FLOPSEL.ENABLE
-        dot.add_clb(f"clb{idx}", tooltip, node_label, route_only=route_only_flag)
+class IncrementalDot:
+    """DOT graph of a design that is re-rendered piecewise after edits.
+
+    The graph is split into fragments: one per input MUX, BLE, BLE input set,
+    PPS/OE/IRQ output and peripheral input, plus the counter. Each fragment
+    remembers the netlist values it was rendered from, so :meth:`update`
+    only re-renders the fragments touched by an edit and returns the
+    :class:`DotDelta` against the previous render.
+    """
+
+    def __init__(self, cfg: Union[Bitstream, FASM], graph_name: str = "main") -> None:
+        self.cfg = cfg
+        self.graph_name = graph_name
+        self._fragments: dict[tuple, tuple[tuple, DotBuilder]] = {}
+        self._dot = DotBuilder(graph_name)
+        self.update()
+
+    def dot(self) -> str:
+        """The full DOT text of the last render."""
+        return self._dot.build()
+
+    def update(self) -> DotDelta:
+        """Bring the graph up to date with ``cfg``."""
+        fragments = {}
+        dot = DotBuilder(self.graph_name)
+        for key, inputs, render in _dot_fragments(self.cfg):
+            cached = self._fragments.get(key)
+            if cached is None or cached[0] != inputs:
+                part = DotBuilder(self.graph_name)
+                render(part, *inputs)
+                cached = (inputs, part)
+            fragments[key] = cached
+            dot.merge(cached[1])
+        self._fragments = fragments
+        delta = _dot_delta(self._dot, dot)
+        self._dot = dot
+        return delta
 
-    input_attr_map = {"A": "LUT_I_A", "B": "LUT_I_B", "C": "LUT_I_C", "D": "LUT_I_D"}
-    lut_input_enums = (LUT_IN_A, LUT_IN_B, LUT_IN_C, LUT_IN_D)
 
-    counter_cfg_obj = getattr(cfg, "COUNTER", None)
-    counter_node_id = "clb_counter"
-    if counter_cfg_obj is not None:
-        counter_input_ports_def = []
-
-        stop_src_enum = getattr(counter_cfg_obj, "CNT_STOP", None)
-        if (
-            stop_src_enum is not None
-            and hasattr(stop_src_enum, "name")
-            and bool(stop_src_enum.name)
-        ):
-            counter_input_ports_def.append("<stop> Stop")
-
-        reset_src_enum = getattr(counter_cfg_obj, "CNT_RESET", None)
-        if (
-            reset_src_enum is not None
-            and hasattr(reset_src_enum, "name")
-            and bool(reset_src_enum.name)
-        ):
-            counter_input_ports_def.append("<reset> Reset")
-
-        counter_output_ports_disp = [
-            f"<{port_tag}> {label_suffix}"
-            for label_suffix, port_tag in COUNTER_OUTPUT_LABELS_ORDERED
-        ]
+def generate_dot_from_config(
+    cfg: Union[Bitstream, FASM], graph_name: str = "main"
+) -> str:
+    return IncrementalDot(cfg, graph_name).dot()
 
-        lbl_parts = []
-        if counter_input_ports_def:
-            lbl_parts.append("{" + " | ".join(counter_input_ports_def) + "}")
-        lbl_parts.append("Counter")
-        lbl_parts.append("{" + " | ".join(counter_output_ports_disp) + "}")
 
-        counter_node_label = "{" + " | ".join(lbl_parts) + "}"
-        dot.add_clb(
-            counter_node_id, "CLB Counter Block", counter_node_label, is_block=True
-        )
+def _dot_delta(old: DotBuilder, new: DotBuilder) -> DotDelta:
+    delta = DotDelta()
+    for node_id, stmt in new.nodes.items():
+        if old.nodes.get(node_id) != stmt:
+            delta.nodes[node_id] = stmt
+    for node_id in old.nodes.keys() - new.nodes.keys():
+        delta.nodes[node_id] = None
+    old_edges, new_edges = set(old.edges), set(new.edges)
+    delta.added_edges = [e for e in new.edges if e not in old_edges]
+    delta.removed_edges = [e for e in old.edges if e not in new_edges]
+    if old.source_rank != new.source_rank:
+        delta.source_rank = set(new.source_rank)
+    if old.sink_rank != new.sink_rank:
+        delta.sink_rank = set(new.sink_rank)
+    return delta
 
-        counter_inputs_to_connect = {}
-        if (
-            stop_src_enum is not None
-            and hasattr(stop_src_enum, "name")
-            and bool(stop_src_enum.name)
-        ):
-            counter_inputs_to_connect["CNT_STOP"] = (stop_src_enum, "stop")
-        if (
-            reset_src_enum is not None
-            and hasattr(reset_src_enum, "name")
-            and bool(reset_src_enum.name)
-        ):
-            counter_inputs_to_connect["CNT_RESET"] = (reset_src_enum, "reset")
-
-        for _, (source_enum_val, dest_port_name) in counter_inputs_to_connect.items():
-            source_name_str = source_enum_val.name
-            src_id, src_port = "", ""
-            ble_idx_val = _parse_ble_index_from_name(source_name_str)
-
-            if ble_idx_val is not None:
-                src_id = f"clb{ble_idx_val}"
-                src_port = ":outO:e"
-                if BLEXY(ble_idx_val) not in active_bles:
-                    _ensure_ble_node_exists(
-                        dot,
-                        ble_idx_val,
-                        all_luts,
-                        f"Counter Input Source from {source_name_str}",
-                    )
-            else:
-                src_id = f"pin_{source_name_str}"
-                src_port = ":e"
-                dot.add_pin(src_id, source_name_str, cls="pin_input", rank="source")
-
-            if src_id is not None:
-                dot.add_edge(
-                    f"{src_id}{src_port}",
-                    f"{counter_node_id}:{dest_port_name}:w",
-                    f"{source_name_str} to Counter {dest_port_name.capitalize()}",
-                )
-
-    for dest_xy, meta in active_bles.items():
-        dest_id = f"clb{dest_xy.value}"
-        for port_char in VAR_ORDER:
-            if not meta["inputs"].get(port_char, False):
-                continue
-            attr_name = input_attr_map[port_char]
-            src_enum = getattr(meta["cfg"], attr_name)
-            if src_enum is None:
-                continue
 
-            tooltip = src_enum.name if hasattr(src_enum, "name") else str(src_enum)
-            src_id, src_port = _resolve_source(
-                dot,
-                cfg,
-                all_luts,
-                active_bles,
-                src_enum,
-                lut_input_enums,
-                counter_node_id if counter_cfg_obj is not None else None,
-            )
-            if src_id is not None:
-                dot.add_edge(
-                    f"{src_id}{src_port}", f"{dest_id}:{port_char.lower()}:w", tooltip
-                )
-
-    for pps_idx, pps_enum_type in PPS_OUT_NUM.items():
-        pps_cfg_obj = getattr(cfg, "PPS_OUT", {}).get(pps_enum_type)
-        if pps_cfg_obj is None or not (
-            getattr(pps_cfg_obj, "OUT", None) is not None
-            and hasattr(getattr(pps_cfg_obj, "OUT", None), "name")
-            and bool(getattr(pps_cfg_obj, "OUT", None).name)
-        ):
-            continue
-
-        src_ble_name = pps_cfg_obj.OUT.name
-        src_idx_val = _parse_ble_index_from_name(src_ble_name)
-
-        if src_idx_val is not None:
-            src_id = f"clb{src_idx_val}"
-            if BLEXY(src_idx_val) not in active_bles:
-                _ensure_ble_node_exists(
-                    dot, src_idx_val, all_luts, f"PPS Source from {src_ble_name}"
-                )
-
-            sink_id = f"pin_PPS_OUT{pps_idx}"
-            dot.add_pin(sink_id, f"PPS_OUT{pps_idx}", cls="pin_output", rank="sink")
-            dot.add_edge(
-                f"{src_id}:outO:e",
-                f"{sink_id}:w",
-                f"{src_ble_name} to PPS_OUT{pps_idx}",
-            )
-        else:
-            print(
-                f"Warning: Could not parse BLE index from PPS source '{src_ble_name}' for PPS_OUT{pps_idx}"
-            )
+_Fragment = tuple[tuple, tuple, Callable[..., None]]
 
-    for oe_idx, oe_sel_enum in getattr(cfg, "OE", {}).items():
-        if not (
-            oe_sel_enum is not None
-            and hasattr(oe_sel_enum, "name")
-            and bool(oe_sel_enum.name)
-        ):
-            continue
-
-        pin_id = f"pin_OE{oe_idx}"
-        dot.add_pin(pin_id, f"OE{oe_idx}", cls="pin_output", rank="sink")
-        src_ble_name = oe_sel_enum.name
-        src_idx_val = _parse_ble_index_from_name(src_ble_name)
-
-        if src_idx_val is not None:
-            src_id = f"clb{src_idx_val}"
-            if BLEXY(src_idx_val) not in active_bles:
-                _ensure_ble_node_exists(
-                    dot, src_idx_val, all_luts, f"OE Source from {src_ble_name}"
-                )
 
-            dot.add_edge(
-                f"{src_id}:outO:e", f"{pin_id}:w", f"{src_ble_name} to OE{oe_idx}"
-            )
-        else:
-            print(
-                f"Warning: Could not parse BLE index from OE source '{src_ble_name}' for OE{oe_idx}"
-            )
+def _dot_fragments(cfg: Union[Bitstream, FASM]) -> Iterator[_Fragment]:
+    """``(key, inputs, render)`` of every graph fragment, in output order.
 
-    for irq_idx, irq_cfg_val in getattr(cfg, "IRQ_OUT", {}).items():
-        if irq_cfg_val is None or not (
-            getattr(irq_cfg_val, "OUT", None) is not None
-            and hasattr(getattr(irq_cfg_val, "OUT", None), "name")
-            and bool(getattr(irq_cfg_val, "OUT", None).name)
-        ):
-            continue
-
-        irq_pin_id = f"pin_IRQ_OUT{irq_idx}"
-        dot.add_pin(irq_pin_id, f"IRQ_OUT{irq_idx}", cls="pin_output", rank="sink")
-        src_ble_name = irq_cfg_val.OUT.name
-        src_idx_val = _parse_ble_index_from_name(src_ble_name)
-
-        if src_idx_val is not None:
-            src_id = f"clb{src_idx_val}"
-            if BLEXY(src_idx_val) not in active_bles:
-                _ensure_ble_node_exists(
-                    dot, src_idx_val, all_luts, f"IRQ Source from {src_ble_name}"
-                )
-            dot.add_edge(
-                f"{src_id}:outO:e",
-                f"{irq_pin_id}:w",
-                f"{src_ble_name} to IRQ_OUT{irq_idx}",
-            )
-        else:
-            print(
-                f"Warning: Could not parse BLE index from IRQ source '{src_ble_name}' for IRQ_OUT{irq_idx}"
-            )
+    ``render(dot, *inputs)`` draws the fragment; *inputs* holds everything it
+    reads, so an unchanged *inputs* means an unchanged fragment.
+    """
+    net = netlist_of(cfg)
+    all_luts = getattr(cfg, "LUTS", {})
 
-    peripheral_inputs_map = {
-        "TIMR0_IN": "Timer0 Input",
-        "TIMR1_IN": "Timer1 Input",
-        "TIMR1_GATE": "Timer1 Gate",
-        "TIMR2_IN": "Timer2 Input",
-        "TIMR2_RST": "Timer2 Reset",
-        "CCP1_IN": "CCP1 Input",
-        "CCP2_IN": "CCP2 Input",
-        "ADC_IN": "ADC Input",
-    }
-    for attr_key, pin_label_base in peripheral_inputs_map.items():
-        source_name_str = getattr(cfg, attr_key, None)
-        if source_name_str is None or not isinstance(source_name_str, str):
-            continue
+    for idx, src in enumerate(net.mux_src):
+        yield ("IN", idx), (idx, src), _render_in_mux
 
-        peripheral_pin_id = f"pin_{attr_key}"
+    active_bles = {
+        ble_xy.value: None
+        for ble_xy in all_luts
+        if net.active[ble_xy.value] or net.is_used(ble_xy.value)
+    }
+    for idx in active_bles:
+        inputs = (
+            idx,
+            all_luts[BLEXY(idx)].LUT_CONFIG,
+            net.active[idx],
+            net.is_flop(idx),
+            net.is_used(idx),
+        )
+        yield ("BLE", idx), inputs, _render_ble
+
+    # BLEs that are referenced but not drawn above, with the first reference
+    route_through: dict[int, str] = {}
+
+    def refer(sig: int, reason: str) -> None:
+        ble_idx = sig - SIG_BLE
+        if 0 <= ble_idx < 32 and ble_idx not in active_bles:
+            route_through.setdefault(ble_idx, f"{reason} from {signal_name(sig)}")
+
+    counter_node_id = None
+    if getattr(cfg, "COUNTER", None) is not None:
+        counter_node_id = "clb_counter"
+        for sig in (net.cnt_stop, net.cnt_reset):
+            refer(sig, "Counter Input Source")
+        yield ("COUNTER",), (net.cnt_stop, net.cnt_reset), _render_counter
+
+    for idx in active_bles:
+        srcs = tuple(
+            sig if net.active[idx] >> port & 1 else SIG_ZERO
+            for port, sig in enumerate(net.lut_src[idx])
+        )
+        for sig in srcs:
+            refer(sig, "LUT Input Source")
+        yield ("LUT_IN", idx), (idx, srcs, counter_node_id), _render_lut_inputs
+
+    for kind, sigs in (("PPS_OUT", net.pps), ("OE", net.oe), ("IRQ_OUT", net.irq)):
+        for out_idx, sig in enumerate(sigs):
+            if sig != SIG_ZERO:
+                refer(sig, f"{kind.split('_')[0]} Source")
+                yield (kind, out_idx), (kind, out_idx, sig), _render_output
+
+    for attr_key, sig, source_name_str in net.periph:
+        if sig is not None:
+            refer(sig, "Peripheral Input Source")
+        yield (attr_key,), (attr_key, sig, source_name_str), _render_peripheral
+
+    for idx, reason in sorted(route_through.items()):
+        ble_cfg_data = all_luts.get(BLEXY(idx))
+        inputs = (
+            idx,
+            reason,
+            None if ble_cfg_data is None else ble_cfg_data.LUT_CONFIG,
+            net.is_flop(idx),
+        )
+        yield ("BLE", idx), inputs, _render_route_through
+
+
+def _render_in_mux(dot: DotBuilder, idx: int, src: Optional[int]) -> None:
+    pin_id = f"pin_IN{idx}"
+    dot.add_pin(pin_id, f"IN{idx}", cls="pin_input in_channel")
+    src_mux_sel_name = None if src is None else CLBIN(src).name
+    if src_mux_sel_name:
+        src_id = f"pin_{src_mux_sel_name}"
+        dot.add_pin(src_id, src_mux_sel_name, cls="pin_input clbin_pin", rank="source")
+        dot.add_edge(
+            f"{src_id}:e",
+            f"{pin_id}:w",
+            f"{src_mux_sel_name} -> IN{idx}",
+            dashed=True,
+        )
+    else:
+        unconf_src_id = f"pin_IN{idx}_Unconfigured"
         dot.add_pin(
-            peripheral_pin_id, pin_label_base, cls="pin_peripheral_input", rank="sink"
+            unconf_src_id,
+            f"IN{idx}_Unconfigured",
+            cls="pin_input clbin_pin",
+            rank="source",
+        )
+        dot.add_edge(
+            f"{unconf_src_id}:e",
+            f"{pin_id}:w",
+            f"IN{idx}_Unconfigured -> IN{idx}",
+            dashed=True,
         )
 
-        src_id, src_port = "", ""
-        ble_idx_val = _parse_ble_index_from_name(source_name_str)
-
-        if ble_idx_val is not None:
-            src_id = f"clb{ble_idx_val}"
-            src_port = ":outO:e"
-            if BLEXY(ble_idx_val) not in active_bles:
-                _ensure_ble_node_exists(
-                    dot,
-                    ble_idx_val,
-                    all_luts,
-                    f"Peripheral Input Source from {source_name_str}",
-                )
-        else:
-            src_id = f"pin_{source_name_str}"
-            src_port = ":e"
-            dot.add_pin(src_id, source_name_str, cls="pin_input", rank="source")
-
-        if src_id is not None:
-            dot.add_edge(
-                f"{src_id}{src_port}",
-                f"{peripheral_pin_id}:w",
-                f"{source_name_str} to {pin_label_base}",
-            )
-    return dot.build()
 
+def _render_ble(
+    dot: DotBuilder,
+    idx: int,
+    lut_config: str,
+    active: int,
+    is_flop: bool,
+    used_elsewhere: bool,
+) -> None:
+    active_ins = {k: bool(active >> i & 1) for i, k in enumerate(VAR_ORDER)}
+    eq = get_lut_equation_str(lut_config, active_ins)
+    tooltip = f"BLE{idx}: {eq}"
+    if is_flop:
+        tooltip += " (DFF Enabled)"
+
+    port_lbl_parts = [f"<{p.lower()}> {p}" for p in VAR_ORDER if active_ins[p]]
+    port_lbl = " | ".join(port_lbl_parts)
+    node_label = (
+        f"{{{{{port_lbl}}}|LUT4 : BLE{idx}\\n{eq}|{{<outO> O}}}}"
+        if port_lbl
+        else f"{{LUT4 : BLE{idx}\\n{eq}|{{<outO> O}}}}"
+    )
+
+    is_simple_passthrough = (
+        sum(active_ins.values()) == 1
+        and eq.startswith("O=")
+        and len(eq.split("=")[1].strip()) in [1, 2]
+    )
+    is_const_output_used_elsewhere = not active and used_elsewhere
+    route_only_flag = (
+        is_simple_passthrough or is_const_output_used_elsewhere
+    ) and not is_flop
+    dot.add_clb(f"clb{idx}", tooltip, node_label, route_only=route_only_flag)
 
-def _ensure_ble_node_exists(
-    dot: DotBuilder, ble_idx: int, all_luts: Mapping[BLEXY, any], reason: str
-):
-    node_id = f"clb{ble_idx}"
-    if node_id in dot.nodes:
-        return
 
-    ble_cfg_data = all_luts.get(BLEXY(ble_idx))
+def _render_route_through(
+    dot: DotBuilder,
+    ble_idx: int,
+    reason: str,
+    lut_config: Optional[str],
+    is_flop: bool,
+) -> None:
     eq_str = "Route-through"
     tooltip_reason = f"BLE{ble_idx} ({reason})"
-    is_dff = False
-    if ble_cfg_data is not None:
-        lut_config_str = getattr(ble_cfg_data, "LUT_CONFIG", "0" * 16)
-        temp_active_ins = get_active_lut_inputs(lut_config_str)
-        eq_str = get_lut_equation_str(lut_config_str, temp_active_ins)
+    if lut_config is not None:
+        eq_str = get_lut_equation_str(lut_config, get_active_lut_inputs(lut_config))
         tooltip_reason = f"BLE{ble_idx}: {eq_str} ({reason})"
-        if getattr(ble_cfg_data, "FLOPSEL", FLOPSEL.DISABLE) == FLOPSEL.ENABLE:
+        if is_flop:
             tooltip_reason += " (DFF Enabled)"
-            is_dff = True
+    else:
+        is_flop = False
 
     label = f"{{LUT4 : BLE{ble_idx}\\n({eq_str})|{{<outO> O}}}}"
     dot.add_clb(
-        node_id,
+        f"clb{ble_idx}",
         tooltip_reason,
         label,
         route_only=(
-            not is_dff and (eq_str.startswith("O=") or eq_str == "Route-through")
+            not is_flop and (eq_str.startswith("O=") or eq_str == "Route-through")
         ),
     )
 
 
-def _ble_output_used(
-    cfg: FASM | Bitstream, idx_of_interest: int, ble_xy_of_interest
-) -> bool:
-    for pps_val in getattr(cfg, "PPS_OUT", {}).values():
-        if (
-            getattr(pps_val, "OUT", None) is not None
-            and hasattr(getattr(pps_val, "OUT", None), "name")
-            and bool(getattr(pps_val, "OUT", None).name)
-        ):
-            if _parse_ble_index_from_name(pps_val.OUT.name) == idx_of_interest:
-                return True
-    for other_ble_xy, other_ble_cfg in getattr(cfg, "LUTS", {}).items():
-        if other_ble_xy == ble_xy_of_interest:
-            continue
-        for attr_name in ("LUT_I_A", "LUT_I_B", "LUT_I_C", "LUT_I_D"):
-            input_source = getattr(other_ble_cfg, attr_name)
-            if (
-                input_source is not None
-                and hasattr(input_source, "name")
-                and bool(input_source.name)
-            ):
-                if input_source.name.startswith("CLB_BLE_"):
-                    if _parse_ble_index_from_name(input_source.name) == idx_of_interest:
-                        return True
-    for oe_sel in getattr(cfg, "OE", {}).values():
-        if oe_sel is not None and hasattr(oe_sel, "name") and bool(oe_sel.name):
-            if _parse_ble_index_from_name(oe_sel.name) == idx_of_interest:
-                return True
-    for irq_val in getattr(cfg, "IRQ_OUT", {}).values():
-        if (
-            getattr(irq_val, "OUT", None) is not None
-            and hasattr(getattr(irq_val, "OUT", None), "name")
-            and bool(getattr(irq_val, "OUT", None).name)
-        ):
-            if _parse_ble_index_from_name(irq_val.OUT.name) == idx_of_interest:
-                return True
-
-    peripheral_input_attrs = [
-        "TIMR0_IN",
-        "TIMR1_IN",
-        "TIMR1_GATE",
-        "TIMR2_IN",
-        "TIMR2_RST",
-        "CCP1_IN",
-        "CCP2_IN",
-        "ADC_IN",
+def _render_counter(dot: DotBuilder, cnt_stop: int, cnt_reset: int) -> None:
+    counter_node_id = "clb_counter"
+    counter_inputs_to_connect = [
+        (sig, port)
+        for sig, port in ((cnt_stop, "stop"), (cnt_reset, "reset"))
+        if sig != SIG_ZERO
     ]
-    for attr_key in peripheral_input_attrs:
-        source_name_val = getattr(cfg, attr_key, None)
-        if source_name_val is not None and isinstance(source_name_val, str):
-            if _parse_ble_index_from_name(source_name_val) == idx_of_interest:
-                return True
-
-    counter_obj = getattr(cfg, "COUNTER", None)
-    if counter_obj is not None:
-        counter_input_source_enums = [
-            getattr(counter_obj, "CNT_STOP", None),
-            getattr(counter_obj, "CNT_RESET", None),
-        ]
-        for src_enum in counter_input_source_enums:
-            if (
-                src_enum is not None
-                and hasattr(src_enum, "name")
-                and bool(src_enum.name)
-            ):
-                if _parse_ble_index_from_name(src_enum.name) == idx_of_interest:
-                    return True
-    return False
-
-
-def _resolve_source(
-    dot: DotBuilder,
-    cfg_obj: Union[Bitstream, FASM],
-    all_luts: Mapping[BLEXY, any],
-    active_bles: Mapping[BLEXY, dict],
-    src_enum,
-    lut_input_enums: tuple[type, ...],
-    counter_node_id: str | None,
-) -> tuple[str | None, str]:
-    name = src_enum.name if hasattr(src_enum, "name") else str(src_enum)
-
-    if name.startswith("COUNT_IS_") and counter_node_id is not None:
-        port_tag = COUNTER_OUTPUT_PORT_MAP.get(name)
-        if port_tag is not None:
-            return counter_node_id, f":{port_tag}:e"
-        else:
-            print(
-                f"Warning: Unknown COUNT_IS_ signal '{name}' or no mapping to port tag."
+    counter_input_ports_def = [
+        f"<{port}> {port.capitalize()}" for _, port in counter_inputs_to_connect
+    ]
+    counter_output_ports_disp = [
+        f"<{port_tag}> {label_suffix}"
+        for label_suffix, port_tag in COUNTER_OUTPUT_LABELS_ORDERED
+    ]
+
+    lbl_parts = []
+    if counter_input_ports_def:
+        lbl_parts.append("{" + " | ".join(counter_input_ports_def) + "}")
+    lbl_parts.append("Counter")
+    lbl_parts.append("{" + " | ".join(counter_output_ports_disp) + "}")
+
+    counter_node_label = "{" + " | ".join(lbl_parts) + "}"
+    dot.add_clb(counter_node_id, "CLB Counter Block", counter_node_label, is_block=True)
+
+    for sig, dest_port_name in counter_inputs_to_connect:
+        dot.add_edge(
+            _resolve_source(dot, sig, None),
+            f"{counter_node_id}:{dest_port_name}:w",
+            f"{signal_name(sig)} to Counter {dest_port_name.capitalize()}",
+        )
+
+
+def _render_lut_inputs(
+    dot: DotBuilder, idx: int, srcs: tuple[int, ...], counter_node_id: Optional[str]
+) -> None:
+    for port_char, sig in zip(VAR_ORDER, srcs):
+        if sig != SIG_ZERO:
+            dot.add_edge(
+                _resolve_source(dot, sig, counter_node_id),
+                f"clb{idx}:{port_char.lower()}:w",
+                signal_name(sig),
             )
-            pin_name = f"pin_{name}"
-            if pin_name not in dot.nodes:
-                dot.add_pin(
-                    pin_name, name, cls="pin_input unknown_count_is", rank="source"
-                )
-            return pin_name, ":e"
-
-    if name.startswith("CLB_BLE_"):
-        ble_idx = _parse_ble_index_from_name(name)
-        if ble_idx is not None:
-            src_node_id = f"clb{ble_idx}"
-            if BLEXY(ble_idx) not in active_bles:
-                _ensure_ble_node_exists(
-                    dot, ble_idx, all_luts, f"LUT Input Source from {name}"
-                )
-            return src_node_id, ":outO:e"
-        else:
-            print(f"Warning: Malformed CLB_BLE_ name: {name}")
-            return None, ""
-
-    if name.startswith(("IN", "CLBSWIN")):
-        pin_name = f"pin_{name}"
-        if pin_name not in dot.nodes:
-            dot.add_pin(pin_name, name, cls="pin_input", rank="source")
-        return pin_name, ":e"
-
-    if hasattr(type(src_enum), "__bases__") and any(
-        base in lut_input_enums for base in type(src_enum).__bases__
-    ):
-        print(
-            f"Warning: Unresolved LUT input source (unmapped enum value): {name} (type: {type(src_enum)})"
+
+
+def _render_output(dot: DotBuilder, kind: str, out_idx: int, sig: int) -> None:
+    sink_id = f"pin_{kind}{out_idx}"
+    dot.add_pin(sink_id, f"{kind}{out_idx}", cls="pin_output", rank="sink")
+    dot.add_edge(
+        _resolve_source(dot, sig, None),
+        f"{sink_id}:w",
+        f"{signal_name(sig)} to {kind}{out_idx}",
+    )
+
+
+def _render_peripheral(
+    dot: DotBuilder, attr_key: str, sig: Optional[int], source_name_str: str
+) -> None:
+    pin_label_base = PERIPHERAL_INPUT_LABELS[attr_key]
+    peripheral_pin_id = f"pin_{attr_key}"
+    dot.add_pin(
+        peripheral_pin_id, pin_label_base, cls="pin_peripheral_input", rank="sink"
+    )
+    if sig is not None:
+        src = _resolve_source(dot, sig, None)
+    else:
+        src = f"pin_{source_name_str}:e"
+        dot.add_pin(
+            f"pin_{source_name_str}", source_name_str, cls="pin_input", rank="source"
         )
-        if name is not None:
-            pin_name = f"pin_{name}"
-            if pin_name not in dot.nodes:
-                dot.add_pin(
-                    pin_name, name, cls="pin_input unmapped_enum_source", rank="source"
-                )
-            return pin_name, ":e"
-        return None, ""
-
-    if name is not None:
-        print(f"Warning: Treating unknown source '{name}' as an external pin.")
-        pin_name = f"pin_{name}"
-        if pin_name not in dot.nodes:
-            dot.add_pin(pin_name, name, cls="pin_input unknown_source", rank="source")
-        return pin_name, ":e"
-
-    return None, ""
+    dot.add_edge(
+        src,
+        f"{peripheral_pin_id}:w",
+        f"{source_name_str} to {pin_label_base}",
+    )
+
+
+@dataclass
+class NetlistIndex:
+    """Which BLE output drives which consumer, see :func:`build_netlist_index`.
+
+    Consumers are named by :func:`clb_netlist.sink_name`: ``BLE{i}.LUT_I_{A-D}``,
+    ``PPS_OUT{n}``, ``OE{n}``, ``IRQ_OUT{n}``, ``COUNTER.CNT_STOP``,
+    ``COUNTER.CNT_RESET`` and the peripheral input attributes (``TIMR0_IN``
+    ...).
+    """
+
+    # driver BLE index -> consumers it feeds
+    consumers: dict[int, list[str]] = field(default_factory=dict)
+    # consumer -> driver BLE index
+    drivers: dict[str, int] = field(default_factory=dict)
+    # BLEs whose output reaches anything but their own LUT inputs
+    used: set[int] = field(default_factory=set)
+
+    def add(self, ble_idx: int | None, consumer: str, *, self_feed=False) -> None:
+        if ble_idx is None:
+            return
+        self.consumers.setdefault(ble_idx, []).append(consumer)
+        self.drivers[consumer] = ble_idx
+        if not self_feed:
+            self.used.add(ble_idx)
+
+    def ble_output_used(self, ble_idx: int) -> bool:
+        return ble_idx in self.used
+
+
+def build_netlist_index(cfg: Union[Bitstream, FASM, Netlist]) -> NetlistIndex:
+    """Index every BLE output consumer of *cfg* in one pass.
+
+    All LUT input selects count, whether or not the truth table uses them.
+    """
+    index = NetlistIndex()
+    for sig, sink in netlist_of(cfg).edges:
+        if sig < SIG_BLE + 32:
+            ble_idx = sig - SIG_BLE
+            index.add(
+                ble_idx,
+                sink_name(sink),
+                self_feed=sink < SINK_PPS and (sink - SINK_LUT) >> 2 == ble_idx,
+            )
+    return index
+
+
+def _resolve_source(dot: DotBuilder, sig: int, counter_node_id: str | None) -> str:
+    """DOT port of signal *sig*, adding its source pin if it is not a BLE."""
+    if SIG_BLE <= sig < SIG_BLE + 32:
+        return f"clb{sig - SIG_BLE}:outO:e"
+
+    name = signal_name(sig)
+    if counter_node_id is not None and name in COUNTER_OUTPUT_PORT_MAP:
+        return f"{counter_node_id}:{COUNTER_OUTPUT_PORT_MAP[name]}:e"
+
+    pin_name = f"pin_{name}"
+    dot.add_pin(pin_name, name, cls="pin_input", rank="source")
+    return f"{pin_name}:e"
 
 
 if __name__ == "__main__":
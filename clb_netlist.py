@@ -0,0 +1,323 @@
+"""Integer-coded netlist of a CLB design.
+
+:func:`netlist_of` turns a ``Bitstream`` or ``FASM`` design into a
+:class:`Netlist`: flat tuples indexed by BLE, MUX, PPS, IRQ and OE number,
+with every source expressed as an index into one signal vector and every
+connection as a ``(signal, sink)`` pair. Graph rendering, analysis and
+simulation all read this instead of matching enum names.
+
+The netlist is cached per design and rebuilt only when one of its
+configuration fields changed.
+"""
+
+import weakref
+from typing import NamedTuple, Optional, Union
+
+from data_model import FASM, FLOPSEL, COUNT_MUX_FIELDS, VAR_ORDER
+
+# Layout of the signal vector
+SIG_BLE = 0  # 32 BLE outputs
+SIG_IN = 32  # 16 input MUX outputs (after CLBInputSync)
+SIG_SWIN = 48  # 32 CLBSWIN software input bits
+SIG_COUNT_IS = 80  # 8 counter decodes, COUNT_IS_A1 ... COUNT_IS_D2
+SIG_TRIS = 88  # 8 TRIS bits selectable as output enables
+SIG_ZERO = 96  # constant 0 for unconnected selects
+SIG_COUNT = 97
+
+# LUT input select values per port (LUT_IN_x): 0-7 BLE, 8-11 IN, 12-19 CLBSWIN,
+# 20-21 COUNT_IS
+_PORT_SEL_BASE = ((0, SIG_BLE), (8, SIG_IN), (12, SIG_SWIN), (20, SIG_COUNT_IS))
+_PORT_SEL_STRIDE = {SIG_BLE: 8, SIG_IN: 4, SIG_SWIN: 8, SIG_COUNT_IS: 2}
+
+# Layout of the sink codes
+SINK_LUT = 0  # 4 * BLE + port (0-3 = A-D)
+SINK_PPS = 128  # PPS_OUT0-7
+SINK_IRQ = 136  # IRQ_OUT0-3 (CLB1IF0-3)
+SINK_OE = 140  # OE0-7
+SINK_CNT_STOP = 148
+SINK_CNT_RESET = 149
+SINK_PERIPH = 150  # PERIPHERAL_INPUT_ATTRS, in order
+SINK_COUNT = SINK_PERIPH + 8
+
+PERIPHERAL_INPUT_ATTRS = (
+    "TIMR0_IN",
+    "TIMR1_IN",
+    "TIMR1_GATE",
+    "TIMR2_IN",
+    "TIMR2_RST",
+    "CCP1_IN",
+    "CCP2_IN",
+    "ADC_IN",
+)
+
+# truth table bits whose address has input k low
+_LOW_HALF = (0x5555, 0x3333, 0x0F0F, 0x00FF)
+
+
+def lut_input_signal(port: int, sel: Optional[int]) -> int:
+    """Signal index driving LUT input *port* (0-3 = A-D) for select *sel*.
+
+    An unset select (``None``) is encoded as 0, so it reads the first BLE of
+    the port's group (BLE 0/8/16/24) like in the bitstream.
+    """
+    if sel is None:
+        sel = 0
+    for first, base in reversed(_PORT_SEL_BASE):
+        if sel >= first:
+            offset = sel - first
+            stride = _PORT_SEL_STRIDE[base]
+            if offset >= stride:
+                break
+            return base + port * stride + offset
+    raise ValueError(f"invalid LUT_I_{VAR_ORDER[port]} select {sel}")
+
+
+def active_mask(tt: int) -> int:
+    """Bit ``k`` set when truth table *tt* depends on input ``k`` (0-3 = A-D)."""
+    return sum(
+        1 << k for k, low in enumerate(_LOW_HALF) if (tt ^ (tt >> (1 << k))) & low
+    )
+
+
+def _signal_names() -> tuple[Optional[str], ...]:
+    names: list[Optional[str]] = [None] * SIG_COUNT
+    for i in range(32):
+        names[SIG_BLE + i] = f"CLB_BLE_{i}"
+        names[SIG_SWIN + i] = f"CLBSWIN{i}"
+    for i in range(16):
+        names[SIG_IN + i] = f"IN{i}"
+    for i, name in enumerate(COUNT_MUX_FIELDS):
+        names[SIG_COUNT_IS + i] = name
+    for i in range(8):
+        names[SIG_TRIS + i] = f"TRIS{i}"
+    return tuple(names)
+
+
+SIGNAL_NAMES = _signal_names()
+_SIGNAL_BY_NAME = {n: s for s, n in enumerate(SIGNAL_NAMES) if n is not None}
+
+
+def signal_name(sig: int) -> Optional[str]:
+    """Enum style name of signal *sig* (``CLB_BLE_3``, ``IN0``, ``COUNT_IS_A1``
+    ...), ``None`` for :data:`SIG_ZERO`."""
+    return SIGNAL_NAMES[sig]
+
+
+def signal_from_name(name: str) -> Optional[int]:
+    """Inverse of :func:`signal_name`; ``BLE_{i}`` is accepted for BLE outputs."""
+    sig = _SIGNAL_BY_NAME.get(name)
+    if sig is None and name.startswith("BLE_"):
+        sig = _SIGNAL_BY_NAME.get(f"CLB_{name}")
+    return sig
+
+
+def sink_name(sink: int) -> str:
+    """Name of *sink*, e.g. ``BLE5.LUT_I_C``, ``PPS_OUT0``, ``COUNTER.CNT_STOP``."""
+    if sink < SINK_PPS:
+        return f"BLE{sink >> 2}.LUT_I_{VAR_ORDER[sink & 3]}"
+    if sink < SINK_IRQ:
+        return f"PPS_OUT{sink - SINK_PPS}"
+    if sink < SINK_OE:
+        return f"IRQ_OUT{sink - SINK_IRQ}"
+    if sink < SINK_CNT_STOP:
+        return f"OE{sink - SINK_OE}"
+    if sink == SINK_CNT_STOP:
+        return "COUNTER.CNT_STOP"
+    if sink == SINK_CNT_RESET:
+        return "COUNTER.CNT_RESET"
+    return PERIPHERAL_INPUT_ATTRS[sink - SINK_PERIPH]
+
+
+class Netlist(NamedTuple):
+    """Flat form of a design, see :func:`netlist_of`.
+
+    Per BLE tuples have 32 entries, unconfigured BLEs read as a constant 0
+    LUT. Unset LUT input selects read select 0 (see :func:`lut_input_signal`),
+    other unconnected selects are :data:`SIG_ZERO`.
+    """
+
+    # LUT truth table and mask of the inputs it depends on
+    lut: tuple[int, ...]
+    active: tuple[int, ...]
+    # signal selected by LUT inputs A-D, whether used by the LUT or not
+    lut_src: tuple[tuple[int, int, int, int], ...]
+    # bit i set when BLE i has its flip-flop enabled
+    flops: int
+    # CLBIN and CLBInputSync values of MUX 0-15 (None if unconfigured)
+    mux_src: tuple[Optional[int], ...]
+    mux_sync: tuple[int, ...]
+    # CNTMUX value (or None) of COUNT_IS_A1 ... COUNT_IS_D2
+    count_is: tuple[Optional[int], ...]
+    cnt_stop: int
+    cnt_reset: int
+    # signal driving PPS_OUT0-7, CLB1IF0-3 and the output enables 0-7
+    pps: tuple[int, ...]
+    irq: tuple[int, ...]
+    oe: tuple[int, ...]
+    # (attribute, signal or None, source name) of each set peripheral input
+    periph: tuple[tuple[str, Optional[int], str], ...]
+    # (signal, sink) of every connection, in sink order
+    edges: tuple[tuple[int, int], ...]
+    # bit i set when BLE i drives anything but its own LUT inputs
+    used: int
+
+    def is_flop(self, ble: int) -> bool:
+        return bool(self.flops >> ble & 1)
+
+    def is_used(self, ble: int) -> bool:
+        return bool(self.used >> ble & 1)
+
+
+def _value(v) -> Optional[int]:
+    return None if v is None else int(v.value if hasattr(v, "value") else v)
+
+
+def _ble_signal(v) -> int:
+    v = _value(v)
+    return SIG_ZERO if v is None else SIG_BLE + v
+
+
+def _config_key(cfg: FASM) -> tuple:
+    """Every field the netlist depends on, to detect edits since the last build."""
+    counter = cfg.COUNTER
+    return (
+        tuple(
+            (
+                ble,
+                lut.LUT_CONFIG,
+                lut.FLOPSEL,
+                lut.LUT_I_A,
+                lut.LUT_I_B,
+                lut.LUT_I_C,
+                lut.LUT_I_D,
+            )
+            for ble, lut in cfg.LUTS.items()
+        ),
+        tuple((idx, mux.CLBIN, mux.INSYNC) for idx, mux in cfg.MUXS.items()),
+        tuple((inst.idx, inst.OUT) for inst in cfg.PPS_OUT.values()),
+        tuple((idx, inst.OUT) for idx, inst in cfg.IRQ_OUT.items()),
+        tuple(getattr(cfg, "OE", {}).items()),
+        tuple(
+            getattr(counter, name)
+            for name in ("CNT_STOP", "CNT_RESET", *COUNT_MUX_FIELDS)
+        ),
+        tuple(getattr(cfg, attr, None) for attr in PERIPHERAL_INPUT_ATTRS),
+    )
+
+
+def build_netlist(cfg: FASM) -> Netlist:
+    """Build the netlist of *cfg* without consulting the cache."""
+    return _build_netlist(cfg, _config_key(cfg))
+
+
+def _build_netlist(
+    cfg: FASM, key: tuple, previous: Optional[tuple[tuple, Netlist]] = None
+) -> Netlist:
+    """Build the netlist of *cfg*, whose :func:`_config_key` is *key*.
+
+    BLEs whose fields equal those of the *previous* ``(key, netlist)`` are
+    copied from it.
+    """
+    lut, active, lut_src = [0] * 32, [0] * 32, [(SIG_ZERO,) * 4] * 32
+    flops = 0
+    prev_luts, prev = ((), None) if previous is None else (previous[0][0], previous[1])
+    for n, entry in enumerate(key[0]):
+        ble, text, flopsel, *sels = entry
+        idx = ble.value
+        if n < len(prev_luts) and prev_luts[n] == entry:
+            lut[idx], active[idx] = prev.lut[idx], prev.active[idx]
+            lut_src[idx] = prev.lut_src[idx]
+            flops |= prev.flops & 1 << idx
+            continue
+        if text and len(text) == 16 and not set(text) - {"0", "1"}:
+            lut[idx] = int(text, 2)
+            active[idx] = active_mask(lut[idx])
+        lut_src[idx] = tuple(
+            lut_input_signal(p, _value(sel)) for p, sel in enumerate(sels)
+        )
+        if flopsel in (FLOPSEL.ENABLE, FLOPSEL.ENABLE.value):
+            flops |= 1 << idx
+
+    mux_src: list[Optional[int]] = [None] * 16
+    mux_sync = [0] * 16
+    for idx, mux in cfg.MUXS.items():
+        mux_src[idx] = _value(mux.CLBIN)
+        mux_sync[idx] = _value(mux.INSYNC) or 0
+
+    counter = cfg.COUNTER
+    pps = [SIG_ZERO] * 8
+    for inst in cfg.PPS_OUT.values():
+        if inst.OUT is not None:
+            pps[inst.idx] = SIG_BLE + inst.idx * 4 + inst.OUT.value
+    irq = [SIG_ZERO] * 4
+    for idx, inst in cfg.IRQ_OUT.items():
+        if inst.OUT is not None:
+            irq[idx] = SIG_BLE + idx * 8 + inst.OUT.value
+    oe = [SIG_ZERO] * 8
+    for idx, sel in getattr(cfg, "OE", {}).items():
+        # OESELn: 0b1xxx selects BLE 4*xxx+3, 0b0xxx selects TRIS(7 - xxx)
+        oe[idx] = SIG_BLE + 4 * (sel & 7) + 3 if sel & 8 else SIG_TRIS + 7 - sel
+    periph = tuple(
+        (attr, signal_from_name(name), name)
+        for attr in PERIPHERAL_INPUT_ATTRS
+        if isinstance(name := getattr(cfg, attr, None), str)
+    )
+    cnt_stop = _ble_signal(counter.CNT_STOP)
+    cnt_reset = _ble_signal(counter.CNT_RESET)
+
+    edges = [
+        (sig, SINK_LUT + 4 * idx + port)
+        for idx, srcs in enumerate(lut_src)
+        for port, sig in enumerate(srcs)
+    ]
+    edges += [(sig, SINK_PPS + i) for i, sig in enumerate(pps)]
+    edges += [(sig, SINK_IRQ + i) for i, sig in enumerate(irq)]
+    edges += [(sig, SINK_OE + i) for i, sig in enumerate(oe)]
+    edges += [(cnt_stop, SINK_CNT_STOP), (cnt_reset, SINK_CNT_RESET)]
+    edges += [
+        (sig, SINK_PERIPH + PERIPHERAL_INPUT_ATTRS.index(attr))
+        for attr, sig, _ in periph
+        if sig is not None
+    ]
+
+    edges = [(sig, sink) for sig, sink in edges if sig != SIG_ZERO]
+    used = 0
+    for sig, sink in edges:
+        if sig < SIG_BLE + 32 and not (sink < SINK_PPS and sink >> 2 == sig):
+            used |= 1 << sig
+
+    return Netlist(
+        lut=tuple(lut),
+        active=tuple(active),
+        lut_src=tuple(lut_src),
+        flops=flops,
+        mux_src=tuple(mux_src),
+        mux_sync=tuple(mux_sync),
+        count_is=tuple(_value(getattr(counter, name)) for name in COUNT_MUX_FIELDS),
+        cnt_stop=cnt_stop,
+        cnt_reset=cnt_reset,
+        pps=tuple(pps),
+        irq=tuple(irq),
+        oe=tuple(oe),
+        periph=periph,
+        edges=tuple(edges),
+        used=used,
+    )
+
+
+# design -> (_config_key, Netlist); kept outside the designs like
+# ``bitstream._SYNC`` so it never shows up in vars() or copies of them.
+_NETLISTS: "weakref.WeakKeyDictionary[FASM, tuple]" = weakref.WeakKeyDictionary()
+
+
+def netlist_of(cfg: Union[FASM, Netlist]) -> Netlist:
+    """The :class:`Netlist` of *cfg*, cached per design between edits."""
+    if isinstance(cfg, Netlist):
+        return cfg
+    key = _config_key(cfg)
+    cached = _NETLISTS.get(cfg)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    netlist = _build_netlist(cfg, key, cached)
+    _NETLISTS[cfg] = (key, netlist)
+    return netlist
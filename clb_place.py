@@ -0,0 +1,278 @@
+"""Offline placement of a netlist of BLE cells onto the 32 BLEs.
+
+A LUT input port only reaches one group of eight BLEs (port A: BLE 0-7,
+B: 8-15, C: 16-23, D: 24-31) besides its own fixed ``IN``/``CLBSWIN``/
+``COUNT_IS`` signals. So once every cell has a group, each reference to
+another cell is wired to that group's port, and placing a netlist comes
+down to colouring the cells with four groups such that:
+
+* the cells read by one cell are in pairwise different groups,
+* none of them is in the group of the port of a fixed signal it also reads,
+* no group gets more cells than it has free BLEs.
+
+Fixed signals that would need the same port (``auto_ble.assign_ports``
+decides which ones) are read through a route-through cell instead, a BLE
+that just passes the signal on and is placed like any other cell.
+
+The groups are found by backtracking over 4-bit domains, always branching
+on the cell with the fewest groups left and removing the chosen group from
+the cells it conflicts with (forward checking), which places typical
+designs in well under a millisecond. Within a group cells take the lowest
+free BLEs in netlist order.
+
+    cells = {
+        "x": Cell(LUT_IN.IN0 ^ LUT_IN.IN4),  # an AutoBLE expression
+        "y": Cell(a & ~b, "x", LUT_IN.CLBSWIN0),  # a = x, b = CLBSWIN0
+        "q": Cell(a ^ b, "q", "y", flopsel=True),
+    }
+    placement = place(cells)
+    placement.bles["y"], placement.bitstream
+"""
+
+from typing import Callable, Iterable, Mapping, NamedTuple, Optional, Union
+
+from auto_ble import LUT_IN, _SigExpr, _permute, assign_ports
+from bitstream import Bitstream
+from build_lut import LUT4, Expr
+from clb_netlist import active_mask
+from data_model import BLE_CFG, BLEXY, FLOPSEL, LUT_IN_A, LUT_IN_B, LUT_IN_C, LUT_IN_D
+
+_PORT_ENUMS = (LUT_IN_A, LUT_IN_B, LUT_IN_C, LUT_IN_D)
+_GROUP_SIZE = 8
+
+Source = Union[LUT_IN, str]  # a fixed signal or the name of another cell
+
+
+def _port(sig: LUT_IN) -> int:
+    return "ABCD".index(sig._port)
+
+
+def route_name(sig: LUT_IN) -> str:
+    """Name of the cell that passes *sig* through to another port."""
+    return f"route:{sig.name}"
+
+
+class Cell:
+    """One BLE of a netlist.
+
+    *fn* is either an ``auto_ble`` expression of ``LUT_IN`` signals (then no
+    *inputs* are given), or a ``build_lut`` expression, a callable of four
+    bools or a truth table over the variables ``a``-``d``, which are bound
+    to *inputs* in order (variables past the last input read 0). An input
+    is a ``LUT_IN`` signal or the name of another cell, whose BLE output it
+    then reads.
+
+    Signals that cannot get a port of their own (e.g. ``IN0`` and ``IN1``,
+    both only selectable on port A) are read through a route-through cell
+    named ``route_name(signal)``, which :func:`place` adds to the netlist.
+    """
+
+    __slots__ = ("tt", "inputs", "routes", "flopsel")
+
+    def __init__(
+        self,
+        fn: Union[LUT_IN, _SigExpr, Expr, Callable[..., bool], int],
+        *inputs: Source,
+        flopsel: bool = False,
+    ) -> None:
+        if isinstance(fn, LUT_IN):
+            fn = fn._expr()
+        if isinstance(fn, _SigExpr):
+            if inputs:
+                raise TypeError("an auto_ble expression carries its own inputs")
+            if fn.sig_tt is None:  # mixed with a plain Expr, see AutoBLE
+                tt = fn.tt
+                inputs = tuple(fn.signals)
+                used = {_port(sig): sig for sig in inputs}
+                if len(used) != len(inputs):
+                    raise ValueError("two signals of the expression share a port")
+            else:
+                tt = fn.sig_tt
+                inputs = tuple(LUT_IN(v) for v in fn.sig_order)
+                used = dict(enumerate(inputs))
+        else:
+            tt = fn if isinstance(fn, int) else LUT4(fn).tt
+            used = dict(enumerate(inputs))
+        if len(inputs) > 4:
+            raise ValueError("a 4-input LUT has at most four inputs")
+        # to 16 rows, variables without an input read 0
+        tt = _permute(tt & 0xFFFF, {v: v for v in used})
+        mask = active_mask(tt)
+        used = {v: src for v, src in used.items() if mask >> v & 1}
+
+        fixed = {int(src): src for src in used.values() if not isinstance(src, str)}
+        routes = []
+        for sig, routed in zip(
+            fixed.values(), assign_ports(list(fixed.values())).routed
+        ):
+            if routed:
+                routes.append(sig)
+                for v, src in used.items():
+                    if src is sig:
+                        used[v] = route_name(sig)
+        self.tt = tt
+        # (LUT variable, source), without the variables tt does not depend on
+        self.inputs: tuple[tuple[int, Source], ...] = tuple(used.items())
+        self.routes: tuple[LUT_IN, ...] = tuple(routes)
+        self.flopsel = flopsel
+
+    def __repr__(self) -> str:
+        srcs = ", ".join(getattr(src, "name", repr(src)) for _, src in self.inputs)
+        return f"Cell(0x{self.tt:04X}, {srcs}, flopsel={self.flopsel})"
+
+
+class Placement(NamedTuple):
+    bles: dict[str, BLEXY]
+    bitstream: Bitstream
+
+
+def _assign_groups(
+    groups: list[int], domains: list[int], conflicts: list[int], room: list[int]
+) -> bool:
+    """Fill in the ``-1`` entries of *groups* (a bit index into each cell's
+    domain) so that no two conflicting cells share a group and group ``g``
+    gets at most ``room[g]`` more cells."""
+    n = len(groups)
+
+    def search(domains: list[int], room: list[int], left: int) -> bool:
+        if not left:
+            return True
+        # most constrained cell first, ties broken by most conflicts
+        best, best_key = -1, None
+        for i in range(n):
+            if groups[i] < 0:
+                key = (domains[i].bit_count(), -conflicts[i].bit_count())
+                if best_key is None or key < best_key:
+                    best, best_key = i, key
+        dom = domains[best]
+        for g in sorted(range(4), key=lambda g: -room[g]):  # emptiest first
+            if not dom >> g & 1:
+                continue
+            bit = 1 << g
+            new = domains[:]
+            # forward checking: conflicting cells, and everyone once g is full
+            others = conflicts[best]
+            if room[g] == 1:
+                others = (1 << n) - 1
+            ok = True
+            while others:
+                j = (others & -others).bit_length() - 1
+                others &= others - 1
+                if groups[j] < 0 and j != best:
+                    new[j] &= ~bit
+                    if not new[j]:
+                        ok = False
+                        break
+            if not ok:
+                continue
+            new_room = room[:]
+            new_room[g] -= 1
+            groups[best] = g
+            if search(new, new_room, left - 1):
+                return True
+            groups[best] = -1
+        return False
+
+    return search(domains, room, groups.count(-1))
+
+
+def place(
+    cells: Mapping[str, Cell],
+    *,
+    pinned: Optional[Mapping[str, BLEXY]] = None,
+    reserved: Iterable[BLEXY] = (),
+    bitstream: Optional[Bitstream] = None,
+) -> Placement:
+    """Assign every cell to a BLE so that all its inputs are reachable and
+    write the BLE configurations into *bitstream* (a new one by default).
+
+    *pinned* fixes the BLE of some cells (e.g. those driving a PPS output),
+    *reserved* BLEs are left alone. Raises ``ValueError`` when the netlist
+    cannot be placed.
+    """
+    pinned = dict(pinned or {})
+    cells = dict(cells)
+    for cell in list(cells.values()):
+        for sig in cell.routes:
+            cells.setdefault(route_name(sig), Cell(sig))
+    names = list(cells)
+    index = {name: i for i, name in enumerate(names)}
+    for name in pinned:
+        if name not in index:
+            raise ValueError(f"pinned cell {name!r} is not in the netlist")
+
+    taken = {ble.value for ble in reserved}
+    for name, ble in pinned.items():
+        if ble.value in taken:
+            raise ValueError(f"{name!r} pinned to {ble.name}, which is taken")
+        taken.add(ble.value)
+    room = [
+        sum(1 for b in range(g * _GROUP_SIZE, (g + 1) * _GROUP_SIZE) if b not in taken)
+        for g in range(4)
+    ]
+    if len(cells) - len(pinned) > sum(room):
+        raise ValueError(f"{len(cells)} cells do not fit into the free BLEs")
+
+    domains = [0b1111] * len(names)
+    conflicts = [0] * len(names)
+    for name, cell in cells.items():
+        fixed_ports = 0
+        sources = []
+        for _, src in cell.inputs:
+            if isinstance(src, str):
+                if src not in index:
+                    raise ValueError(f"{name!r} reads unknown cell {src!r}")
+                sources.append(index[src])
+            else:
+                fixed_ports |= 1 << _port(src)
+        for i in sources:
+            domains[i] &= ~fixed_ports
+            conflicts[i] |= sum(1 << j for j in sources if j != i)
+    groups = [-1] * len(names)
+    for name, ble in pinned.items():
+        i, g = index[name], ble.value // _GROUP_SIZE
+        if not domains[i] >> g & 1:
+            raise ValueError(
+                f"{name!r} pinned to {ble.name}, its readers cannot see it"
+            )
+        groups[i] = g
+        others = conflicts[i]
+        for j in range(len(names)):
+            if others >> j & 1:
+                domains[j] &= ~(1 << g)
+    open_groups = sum(1 << g for g in range(4) if room[g])
+    for i, dom in enumerate(domains):
+        if groups[i] < 0:
+            dom = domains[i] = dom & open_groups
+        if not dom:
+            raise ValueError(f"no BLE group can feed {names[i]!r} to its readers")
+
+    if not _assign_groups(groups, domains, conflicts, room):
+        raise ValueError("no legal placement of the netlist")
+
+    bles: dict[str, BLEXY] = dict(pinned)
+    free = [
+        [b for b in range(g * _GROUP_SIZE, (g + 1) * _GROUP_SIZE) if b not in taken]
+        for g in range(4)
+    ]
+    for name, g in zip(names, groups):
+        if name not in bles:
+            bles[name] = BLEXY(free[g].pop(0))
+
+    bs = bitstream if bitstream is not None else Bitstream()
+    for name, cell in cells.items():
+        ports, selects = {}, {}
+        for v, src in cell.inputs:
+            if isinstance(src, str):
+                p = bles[src].value // _GROUP_SIZE
+                selects[p] = _PORT_ENUMS[p](bles[src].value % _GROUP_SIZE)
+            else:
+                p = _port(src)
+                selects[p] = src._enum_member
+            ports[v] = p
+        bs.LUTS[bles[name]] = BLE_CFG(
+            LUT_CONFIG=f"{_permute(cell.tt, ports):016b}",
+            FLOPSEL=FLOPSEL.ENABLE if cell.flopsel else FLOPSEL.DISABLE,
+            **{f"LUT_I_{'ABCD'[p]}": sel for p, sel in selects.items()},
+        )
+    return Placement(bles, bs)
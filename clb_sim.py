@@ -0,0 +1,474 @@
+"""Cycle-accurate simulation of a CLB configuration.
+
+A ``Bitstream`` or ``FASM`` design is compiled once (:func:`compile_clb`) into
+flat tuples over a signal vector, then :class:`CLBSimulator` steps it one CLB
+clock at a time.
+
+Model assumptions (the silicon is undocumented, these follow the datasheet
+block diagrams and the configurator's behaviour):
+
+* One :meth:`CLBSimulator.step` is one CLB clock, i.e. after ``CLKDIV``.
+* Input MUX ``i`` drives ``IN{i}``. ``EDGE_INVERT`` inverts the selected
+  source, ``SYNC`` delays it through one register and ``EDGE_DETECT`` then
+  outputs a one cycle pulse on its rising edge.
+* BLEs with ``FLOPSEL`` enabled output a D flip-flop fed by their LUT. All
+  flip-flops, synchroniser registers and the counter start at 0.
+* The counter is 3 bits wide. On each clock it is cleared when the
+  ``CNT_RESET`` BLE is high (reset wins), otherwise it counts up unless the
+  ``CNT_STOP`` BLE is high. ``COUNT_IS_xN`` is high while the count equals
+  its ``CNTMUX`` value.
+* Unconfigured selects (``None``) read as 0, as does ``CLBIN.ZERO``. LUT
+  inputs that the truth table does not depend on are ignored, so they do not
+  create false combinational loops.
+"""
+
+from typing import Iterable, Iterator, Mapping, NamedTuple, Optional, Union
+
+from bitstream import Bitstream
+from clb_netlist import (
+    Netlist,
+    SIG_BLE,
+    SIG_IN,
+    SIG_SWIN,
+    SIG_COUNT_IS,
+    SIG_TRIS,
+    SIG_ZERO,
+    SIG_COUNT,
+    netlist_of,
+)
+from data_model import FASM, CLBIN, CLBInputSync
+
+
+class CombinationalLoopError(ValueError):
+    """The design contains a loop of BLEs without a flip-flop."""
+
+    def __init__(self, message: str, bles: tuple[int, ...]) -> None:
+        super().__init__(message)
+        self.bles = bles
+
+
+class CompiledCLB(NamedTuple):
+    """Flat, precompiled form of a design, see :func:`compile_clb`."""
+
+    # (ble, truth table, sig A, sig B, sig C, sig D) in evaluation order
+    comb: tuple[tuple[int, int, int, int, int, int], ...]
+    # same, for BLEs whose LUT feeds a flip-flop
+    flops: tuple[tuple[int, int, int, int, int, int], ...]
+    # (ble, value) of combinational BLEs whose LUT is constant
+    consts: tuple[tuple[int, int], ...]
+    # (IN index, CLBIN source or None, invert, sync, edge detect)
+    muxes: tuple[tuple[int, Optional[int], int, bool, bool], ...]
+    # CNTMUX value (or None) of COUNT_IS_A1 ... COUNT_IS_D2
+    count_is: tuple[Optional[int], ...]
+    cnt_stop: int
+    cnt_reset: int
+    # signal index driving PPS_OUT0-7, CLB1IF0-3 and the output enables 0-7
+    pps: tuple[int, ...]
+    irq: tuple[int, ...]
+    oe: tuple[int, ...]
+
+
+def compile_clb(cfg: Union[Bitstream, FASM, Netlist]) -> CompiledCLB:
+    """Compile *cfg* into flat evaluation tables.
+
+    Combinational BLEs are put in topological order; a loop between them
+    raises :class:`CombinationalLoopError`.
+    """
+    net = netlist_of(cfg)
+    comb: dict[int, tuple[int, int, int, int, int, int]] = {}
+    flops, consts = [], []
+    for idx in range(32):
+        tt, active = net.lut[idx], net.active[idx]
+        srcs = tuple(
+            sig if active >> p & 1 else SIG_ZERO
+            for p, sig in enumerate(net.lut_src[idx])
+        )
+        entry = (idx, tt, *srcs)
+        if net.is_flop(idx):
+            flops.append(entry)
+        elif not active:
+            consts.append((idx, tt & 1))
+        else:
+            comb[idx] = entry
+
+    # Kahn's algorithm over the combinational BLEs
+    deps = {
+        idx: {s - SIG_BLE for s in e[2:] if s < SIG_BLE + 32 and s - SIG_BLE in comb}
+        for idx, e in comb.items()
+    }
+    order, ready = [], sorted(idx for idx, d in deps.items() if not d)
+    users: dict[int, list[int]] = {idx: [] for idx in comb}
+    for idx, d in deps.items():
+        for src in d:
+            users[src].append(idx)
+    while ready:
+        idx = ready.pop(0)
+        order.append(comb[idx])
+        for user in users[idx]:
+            deps[user].discard(idx)
+            if not deps[user]:
+                ready.append(user)
+    if len(order) != len(comb):
+        stuck = tuple(sorted(idx for idx, d in deps.items() if d))
+        raise CombinationalLoopError(
+            f"combinational loop through BLEs {', '.join(map(str, stuck))}", stuck
+        )
+
+    muxes = []
+    for idx, (src, sync) in enumerate(zip(net.mux_src, net.mux_sync)):
+        if src == CLBIN.ZERO:
+            src = None
+        muxes.append(
+            (
+                idx,
+                src,
+                int(bool(sync & CLBInputSync.EDGE_INVERT)),
+                bool(sync & CLBInputSync.SYNC),
+                bool(sync & CLBInputSync.EDGE_DETECT),
+            )
+        )
+
+    return CompiledCLB(
+        comb=tuple(order),
+        flops=tuple(flops),
+        consts=tuple(consts),
+        muxes=tuple(muxes),
+        count_is=net.count_is,
+        cnt_stop=net.cnt_stop,
+        cnt_reset=net.cnt_reset,
+        pps=net.pps,
+        irq=net.irq,
+        oe=net.oe,
+    )
+
+
+class SimOutputs(NamedTuple):
+    """Outputs of one cycle, bit ``n`` is PPS_OUTn / CLB1IFn / OEn."""
+
+    pps: int
+    irq: int
+    oe: int
+
+
+class CLBSimulator:
+    """Clock-by-clock simulator of a compiled design.
+
+    ``inputs`` of :meth:`step` maps ``CLBIN`` sources to their level for that
+    cycle (missing sources are 0). ``swin`` (CLBSWIN0-31) and ``tris`` (TRIS
+    bits used by ``OESELn.TRISx``) are registers that keep their value
+    between cycles.
+    """
+
+    def __init__(self, cfg: Union[Bitstream, FASM, CompiledCLB]) -> None:
+        self.program = prog = cfg if isinstance(cfg, CompiledCLB) else compile_clb(cfg)
+        # MUXes without a source or inversion always read 0
+        muxes = [m for m in prog.muxes if m[1] is not None or m[2]]
+        self._direct = tuple(
+            (SIG_IN + idx, src, invert)
+            for idx, src, invert, sync, edge in muxes
+            if not (sync or edge)
+        )
+        self._registered = tuple(m for m in muxes if m[3] or m[4])
+        self._count_is = tuple(
+            (SIG_COUNT_IS + k, val)
+            for k, val in enumerate(prog.count_is)
+            if val is not None
+        )
+        self._outs = tuple(
+            tuple((k, sig) for k, sig in enumerate(sigs) if sig != SIG_ZERO)
+            for sigs in (prog.pps, prog.irq, prog.oe)
+        )
+        self.reset()
+
+    def reset(self) -> None:
+        """Clear all registers, as after loading the configuration."""
+        self.signals = [0] * SIG_COUNT
+        for idx, val in self.program.consts:
+            self.signals[SIG_BLE + idx] = val
+        self.swin = 0
+        self.tris = 0
+        self.count = 0
+        self.cycle = 0
+        self._sync = [0] * 16
+        self._edge = [0] * 16
+        self._decode_count()
+
+    def _decode_count(self) -> None:
+        s, count = self.signals, self.count
+        for sig, val in self._count_is:
+            s[sig] = int(count == val)
+
+    def _set_register(self, base: int, width: int, value: int) -> None:
+        s = self.signals
+        for k in range(width):
+            s[base + k] = value >> k & 1
+
+    def step(
+        self,
+        inputs: Optional[Mapping[CLBIN | int, int]] = None,
+        *,
+        swin: Optional[int] = None,
+        tris: Optional[int] = None,
+    ) -> SimOutputs:
+        """Evaluate one cycle and clock all registers.
+
+        Returns the outputs as seen during the cycle, before the clock edge.
+        """
+        prog = self.program
+        s = self.signals
+        if swin is not None and swin != self.swin:
+            self.swin = swin
+            self._set_register(SIG_SWIN, 32, swin)
+        if tris is not None and tris != self.tris:
+            self.tris = tris
+            self._set_register(SIG_TRIS, 8, tris)
+
+        # input MUXes
+        inputs = inputs or {}
+        for sig, src, invert in self._direct:
+            s[sig] = (1 if src is not None and inputs.get(src) else 0) ^ invert
+        sync_q, edge_q = self._sync, self._edge
+        for idx, src, invert, sync, edge in self._registered:
+            x = (1 if src is not None and inputs.get(src) else 0) ^ invert
+            v = sync_q[idx] if sync else x
+            sync_q[idx] = x
+            s[SIG_IN + idx] = v & (edge_q[idx] ^ 1) if edge else v
+            edge_q[idx] = v
+
+        # combinational BLEs in topological order (SIG_BLE is 0)
+        for idx, tt, a, b, c, d in prog.comb:
+            s[idx] = tt >> (s[a] | s[b] << 1 | s[c] << 2 | s[d] << 3) & 1
+
+        out = SimOutputs(*(sum(s[sig] << k for k, sig in sigs) for sigs in self._outs))
+
+        # clock edge
+        count = self.count
+        if s[prog.cnt_reset]:
+            self.count = 0
+        elif not s[prog.cnt_stop]:
+            self.count = (count + 1) & 7
+        if self.count != count:
+            self._decode_count()
+        nxt = [
+            (idx, tt >> (s[a] | s[b] << 1 | s[c] << 2 | s[d] << 3) & 1)
+            for idx, tt, a, b, c, d in prog.flops
+        ]
+        for idx, val in nxt:
+            s[idx] = val
+        self.cycle += 1
+        return out
+
+    def run(
+        self, stimulus: Iterable[Optional[Mapping[CLBIN | int, int]]]
+    ) -> Iterator[SimOutputs]:
+        """Step once per item of *stimulus* and yield each cycle's outputs."""
+        for inputs in stimulus:
+            yield self.step(inputs)
+
+    def ble_outputs(self) -> int:
+        """BLE outputs, bit ``i`` is BLE ``i``.
+
+        Combinational BLEs hold their value of the last cycle, flip-flops
+        their value after its clock edge.
+        """
+        return sum(v << i for i, v in enumerate(self.signals[SIG_BLE : SIG_BLE + 32]))
+
+
+def _reduce_lut(tt: int, srcs: tuple[int, ...]) -> tuple[int, tuple[int, ...]]:
+    """Cofactor inputs tied to ``SIG_ZERO`` out of *tt*.
+
+    Returns the truth table over the remaining inputs and their signals.
+    """
+    keep = [p for p, sig in enumerate(srcs) if sig != SIG_ZERO]
+    small = 0
+    for w in range(1 << len(keep)):
+        row = sum(1 << p for k, p in enumerate(keep) if w >> k & 1)
+        small |= (tt >> row & 1) << w
+    return small, tuple(srcs[p] for p in keep)
+
+
+def exhaustive_patterns(n: int) -> list[int]:
+    """Lane patterns of *n* inputs covering all ``2**n`` combinations.
+
+    Pattern ``j`` has bit ``k`` set when bit ``j`` of ``k`` is set, so vector
+    ``k`` of a ``2**n`` wide :class:`VectorSimulator` sees input combination
+    ``k``.
+    """
+    width = 1 << n
+    return [
+        int(("1" * (1 << j) + "0" * (1 << j)) * (width >> (j + 1)), 2) for j in range(n)
+    ]
+
+
+class VectorOutputs(NamedTuple):
+    """Outputs of one cycle, one lane value per PPS_OUTn / CLB1IFn / OEn."""
+
+    pps: tuple
+    irq: tuple
+    oe: tuple
+
+
+class VectorSimulator(CLBSimulator):
+    """Bit-sliced simulator running *width* independent test vectors at once.
+
+    Every signal is a lane value: a Python int, or with ``use_numpy`` a
+    ``uint64`` array of ``ceil(width / 64)`` words, whose bit ``k`` is the
+    signal in vector ``k``. LUTs are evaluated as a mux tree over their
+    inputs, so each operation advances all vectors. ``inputs``, ``swin`` and
+    ``tris`` take lane values, use :meth:`lanes` to build them from ints;
+    ``swin`` and ``tris`` map a bit index to a lane value and are kept
+    between cycles. The model is the same as :class:`CLBSimulator`.
+    """
+
+    def __init__(
+        self,
+        cfg: Union[Bitstream, FASM, CompiledCLB],
+        width: int = 64,
+        *,
+        use_numpy: bool = False,
+    ) -> None:
+        self.width = width
+        if use_numpy:
+            import numpy as np
+
+            self._np = np
+            n = -(-width // 64)
+            self.zero = np.zeros(n, dtype=np.uint64)
+            self.ones = np.full(n, np.iinfo(np.uint64).max, dtype=np.uint64)
+            if width % 64:
+                self.ones[-1] = np.uint64((1 << width % 64) - 1)
+        else:
+            self._np = None
+            self.zero, self.ones = 0, (1 << width) - 1
+        super().__init__(cfg)
+        self._luts = tuple(
+            (idx, *_reduce_lut(tt, srcs)) for idx, tt, *srcs in self.program.comb
+        )
+        self._flop_luts = tuple(
+            (idx, *_reduce_lut(tt, srcs)) for idx, tt, *srcs in self.program.flops
+        )
+
+    def lanes(self, value: int):
+        """Convert an int (bit ``k`` = vector ``k``) into a lane value."""
+        value &= (1 << self.width) - 1
+        if self._np is None:
+            return value
+        n = len(self.zero)
+        return self._np.frombuffer(value.to_bytes(8 * n, "little"), dtype="<u8").astype(
+            self._np.uint64
+        )
+
+    def to_int(self, lanes) -> int:
+        """Inverse of :meth:`lanes`."""
+        if self._np is None:
+            return lanes
+        return int.from_bytes(lanes.astype("<u8").tobytes(), "little")
+
+    def reset(self) -> None:
+        zero, ones = self.zero, self.ones
+        self.signals = [zero] * SIG_COUNT
+        for idx, val in self.program.consts:
+            self.signals[SIG_BLE + idx] = ones if val else zero
+        self.swin = {}
+        self.tris = {}
+        self._count = [zero, zero, zero]
+        self.cycle = 0
+        self._sync = [zero] * 16
+        self._edge = [zero] * 16
+        self._decode_count()
+
+    @property
+    def count(self) -> list[int]:
+        """Counter value of every vector."""
+        c0, c1, c2 = (self.to_int(c) for c in self._count)
+        return [
+            (c0 >> k & 1) | (c1 >> k & 1) << 1 | (c2 >> k & 1) << 2
+            for k in range(self.width)
+        ]
+
+    def _decode_count(self) -> None:
+        s, ones = self.signals, self.ones
+        for sig, val in self._count_is:
+            term = ones
+            for bit, plane in enumerate(self._count):
+                term = term & (plane if val >> bit & 1 else plane ^ ones)
+            s[sig] = term
+
+    def _eval_lut(self, tt: int, srcs: tuple[int, ...]):
+        s, zero, ones = self.signals, self.zero, self.ones
+        level = [ones if tt >> w & 1 else zero for w in range(1 << len(srcs))]
+        for src in srcs:
+            sel = s[src]
+            nxt = []
+            for x, y in zip(level[0::2], level[1::2]):
+                if x is y:
+                    nxt.append(x)
+                elif x is zero and y is ones:
+                    nxt.append(sel)
+                elif x is ones and y is zero:
+                    nxt.append(sel ^ ones)
+                else:
+                    nxt.append(x ^ (sel & (x ^ y)))
+            level = nxt
+        return level[0]
+
+    def step(
+        self,
+        inputs: Optional[Mapping[CLBIN | int, object]] = None,
+        *,
+        swin: Optional[Mapping[int, object]] = None,
+        tris: Optional[Mapping[int, object]] = None,
+    ) -> VectorOutputs:
+        """Evaluate one cycle of every vector and clock all registers."""
+        prog = self.program
+        s, zero, ones = self.signals, self.zero, self.ones
+        registers = ((SIG_SWIN, self.swin, swin), (SIG_TRIS, self.tris, tris))
+        for base, regs, new in registers:
+            for k, v in (new or {}).items():
+                regs[k] = s[base + k] = v
+
+        # input MUXes
+        inputs = inputs or {}
+        for sig, src, invert in self._direct:
+            x = zero if src is None else inputs.get(src, zero)
+            s[sig] = x ^ ones if invert else x
+        sync_q, edge_q = self._sync, self._edge
+        for idx, src, invert, sync, edge in self._registered:
+            x = zero if src is None else inputs.get(src, zero)
+            if invert:
+                x = x ^ ones
+            v = sync_q[idx] if sync else x
+            sync_q[idx] = x
+            s[SIG_IN + idx] = v & (edge_q[idx] ^ ones) if edge else v
+            edge_q[idx] = v
+
+        # combinational BLEs in topological order (SIG_BLE is 0)
+        for idx, tt, srcs in self._luts:
+            s[idx] = self._eval_lut(tt, srcs)
+
+        out = VectorOutputs(
+            tuple(s[sig] for sig in prog.pps),
+            tuple(s[sig] for sig in prog.irq),
+            tuple(s[sig] for sig in prog.oe),
+        )
+
+        # clock edge: 3 bit-sliced counter planes, reset wins over stop
+        c0, c1, c2 = self._count
+        inc = s[prog.cnt_stop] ^ ones
+        keep = s[prog.cnt_reset] ^ ones
+        carry = inc & c0
+        self._count = [
+            (c0 ^ inc) & keep,
+            (c1 ^ carry) & keep,
+            (c2 ^ (carry & c1)) & keep,
+        ]
+        self._decode_count()
+        nxt = [(idx, self._eval_lut(tt, srcs)) for idx, tt, srcs in self._flop_luts]
+        for idx, val in nxt:
+            s[idx] = val
+        self.cycle += 1
+        return out
+
+    def ble_outputs(self) -> list:
+        """Lane value of every BLE output, see :meth:`CLBSimulator.ble_outputs`."""
+        return self.signals[SIG_BLE : SIG_BLE + 32]
@@ -0,0 +1,3 @@
+"""Makes the ``ci`` hypothesis profile known before pytest loads it."""
+
+import design_fixtures  # noqa: F401
@@ -0,0 +1,193 @@
+"""Parallel FASM vs JSON consistency check over a corpus of synthesizer runs.
+
+Does what ``test_bitstream_existing_data.py`` does, for large corpora: the
+case directories (one ``.fasm`` and at least one ``.json``) are found with a
+single ``os.walk``, the cases are checked in a process pool and one line per
+case is streamed out as results arrive. Results are cached by the size and
+mtime of the case's files (falling back to a hash of their contents, taken
+in the workers, when those changed), so unchanged cases are not checked
+again. The cache also records a hash of the checking code and is dropped
+when that changed.
+
+    python corpus_check.py CORPUS_DIR [-j JOBS] [--cache FILE]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from multiprocessing import Pool
+from pathlib import Path
+from typing import Iterator, NamedTuple, Optional
+
+import bitstream
+import clb_netlist
+import data_model
+import design_diff
+from bitstream import Bitstream
+from data_model import BITSTREAM_LAYOUT, FASM
+from design_cache import _source_hash
+from design_diff import diff_designs
+
+
+class Case(NamedTuple):
+    dir_path: Path
+    fasm_path: Path
+    json_paths: tuple[Path, ...]  # candidates, the first bitstream one is used
+
+
+class CaseResult(NamedTuple):
+    dir_path: Path
+    status: str  # "pass", "fail", "error" or "skip" (no bitstream JSON)
+    message: str = ""
+    cached: bool = False
+    digest: str = ""  # hash of the case's files, see _digest
+
+
+def discover_cases(base_dir: Path) -> list[Case]:
+    """Directories below *base_dir* with exactly one ``.fasm`` and a ``.json``."""
+    cases = []
+    for root, _, files in os.walk(base_dir):
+        fasm = [f for f in files if f.endswith(".fasm")]
+        jsons = sorted(f for f in files if f.endswith(".json"))
+        if len(fasm) == 1 and jsons:
+            root_path = Path(root)
+            cases.append(
+                Case(
+                    root_path,
+                    root_path / fasm[0],
+                    tuple(root_path / f for f in jsons),
+                )
+            )
+    cases.sort()
+    return cases
+
+
+def _load_bitstream(case: Case) -> Optional[Bitstream]:
+    for path in case.json_paths:
+        try:
+            return Bitstream(path)
+        except (ValueError, TypeError, KeyError):
+            continue
+    return None
+
+
+def check_case(case: Case, cached: Optional[dict] = None) -> CaseResult:
+    """Compare every field the FASM file sets with the bitstream.
+
+    *cached* is the cache entry of a case whose files were touched, its
+    result is reused when their content did not change.
+    """
+    digest = ""
+    try:
+        digest = _digest(case)
+        if cached is not None and cached["digest"] == digest:
+            status, message = cached["status"], cached["message"]
+            return CaseResult(case.dir_path, status, message, True, digest)
+        bs = _load_bitstream(case)
+        if bs is None:
+            return CaseResult(case.dir_path, "skip", "no bitstream JSON", False, digest)
+        fasm = FASM(case.fasm_path)
+        mismatches = [
+            c
+            for c in diff_designs(fasm, bs)
+            if c.name in BITSTREAM_LAYOUT and c.old is not None
+        ]
+    except Exception as e:
+        message = f"{type(e).__name__}: {e}"
+        return CaseResult(case.dir_path, "error", message, False, digest)
+    if mismatches:
+        msg = ", ".join(f"{c.name} {c.old} != {c.new}" for c in mismatches)
+        return CaseResult(case.dir_path, "fail", msg, False, digest)
+    return CaseResult(case.dir_path, "pass", "", False, digest)
+
+
+def _check(item: tuple[Case, Optional[dict]]) -> CaseResult:
+    return check_case(*item)
+
+
+def _fingerprint(case: Case) -> list[list[int]]:
+    stats = (p.stat() for p in (case.fasm_path, *case.json_paths))
+    return [[s.st_size, s.st_mtime_ns] for s in stats]
+
+
+def _digest(case: Case) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    for p in (case.fasm_path, *case.json_paths):
+        h.update(p.read_bytes())
+    return h.hexdigest()
+
+
+# Version of the cached results: the code that checks a case.
+_CHECK_VERSION = _source_hash(
+    data_model, bitstream, clb_netlist, design_diff, sys.modules[__name__]
+)
+
+
+def run(
+    base_dir: Path,
+    *,
+    jobs: Optional[int] = None,
+    cache_file: Optional[Path] = None,
+) -> Iterator[CaseResult]:
+    """Check every case below *base_dir*, yielding results as they finish
+    (untouched cached ones first; all reused results are marked ``cached``)."""
+    cache: dict[str, dict] = {}
+    if cache_file is not None and cache_file.exists():
+        stored = json.loads(cache_file.read_text(encoding="utf8"))
+        if stored.get("version") == _CHECK_VERSION:
+            cache = stored["cases"]
+
+    todo = []
+    fresh: dict[str, dict] = {}
+    for case in discover_cases(base_dir):
+        key, fp = str(case.dir_path), _fingerprint(case)
+        hit = cache.get(key)
+        if hit is not None and hit["fingerprint"] == fp:
+            fresh[key] = hit
+            yield CaseResult(case.dir_path, hit["status"], hit["message"], True)
+        else:
+            # new, or touched but maybe not changed: the worker compares digests
+            fresh[key] = {"fingerprint": fp}
+            todo.append((case, hit))
+
+    try:
+        if todo:
+            with Pool(jobs) as pool:
+                for result in pool.imap_unordered(_check, todo, chunksize=8):
+                    fresh[str(result.dir_path)].update(
+                        digest=result.digest,
+                        status=result.status,
+                        message=result.message,
+                    )
+                    yield result
+    finally:
+        if cache_file is not None:
+            done = {k: v for k, v in fresh.items() if "status" in v}
+            cache_file.write_text(
+                json.dumps({"version": _CHECK_VERSION, "cases": done}),
+                encoding="utf8",
+            )
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("corpus", type=Path)
+    parser.add_argument("-j", "--jobs", type=int, default=None)
+    parser.add_argument(
+        "--cache", type=Path, default=None, help="pass/fail cache (JSON file)"
+    )
+    args = parser.parse_args(argv)
+
+    counts: dict[str, int] = {}
+    for result in run(args.corpus, jobs=args.jobs, cache_file=args.cache):
+        counts[result.status] = counts.get(result.status, 0) + 1
+        if result.status != "pass":
+            print(f"{result.status.upper()} {result.dir_path}: {result.message}")
+    print(", ".join(f"{n} {status}" for status, n in sorted(counts.items())))
+    return 1 if counts.get("fail") or counts.get("error") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
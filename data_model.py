@@ -1,10 +1,11 @@
+import itertools
 import warnings
 from collections import defaultdict
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import IntFlag, Enum, IntEnum
 from pathlib import Path
 from pprint import pformat
-from typing import Optional, Union
+from typing import Iterable, Iterator, NamedTuple, Optional, Union
 
 VAR_ORDER = "ABCD"
 
@@ -369,11 +370,19 @@ class BLEXY(Enum):
         """
         Accept FASM format (i.e. BLE_X3Y4).
         """
-        for m in cls:
-            prefix, _, coords = m.name.split("_", 2)
-            if f"{prefix}_{coords}" == fasm:
-                return m
-        raise KeyError(f"No BLEXY member matches '{fasm}'")
+        try:
+            return _BLEXY_BY_FASM[fasm]
+        except KeyError:
+            raise KeyError(f"No BLEXY member matches '{fasm}'") from None
+
+    @property
+    def fasm_name(self) -> str:
+        """FASM name of this BLE (i.e. BLE_X3Y4)."""
+        prefix, _, coords = self.name.split("_", 2)
+        return f"{prefix}_{coords}"
+
+
+_BLEXY_BY_FASM: dict[str, BLEXY] = {m.fasm_name: m for m in BLEXY}
 
 
 class FLOPSEL(Enum):
@@ -489,8 +498,30 @@ class LUTConfigWarning(UserWarning):
     """Possible LUT misconfigurations."""
 
 
+_EDIT_STAMPS = itertools.count(1)
+
+
+def edit_stamp() -> int:
+    """A stamp newer than every field assignment made so far."""
+    return next(_EDIT_STAMPS)
+
+
+class _Tracked:
+    """Remembers the :func:`edit_stamp` of each attribute's last assignment,
+    so the owner of an object can tell which fields it has to re-encode."""
+
+    def __setattr__(self, name: str, value) -> None:
+        object.__setattr__(self, name, value)
+        self.__dict__.setdefault("_touched", {})[name] = next(_EDIT_STAMPS)
+
+    def touched_since(self, stamp: int) -> set[str]:
+        """Names of the attributes assigned after *stamp*."""
+        touched = self.__dict__.get("_touched", {})
+        return {name for name, t in touched.items() if t > stamp}
+
+
 @dataclass
-class BLE_CFG:
+class BLE_CFG(_Tracked):
     LUT_CONFIG: str = None  # 16 Bit
     FLOPSEL: bool = None
     LUT_I_A: LUT_IN_A = None
@@ -528,7 +559,7 @@ class BLE_CFG:
 
 
 @dataclass
-class MUX_CFG:
+class MUX_CFG(_Tracked):
     INSYNC: CLBInputSync = None
     CLBIN: CLBIN = None
 
@@ -545,7 +576,7 @@ class CNTMUX(IntEnum):
 
 
 @dataclass
-class COUNTER:
+class COUNTER(_Tracked):
     CNT_STOP: COUNTERIN = None
     CNT_RESET: COUNTERIN = None
     COUNT_IS_A1: CNTMUX = None
@@ -571,7 +602,7 @@ _CLB_ENUM: dict[int, type[IntEnum]] = {
 
 
 @dataclass
-class _PPS_OUT:
+class _PPS_OUT(_Tracked):
     """PPS-OUT val.
 
     * Accepts **either** a BLEXY **or** the correct CLBPPSOUTx value.
@@ -645,22 +676,22 @@ class PPS_OUT7(_PPS_OUT):
 
 
 @dataclass
-class IRQ_OUT0:
+class IRQ_OUT0(_Tracked):
     OUT: CLB1IF0 = None
 
 
 @dataclass
-class IRQ_OUT1:
+class IRQ_OUT1(_Tracked):
     OUT: CLB1IF1 = None
 
 
 @dataclass
-class IRQ_OUT2:
+class IRQ_OUT2(_Tracked):
     OUT: CLB1IF2 = None
 
 
 @dataclass
-class IRQ_OUT3:
+class IRQ_OUT3(_Tracked):
     OUT: CLB1IF3 = None
 
 
@@ -807,8 +838,181 @@ MUX_CFG_bits = {
 }
 
 
+@dataclass(frozen=True)
+class BitField:
+    """One field of the bitstream image.
+
+    ``bits`` are the bit addresses of the field, LSB first.  They are folded
+    into contiguous ``runs`` of ``(image shift, run mask, value shift)`` so a
+    field is read or written with a couple of shifts instead of one call per
+    bit.
+    """
+
+    name: str
+    bits: tuple[int, ...]
+    runs: tuple[tuple[int, int, int], ...] = field(init=False, repr=False)
+    mask: int = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        runs = []
+        start = 0
+        for i in range(1, len(self.bits) + 1):
+            if i == len(self.bits) or self.bits[i] != self.bits[i - 1] + 1:
+                runs.append((self.bits[start], (1 << (i - start)) - 1, start))
+                start = i
+        object.__setattr__(self, "runs", tuple(runs))
+        object.__setattr__(self, "mask", sum(1 << b for b in self.bits))
+
+    @property
+    def width(self) -> int:
+        return len(self.bits)
+
+    def extract(self, image: int) -> int:
+        """Read this field out of an image int (bit ``i`` = bitstream bit ``i``)."""
+        value = 0
+        for src, run_mask, dst in self.runs:
+            value |= ((image >> src) & run_mask) << dst
+        return value
+
+    def insert(self, image: int, value: int) -> int:
+        """Return *image* with this field set to *value*."""
+        if value < 0 or value >> len(self.bits):
+            raise ValueError(f"{value} does not fit into {len(self.bits)} bits")
+        image &= ~self.mask
+        for src, run_mask, dst in self.runs:
+            image |= ((value >> dst) & run_mask) << src
+        return image
+
+
+def _bit_field(name: str, bit_map: dict[int, int]) -> BitField:
+    return BitField(name, tuple(bit_map[i] for i in sorted(bit_map)))
+
+
+# Field layout of the whole image, built once at import.
+LUT_CONFIG_FIELDS: tuple[BitField, ...] = tuple(
+    _bit_field(f"BLE{i}.LUT_CONFIG", get_lut_setting_bits(i)) for i in range(32)
+)
+FLOPSEL_FIELDS: tuple[BitField, ...] = tuple(
+    BitField(f"BLE{i}.FLOPSEL", (get_flopsel(i),)) for i in range(32)
+)
+LUT_INPUT_FIELDS: tuple[tuple[BitField, BitField, BitField, BitField], ...] = tuple(
+    tuple(
+        _bit_field(f"BLE{i}.{name}", bit_map)
+        for name, bit_map in get_lut_input_bit_addresses(i).items()
+    )
+    for i in range(32)
+)
+MUX_CLBIN_FIELDS: tuple[BitField, ...] = tuple(
+    _bit_field(f"MUX{i}.CLBIN", MUX_CFG_bits[i]["CLBIN"]) for i in range(16)
+)
+MUX_INSYNC_FIELDS: tuple[BitField, ...] = tuple(
+    _bit_field(f"MUX{i}.INSYNC", MUX_CFG_bits[i]["INSYNC"]) for i in range(16)
+)
+PPS_OUT_FIELDS: tuple[BitField, ...] = tuple(
+    _bit_field(f"PPS_OUT{i}", PPS_OUT_BITS[PPS_OUT_NUM[i]]) for i in range(8)
+)
+IRQ_OUT_FIELDS: tuple[BitField, ...] = tuple(
+    _bit_field(f"IRQ_OUT{i}", IRQ_bits[i]) for i in range(4)
+)
+CNT_STOP_FIELD = _bit_field("COUNTER.CNT_STOP", COUNT_STOP_bits)
+CNT_RESET_FIELD = _bit_field("COUNTER.CNT_RESET", COUNT_RESET_bits)
+COUNT_MUX_FIELDS: dict[str, BitField] = {
+    name: _bit_field(f"COUNTER.{name}", bit_map)
+    for name, bit_map in COUNT_MUX_CFG_bits.items()
+}
+CLKDIV_FIELD = _bit_field("CLKDIV", CLKDIV_bits)
+
+BITSTREAM_LAYOUT: dict[str, BitField] = {
+    f.name: f
+    for f in (
+        *(
+            f
+            for i in range(32)
+            for f in (LUT_CONFIG_FIELDS[i], FLOPSEL_FIELDS[i], *LUT_INPUT_FIELDS[i])
+        ),
+        *(f for i in range(16) for f in (MUX_CLBIN_FIELDS[i], MUX_INSYNC_FIELDS[i])),
+        *PPS_OUT_FIELDS,
+        *IRQ_OUT_FIELDS,
+        CNT_STOP_FIELD,
+        CNT_RESET_FIELD,
+        *COUNT_MUX_FIELDS.values(),
+        CLKDIV_FIELD,
+    )
+}
+
+
+class FASMParseError(RuntimeError):
+    """A FASM line could not be parsed."""
+
+    def __init__(self, msg: str, *, lineno: int | None = None, line: str = None):
+        super().__init__(msg)
+        self.lineno = lineno
+        self.line = line
+
+
+class FASMWarning(UserWarning):
+    """FASM lines that are not understood (and were skipped)."""
+
+
+class FASMLine(NamedTuple):
+    lineno: int  # 1-based
+    kind: Optional[str]  # matched prefix from FASM_LINE_KINDS, None if unknown
+    text: str  # the line without surrounding whitespace
+
+
+# line prefix -> FASM method handling it
+FASM_LINE_KINDS: dict[str, str] = {
+    "BLE_X": "pharse_ble",
+    "PPS_X": "pharse_pps",
+    "MUX": "pharse_mux",
+    "CLKDIV": "pharse_clkdiv",
+    "CNT_X0Y3": "pharse_cnt",
+    "CLB_IRQ": "pharse_irq",
+    "PPS_OE": "pharse_oe",
+    "MODULE_CLB_": "pharse_module",
+}
+# peripheral input module -> FASM attribute holding its source
+FASM_MODULE_INPUTS: dict[str, str] = {
+    "MODULE_CLB_TMR0_IN": "TIMR0_IN",
+    "MODULE_CLB_TMR1_IN": "TIMR1_IN",
+    "MODULE_CLB_TMR1_GATE": "TIMR1_GATE",
+    "MODULE_CLB_TMR2_IN": "TIMR2_IN",
+    "MODULE_CLB_TMR2_RST": "TIMR2_RST",
+    "MODULE_CLB_CCP1_IN": "CCP1_IN",
+    "MODULE_CLB_CCP2_IN": "CCP2_IN",
+    "MODULE_CLB_ADC_IN": "ADC_IN",
+}
+
+# first three characters -> candidate prefixes, so a line costs one dict hit
+_FASM_DISPATCH: dict[str, tuple[str, ...]] = defaultdict(tuple)
+for _prefix in FASM_LINE_KINDS:
+    _FASM_DISPATCH[_prefix[:3]] += (_prefix,)
+_FASM_DISPATCH = dict(_FASM_DISPATCH)
+
+
+def iter_fasm_lines(lines: Iterable[str]) -> Iterator[FASMLine]:
+    """Lazily classify FASM lines, skipping blank lines and ``#`` comments."""
+    dispatch = _FASM_DISPATCH
+    for lineno, raw in enumerate(lines, 1):
+        text = raw.strip()
+        if not text or text[0] == "#":
+            continue
+        kind = None
+        for prefix in dispatch.get(text[:3], ()):
+            if text.startswith(prefix):
+                kind = prefix
+                break
+        yield FASMLine(lineno, kind, text)
+
+
 class FASM:
-    def __init__(self, fasm_file: Path):
+    def __init__(self, fasm_file: Union[Path, str, Iterable[str]]):
+        """Load a FASM design.
+
+        *fasm_file* is a path, or any iterable of lines (an open file,
+        ``sys.stdin``, a list of strings).  Lines are streamed, never read
+        into memory all at once.
+        """
         self.LUTS = defaultdict(BLE_CFG)
         self.PPS_OUT = dict()
         self.IRQ_OUT = dict()
@@ -818,38 +1022,34 @@ class FASM:
         self.COUNTER = COUNTER()
         self.TIMR0_IN = None
 
-        with open(fasm_file, "r") as f:
-            for l in f.readlines():
-                if l.startswith("#"):
-                    continue
-                if l.startswith("BLE_X"):
-                    self.pharse_ble(l)
-                    continue
-                if l.startswith("PPS_X"):
-                    self.pharse_pps(l)
-                    continue
-                if l.startswith("MUX"):
-                    self.pharse_mux(l)
-                    continue
-                if l.startswith("CLKDIV"):
-                    _, val = l.split("=")
-                    _, val = val.split("b")
-                    val = int(val.strip(), 2)
-                    self.CLKDIV = CLKDIV(val)
-                    continue
-                if l.startswith("CNT_X0Y3"):
-                    self.pharse_cnt(l)
-                    continue
-                if l.startswith("CLB_IRQ"):
-                    self.pharse_irq(l)
-                    continue
-                if l.startswith("PPS_OE"):
-                    self.pharse_oe(l)
-                    continue
-                if l.startswith("MODULE_CLB_"):
-                    self.pharse_module(l)
-                    continue
-                print(f"Unhandled line: {repr(l)}")
+        if isinstance(fasm_file, (str, Path)):
+            with open(fasm_file, "r") as f:
+                self.feed(f, source=str(fasm_file))
+        else:
+            self.feed(fasm_file)
+
+    def feed(self, lines: Iterable[str], source: str | None = None) -> None:
+        """Parse more FASM lines into this design."""
+        source = source or getattr(lines, "name", "<fasm>")
+        handlers = {k: getattr(self, m) for k, m in FASM_LINE_KINDS.items()}
+        for rec in iter_fasm_lines(lines):
+            if rec.kind is None:
+                handled = False
+            else:
+                try:
+                    handled = handlers[rec.kind](rec.text) is not False
+                except Exception as e:
+                    raise FASMParseError(
+                        f"{source}:{rec.lineno}: error parsing line {rec.text!r}",
+                        lineno=rec.lineno,
+                        line=rec.text,
+                    ) from e
+            if not handled:
+                warnings.warn(
+                    f"{source}:{rec.lineno}: unhandled line {rec.text!r}",
+                    category=FASMWarning,
+                    stacklevel=2,
+                )
 
     @staticmethod
     def lo_to_ble(lo_str: str) -> str:
@@ -875,7 +1075,7 @@ class FASM:
                     return
                 if parts[2] == "LUT":
                     # ex: BLE_X1Y2.BLE0.LUT.INIT[15:0] = 16'b1110101111110100
-                    self.LUTS[ble_sel].LUT_CONFIG = parts[-1][-17:-1]
+                    self.LUTS[ble_sel].LUT_CONFIG = parts[-1].strip()[-16:]
                     return
 
             if parts[1].startswith("BLE0_LI"):
@@ -900,8 +1100,7 @@ class FASM:
         except Exception as e:
             raise RuntimeError(f"Error parsing line '{line}'") from e
 
-        print(f"Unhandled ble line: {parts}")
-        return
+        return False
 
     def pharse_pps(self, line):
         pps_name, opad, lo_val = line.strip().split(".")
@@ -909,7 +1108,7 @@ class FASM:
 
         pps_val = PPS_OUT_NAME[pps_name]()
 
-        pps_val.OUT = _CLB_ENUM[pps_val.idx](int(lo_val[-1]))
+        pps_val.OUT = _CLB_ENUM[pps_val.idx](self._lo_out(lo_val, 0b11))
 
         self.PPS_OUT[PPS_OUT_NAME[pps_name]] = pps_val
 
@@ -919,7 +1118,7 @@ class FASM:
 
         irq_val = IRQ_OUT_NUM[int(irq_name[-1])]()
 
-        irq_val.OUT = irq_val.__annotations__["OUT"](int(lo_val[-1]))
+        irq_val.OUT = irq_val.__annotations__["OUT"](self._lo_out(lo_val, 0b111))
 
         self.IRQ_OUT[int(irq_name[-1])] = irq_val
 
@@ -946,6 +1145,11 @@ class FASM:
         except Exception as e:
             raise RuntimeError(f"Error parsing line '{line}'") from e
 
+    def pharse_clkdiv(self, line):
+        _, val = line.split("=")
+        _, val = val.split("b")
+        self.CLKDIV = CLKDIV(int(val.strip(), 2))
+
     def pharse_cnt(self, line):
         parts = line.strip().split(".")
 
@@ -963,32 +1167,80 @@ class FASM:
     def pharse_module(self, line):
         module, opad, lo_val = line.strip().split(".")
 
-        if module == "MODULE_CLB_TMR0_IN":
-            self.TIMR0_IN = lo_val
-            return
-        if module == "MODULE_CLB_TMR1_IN":
-            self.TIMR1_IN = lo_val
-            return
-        if module == "MODULE_CLB_TMR1_GATE":
-            self.TIMR1_GATE = lo_val
-            return
-        if module == "MODULE_CLB_TMR2_IN":
-            self.TIMR2_IN = lo_val
-            return
-        if module == "MODULE_CLB_TMR2_RST":
-            self.TIMR2_RST = lo_val
-            return
-        if module == "MODULE_CLB_CCP1_IN":
-            self.CCP1_IN = lo_val
-            return
-        if module == "MODULE_CLB_CCP2_IN":
-            self.CCP2_IN = lo_val
-            return
-        if module == "MODULE_CLB_ADC_IN":
-            self.ADC_IN = lo_val
-            return
-
-        raise RuntimeError(f"Error parsing line '{line}'")
+        if module not in FASM_MODULE_INPUTS:
+            raise RuntimeError(f"Error parsing line '{line}'")
+        setattr(self, FASM_MODULE_INPUTS[module], lo_val)
+
+    def _lo_out(self, lo_val: str, mask: int) -> int:
+        """Output select from an ``LO_Y_X`` source: the BLE index within its group."""
+        if lo_val.startswith("LO_"):
+            return BLEXY.from_fasm(self.lo_to_ble(lo_val)).value & mask
+        return int(lo_val[-1])
+
+    def _ble_lo(self, ble_idx: int) -> str:
+        return self.ble_to_lo(BLEXY(ble_idx).fasm_name)
+
+    def to_fasm(self) -> str:
+        """Serialise the design as canonical (sorted) FASM text."""
+        lines = []
+        for ble, cfg in self.LUTS.items():
+            name = ble.fasm_name
+            if cfg.FLOPSEL is not None:
+                lines.append(f"{name}.BLE0.FLOPSEL.{FLOPSEL(cfg.FLOPSEL).name}")
+            if cfg.LUT_CONFIG is not None:
+                lines.append(f"{name}.BLE0.LUT.INIT[15:0] = 16'b{cfg.LUT_CONFIG}")
+            for port, src in enumerate(
+                (cfg.LUT_I_A, cfg.LUT_I_B, cfg.LUT_I_C, cfg.LUT_I_D)
+            ):
+                if src is None:
+                    continue
+                if src.name.startswith("CLB_BLE_"):
+                    src_name = self._ble_lo(int(src.name[8:]))
+                else:
+                    src_name = src.name
+                lines.append(f"{name}.BLE0_LI{port}.{src_name}")
+
+        for idx, mux in self.MUXS.items():
+            if mux.CLBIN is not None:
+                lines.append(f"MUX{idx}.CLBIN[5:0] = 6'b{mux.CLBIN.value:06b}")
+            if mux.INSYNC is not None:
+                lines.append(f"MUX{idx}.INSYNC[2:0] = 3'b{mux.INSYNC.value:03b}")
+
+        lines.append(f"CLKDIV[2:0] = 3'b{self.CLKDIV.value:03b}")
+
+        c = self.COUNTER
+        if c.CNT_RESET is not None:
+            lines.append(f"CNT_X0Y3.CNT0_RESET.{self._ble_lo(c.CNT_RESET.value)}")
+        if c.CNT_STOP is not None:
+            lines.append(f"CNT_X0Y3.CNT0_STOP.{self._ble_lo(c.CNT_STOP.value)}")
+        for name in COUNT_MUX_CFG_bits:
+            if getattr(c, name) is not None:
+                lines.append(f"CNT_X0Y3.{name}.{getattr(c, name).name}")
+
+        for pps_name, pps_cls in PPS_OUT_NAME.items():
+            pps = self.PPS_OUT.get(pps_cls)
+            if pps is not None and pps.OUT is not None:
+                src = self._ble_lo(pps.idx * 4 + pps.OUT.value)
+                lines.append(f"{pps_name}.OPAD0_O.{src}")
+
+        for idx, irq in self.IRQ_OUT.items():
+            if irq.OUT is not None:
+                src = self._ble_lo(idx * 8 + irq.OUT.value)
+                lines.append(f"CLB_IRQ{idx}.OPAD0_O.{src}")
+
+        for idx, oe in self.OE.items():
+            lines.append(f"PPS_OE{idx}.OPAD0_O.LO_{oe.name}")
+
+        for module, attr in FASM_MODULE_INPUTS.items():
+            if getattr(self, attr, None) is not None:
+                lines.append(f"{module}.OPAD0_O.{getattr(self, attr)}")
+
+        lines.sort()
+        lines.append("")
+        return "\n".join(lines)
+
+    def save_fasm(self, out_file: Path) -> None:
+        out_file.write_text(self.to_fasm(), encoding="utf8")
 
     def __str__(self):
         return (
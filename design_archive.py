@@ -0,0 +1,407 @@
+"""Binary container for many bitstreams.
+
+An archive is a fixed header, then one 204 byte record per design (the 102
+words in file order, big endian, the same bytes as ``Bitstream`` packs its
+image into) and an optional JSON metadata index. Records are read straight
+out of an ``mmap``, so opening a corpus does not parse anything and any
+design can be fetched by its record number. ``archive.view(i)`` returns a
+:class:`BitstreamView` that decodes only the fields actually read.
+
+Header (little endian): magic ``b"CLBARCH\\0"``, format version (u32),
+record size (u32), record count (u64), offset of the metadata index (u64,
+0 when there is none).
+
+    python design_archive.py pack OUT.clba FILE.json...
+    python design_archive.py info ARCHIVE.clba
+"""
+
+import json
+import mmap
+import struct
+import sys
+from pathlib import Path
+from typing import (
+    Callable,
+    Iterable,
+    Iterator,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Union,
+)
+
+from bitstream import (
+    BITSTREAM_WORDS,
+    Bitstream,
+    _CLBIN,
+    _CNTMUX,
+    _COUNTERIN,
+    _FLOPSEL,
+    _INSYNC,
+    _LUT_IN,
+    _WORDS_STRUCT,
+    _int_to_words,
+)
+from data_model import (
+    BLEXY,
+    CLKDIV,
+    CLKDIV_FIELD,
+    CNT_RESET_FIELD,
+    CNT_STOP_FIELD,
+    COUNT_MUX_FIELDS,
+    FLOPSEL_FIELDS,
+    IRQ_OUT_FIELDS,
+    IRQ_OUT_NUM,
+    LUT_CONFIG_FIELDS,
+    LUT_INPUT_FIELDS,
+    MUX_CLBIN_FIELDS,
+    MUX_INSYNC_FIELDS,
+    PPS_OUT_FIELDS,
+    PPS_OUT_NUM,
+    _CLB_ENUM,
+    BitField,
+)
+
+MAGIC = b"CLBARCH\0"
+VERSION = 1
+RECORD_SIZE = 2 * BITSTREAM_WORDS
+_HEADER = struct.Struct("<8sIIQQ")
+
+
+def _record(design: Union[Bitstream, Sequence[int]]) -> bytes:
+    if isinstance(design, Bitstream):
+        design._update_bitstream()
+        bits = design._bits
+    else:
+        bits = Bitstream._bits_from_words(list(design))
+    return bits.to_bytes(RECORD_SIZE, "big")
+
+
+class _Span(NamedTuple):
+    """Where a field lives in a record: bytes ``[start:stop]``, read as a big
+    endian int, hold it at ``runs`` (``BitField.runs`` shifted to them)."""
+
+    start: int
+    stop: int
+    runs: tuple[tuple[int, int, int], ...]
+
+
+def _span(field: BitField) -> _Span:
+    lo, hi = min(field.bits) // 8, max(field.bits) // 8  # bit i is in byte -1-i//8
+    runs = tuple((src - 8 * lo, run_mask, dst) for src, run_mask, dst in field.runs)
+    return _Span(RECORD_SIZE - 1 - hi, RECORD_SIZE - lo, runs)
+
+
+def _extract(buf: bytes, span: _Span) -> int:
+    chunk = int.from_bytes(buf[span.start : span.stop], "big")
+    value = 0
+    for src, run_mask, dst in span.runs:
+        value |= ((chunk >> src) & run_mask) << dst
+    return value
+
+
+# attribute -> (span, decoder), one table per slot, same values as the
+# Bitstream parsers produce
+_Fields = dict[str, tuple[_Span, Callable[[int], object]]]
+
+_BLE_TABLES: dict[BLEXY, _Fields] = {
+    ble: {
+        "LUT_CONFIG": (_span(LUT_CONFIG_FIELDS[ble.value]), "{:016b}".format),
+        "FLOPSEL": (_span(FLOPSEL_FIELDS[ble.value]), _FLOPSEL.__getitem__),
+        **{
+            f"LUT_I_{port}": (_span(f), table.__getitem__)
+            for port, f, table in zip("ABCD", LUT_INPUT_FIELDS[ble.value], _LUT_IN)
+        },
+    }
+    for ble in BLEXY
+}
+_MUX_TABLES: dict[int, _Fields] = {
+    idx: {
+        "CLBIN": (_span(MUX_CLBIN_FIELDS[idx]), _CLBIN.__getitem__),
+        "INSYNC": (_span(MUX_INSYNC_FIELDS[idx]), _INSYNC.__getitem__),
+    }
+    for idx in range(len(MUX_CLBIN_FIELDS))
+}
+_PPS_TABLES: dict[type, _Fields] = {
+    cls: {"OUT": (_span(PPS_OUT_FIELDS[idx]), _CLB_ENUM[idx])}
+    for idx, cls in PPS_OUT_NUM.items()
+}
+_IRQ_TABLES: dict[int, _Fields] = {
+    idx: {"OUT": (_span(IRQ_OUT_FIELDS[idx]), cls.__annotations__["OUT"])}
+    for idx, cls in IRQ_OUT_NUM.items()
+}
+_COUNTER_TABLE: _Fields = {
+    "CNT_STOP": (_span(CNT_STOP_FIELD), _COUNTERIN.__getitem__),
+    "CNT_RESET": (_span(CNT_RESET_FIELD), _COUNTERIN.__getitem__),
+    **{name: (_span(f), _CNTMUX.__getitem__) for name, f in COUNT_MUX_FIELDS.items()},
+}
+_CLKDIV_SPAN = _span(CLKDIV_FIELD)
+
+
+class _SlotView:
+    """One BLE / MUX / output / the counter of a view; each attribute read
+    extracts and decodes just that field."""
+
+    __slots__ = ("_buf", "_fields")
+
+    def __init__(self, buf: bytes, fields: _Fields) -> None:
+        self._buf = buf
+        self._fields = fields
+
+    def __getattr__(self, name: str):
+        try:
+            span, decode = self._fields[name]
+        except KeyError:
+            raise AttributeError(name) from None
+        return decode(_extract(self._buf, span))
+
+    def __dir__(self) -> list[str]:
+        return list(self._fields)
+
+    def __repr__(self) -> str:
+        values = ", ".join(f"{n}={getattr(self, n)!r}" for n in self._fields)
+        return f"{type(self).__name__}({values})"
+
+
+class _SlotMap(Mapping):
+    """``LUTS`` / ``MUXS`` / ``PPS_OUT`` / ``IRQ_OUT`` of a view."""
+
+    __slots__ = ("_buf", "_tables")
+
+    def __init__(self, buf: bytes, tables: dict) -> None:
+        self._buf = buf
+        self._tables = tables
+
+    def __getitem__(self, key) -> _SlotView:
+        return _SlotView(self._buf, self._tables[key])
+
+    def __iter__(self) -> Iterator:
+        return iter(self._tables)
+
+    def __len__(self) -> int:
+        return len(self._tables)
+
+
+class BitstreamView:
+    """Read only view of one record with the ``Bitstream`` attributes
+    (``LUTS``, ``MUXS``, ``PPS_OUT``, ``IRQ_OUT``, ``COUNTER``, ``CLKDIV``).
+
+    Nothing is decoded up front: the view copies the 204 bytes of *record*
+    and ``view.LUTS[BLEXY.BLE_5_X2Y3].LUT_CONFIG`` converts just the bytes of
+    that one field. *record* is the 204 bytes of a record (``bytes``, a
+    ``memoryview`` such as ``Archive.record(i)``) or a row of 102 words
+    (e.g. of ``Archive.word_array()``); the view keeps no reference to it,
+    so the archive can be closed while views are alive.
+    """
+
+    __slots__ = ("_buf",)
+
+    def __init__(self, record) -> None:
+        if getattr(record, "dtype", None) is not None:  # NumPy words
+            record = record.astype(">u2", copy=False)
+        data = bytes(record)
+        if len(data) != RECORD_SIZE:
+            raise ValueError(f"record must be {RECORD_SIZE} bytes, not {len(data)}")
+        self._buf = data
+
+    @property
+    def LUTS(self) -> Mapping[BLEXY, _SlotView]:
+        return _SlotMap(self._buf, _BLE_TABLES)
+
+    @property
+    def MUXS(self) -> Mapping[int, _SlotView]:
+        return _SlotMap(self._buf, _MUX_TABLES)
+
+    @property
+    def PPS_OUT(self) -> Mapping[type, _SlotView]:
+        return _SlotMap(self._buf, _PPS_TABLES)
+
+    @property
+    def IRQ_OUT(self) -> Mapping[int, _SlotView]:
+        return _SlotMap(self._buf, _IRQ_TABLES)
+
+    @property
+    def COUNTER(self) -> _SlotView:
+        return _SlotView(self._buf, _COUNTER_TABLE)
+
+    @property
+    def CLKDIV(self) -> CLKDIV:
+        return CLKDIV(_extract(self._buf, _CLKDIV_SPAN))
+
+    def words(self) -> tuple[int, ...]:
+        return _WORDS_STRUCT.unpack(self._buf)
+
+    def to_bitstream(self) -> Bitstream:
+        """Decode the whole record."""
+        return Bitstream._from_bits(int.from_bytes(self._buf, "big"))
+
+
+class ArchiveWriter:
+    """Appends designs to a new archive; the header and metadata index are
+    written by :meth:`close`."""
+
+    def __init__(self, path: Union[Path, str]) -> None:
+        self._f = open(path, "wb")
+        self._f.write(_HEADER.pack(MAGIC, VERSION, RECORD_SIZE, 0, 0))
+        self._count = 0
+        self._meta: list[Optional[dict]] = []
+
+    def append(
+        self, design: Union[Bitstream, Sequence[int]], meta: Optional[dict] = None
+    ) -> int:
+        """Add *design* (a ``Bitstream`` or its words), return its record number."""
+        self._f.write(_record(design))
+        self._meta.append(meta)
+        self._count += 1
+        return self._count - 1
+
+    def close(self) -> None:
+        if self._f.closed:
+            return
+        meta_offset = 0
+        if any(m is not None for m in self._meta):
+            meta_offset = self._f.tell()
+            self._f.write(json.dumps(self._meta, separators=(",", ":")).encode())
+        self._f.seek(0)
+        self._f.write(
+            _HEADER.pack(MAGIC, VERSION, RECORD_SIZE, self._count, meta_offset)
+        )
+        self._f.close()
+
+    def __enter__(self) -> "ArchiveWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def write_archive(
+    path: Union[Path, str],
+    designs: Iterable[Union[Bitstream, Sequence[int]]],
+    metadata: Optional[Iterable[Optional[dict]]] = None,
+) -> int:
+    """Write *designs* (with per design *metadata*) to *path*, return the count."""
+    metadata = iter(metadata) if metadata is not None else None
+    count = 0
+    with ArchiveWriter(path) as w:
+        for design in designs:
+            count = 1 + w.append(
+                design, next(metadata) if metadata is not None else None
+            )
+    return count
+
+
+class Archive:
+    """Memory mapped, read only view of an archive.
+
+    ``archive[i]`` decodes record *i* into a ``Bitstream``, :meth:`view`
+    wraps it in a lazily decoded :class:`BitstreamView`; :meth:`words` and
+    :meth:`bits` return the raw image without decoding.
+    """
+
+    def __init__(self, path: Union[Path, str]) -> None:
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._mm) < _HEADER.size:
+            raise ValueError(f"{path} is not a CLB archive (too short)")
+        magic, version, record_size, count, meta_offset = _HEADER.unpack_from(self._mm)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a CLB archive")
+        if version != VERSION or record_size != RECORD_SIZE:
+            raise ValueError(
+                f"{path}: unsupported archive version {version} / record size "
+                f"{record_size}"
+            )
+        if len(self._mm) < _HEADER.size + count * RECORD_SIZE:
+            raise ValueError(f"{path} is truncated")
+        self._count = count
+        self._meta_offset = meta_offset
+        self._meta: Optional[list[Optional[dict]]] = None
+
+    def close(self) -> None:
+        self._mm.close()
+
+    def __enter__(self) -> "Archive":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _offset(self, i: int) -> int:
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError(f"record {i} out of range")
+        return _HEADER.size + i * RECORD_SIZE
+
+    def record(self, i: int) -> memoryview:
+        """The 204 bytes of record *i*, without copying."""
+        off = self._offset(i)
+        return memoryview(self._mm)[off : off + RECORD_SIZE]
+
+    def bits(self, i: int) -> int:
+        """Record *i* as an image int (bit ``i`` = bitstream bit ``i``)."""
+        off = self._offset(i)
+        return int.from_bytes(self._mm[off : off + RECORD_SIZE], "big")
+
+    def words(self, i: int) -> tuple[int, ...]:
+        return _int_to_words(self.bits(i))
+
+    def view(self, i: int) -> BitstreamView:
+        with self.record(i) as record:
+            return BitstreamView(record)
+
+    def __getitem__(self, i: int) -> Bitstream:
+        return Bitstream._from_bits(self.bits(i))
+
+    def __iter__(self) -> Iterator[Bitstream]:
+        return (self[i] for i in range(self._count))
+
+    def meta(self, i: int) -> Optional[dict]:
+        """Metadata stored with record *i* (``None`` if there is none)."""
+        self._offset(i)
+        if not self._meta_offset:
+            return None
+        if self._meta is None:
+            self._meta = json.loads(self._mm[self._meta_offset :])
+        return self._meta[i]
+
+    def word_array(self):
+        """All records as a native ``uint16[N, 102]`` NumPy array, ready for
+        ``batch_codec.decode_batch``. It is a copy (the byte swap
+        ``decode_batch`` would do anyway), so it outlives :meth:`close`."""
+        import numpy as np
+
+        return (
+            np.frombuffer(
+                self._mm,
+                dtype=">u2",
+                count=self._count * BITSTREAM_WORDS,
+                offset=_HEADER.size,
+            )
+            .astype(np.uint16)
+            .reshape(self._count, BITSTREAM_WORDS)
+        )
+
+
+def _pack(out: Path, json_files: list[Path]) -> None:
+    n = write_archive(
+        out,
+        (_int_to_words(Bitstream._load_bitstream_from_json(p)) for p in json_files),
+        ({"source": str(p)} for p in json_files),
+    )
+    print(f"{out}: {n} designs")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 3 and sys.argv[1] == "pack":
+        _pack(Path(sys.argv[2]), [Path(p) for p in sys.argv[3:]])
+    elif len(sys.argv) == 3 and sys.argv[1] == "info":
+        with Archive(sys.argv[2]) as archive:
+            print(f"{sys.argv[2]}: {len(archive)} designs")
+    else:
+        sys.exit(__doc__.rsplit("\n\n", 1)[1])
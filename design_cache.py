@@ -0,0 +1,183 @@
+"""On-disk cache of per-design results, keyed by the bitstream content.
+
+The key is a hash of the canonical 102 word image, so the same design under
+another file name (or rebuilt in memory) hits the same entries. In-memory
+designs with OE or peripheral input settings, which the image does not
+hold, are computed without the cache. Results are
+pickled into one SQLite file; when the stored values exceed ``max_bytes``
+the least recently used entries are dropped.
+
+The built-in kinds include a hash of the source of the modules computing
+them, so editing e.g. ``clb_graph.py`` makes the cached DOT output miss
+instead of outliving the change. Callers of :meth:`DesignCache.get` should
+put a version into their own kinds in the same way.
+"""
+
+import hashlib
+import pickle
+import sqlite3
+from pathlib import Path
+from typing import Callable, Sequence, TypeVar, Union
+
+import bitstream
+import clb_analysis
+import clb_graph
+import clb_netlist
+import data_model
+from bitstream import Bitstream, _WORDS_STRUCT, _words_to_int
+from clb_analysis import TimingReport, analyze
+from clb_graph import generate_dot_from_config
+from clb_netlist import PERIPHERAL_INPUT_ATTRS
+from data_model import BITSTREAM_LAYOUT
+
+T = TypeVar("T")
+
+# Bump when a cached result changes shape, old entries are dropped on open.
+_SCHEMA_VERSION = 1
+
+Design = Union[Bitstream, Path, str, Sequence[int]]
+
+# LRU stamp, taken from the table so that all connections share one clock
+_NEXT_USE = "(SELECT COALESCE(MAX(used), 0) + 1 FROM entries)"
+
+
+def _source_hash(*modules) -> str:
+    """Hash of the source files of *modules*."""
+    h = hashlib.blake2b(digest_size=8)
+    for module in modules:
+        h.update(Path(module.__file__).read_bytes())
+    return h.hexdigest()
+
+
+# Versions of the built-in kinds: the code that decodes and computes them.
+_FIELDS_VERSION = _source_hash(data_model)
+_DOT_VERSION = _source_hash(data_model, bitstream, clb_netlist, clb_graph)
+_ANALYSIS_VERSION = _source_hash(data_model, bitstream, clb_netlist, clb_analysis)
+
+
+def _bits_of(design: Design) -> int:
+    if isinstance(design, Bitstream):
+        design._update_bitstream()
+        return design._bits
+    if isinstance(design, (str, Path)):
+        return Bitstream._load_bitstream_from_json(Path(design))
+    return _words_to_int(design)
+
+
+def _image_only(bs: Bitstream) -> bool:
+    """True when everything *bs* configures is held in its image."""
+    return not bs.OE and all(getattr(bs, a) is None for a in PERIPHERAL_INPUT_ATTRS)
+
+
+def _key(bits: int) -> str:
+    data = bits.to_bytes(_WORDS_STRUCT.size, "big")  # the words, big endian
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def design_key(design: Design) -> str:
+    """Hash of the word image of *design* (a ``Bitstream``, a ``.json``
+    bitstream file or its words in file order)."""
+    return _key(_bits_of(design))
+
+
+class DesignCache:
+    """Memoises decoded fields, DOT output and timing analysis per design."""
+
+    def __init__(self, path: Union[Path, str], max_bytes: int = 256 << 20) -> None:
+        self.max_bytes = max_bytes
+        self._db = sqlite3.connect(path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        if self._db.execute("PRAGMA user_version").fetchone()[0] != _SCHEMA_VERSION:
+            self._db.execute("DROP TABLE IF EXISTS entries")
+            self._db.execute(f"PRAGMA user_version={_SCHEMA_VERSION}")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT NOT NULL, kind TEXT NOT NULL, value BLOB NOT NULL,"
+            " size INTEGER NOT NULL, used INTEGER NOT NULL,"
+            " PRIMARY KEY (key, kind))"
+        )
+
+    def close(self) -> None:
+        self._db.commit()
+        self._db.close()
+
+    def __enter__(self) -> "DesignCache":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    @property
+    def size(self) -> int:
+        """Bytes of pickled results currently stored (by every connection)."""
+        return self._db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM entries"
+        ).fetchone()[0]
+
+    def get(self, design: Design, kind: str, compute: Callable[[Bitstream], T]) -> T:
+        """The cached *kind* result of *design*, calling ``compute`` with the
+        decoded ``Bitstream`` (and storing its result) on a miss."""
+        if isinstance(design, Bitstream) and not _image_only(design):
+            return compute(design)
+        bits = _bits_of(design)
+        key = _key(bits)
+        row = self._db.execute(
+            "SELECT value FROM entries WHERE key = ? AND kind = ?", (key, kind)
+        ).fetchone()
+        if row is not None:
+            self._db.execute(
+                f"UPDATE entries SET used = {_NEXT_USE} WHERE key = ? AND kind = ?",
+                (key, kind),
+            )
+            self._db.commit()
+            return pickle.loads(row[0])
+
+        bs = design if isinstance(design, Bitstream) else Bitstream._from_bits(bits)
+        result = compute(bs)
+        value = pickle.dumps(result, pickle.HIGHEST_PROTOCOL)
+        if len(value) <= self.max_bytes:
+            # another connection may have stored the same result meanwhile
+            self._db.execute(
+                f"INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, {_NEXT_USE})",
+                (key, kind, value, len(value)),
+            )
+            self._evict()
+            self._db.commit()
+        return result
+
+    def _evict(self) -> None:
+        excess = self.size - self.max_bytes
+        if excess <= 0:
+            return
+        victims = []
+        for rowid, size in self._db.execute(
+            "SELECT rowid, size FROM entries ORDER BY used"
+        ):
+            victims.append((rowid,))
+            excess -= size
+            if excess <= 0:
+                break
+        self._db.executemany("DELETE FROM entries WHERE rowid = ?", victims)
+
+    def fields(self, design: Design) -> dict[str, int]:
+        """Raw value of every ``BITSTREAM_LAYOUT`` field."""
+        return self.get(
+            design,
+            f"fields@{_FIELDS_VERSION}",
+            lambda bs: {
+                name: f.extract(bs._bits) for name, f in BITSTREAM_LAYOUT.items()
+            },
+        )
+
+    def dot(self, design: Design, graph_name: str = "main") -> str:
+        """``generate_dot_from_config`` output."""
+        return self.get(
+            design,
+            f"dot:{graph_name}@{_DOT_VERSION}",
+            lambda bs: generate_dot_from_config(bs, graph_name),
+        )
+
+    def analysis(self, design: Design) -> TimingReport:
+        """``clb_analysis.analyze`` result."""
+        return self.get(design, f"analysis@{_ANALYSIS_VERSION}", analyze)
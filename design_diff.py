@@ -0,0 +1,167 @@
+"""Field level diff of two CLB designs.
+
+The fields compared are those of ``data_model.BITSTREAM_LAYOUT`` plus the
+FASM only settings (OE selects, peripheral inputs), each read with a getter
+built once from the layout name. When both designs are ``Bitstream`` objects
+the XOR of their images selects the fields to look at, so identical fields
+cost one mask test each.
+
+A changed LUT init or input select is flagged ``equivalent`` when the BLE
+still computes the same function of the same signals, e.g. the init only
+differs in rows of an input the LUT ignores, or an ignored input was rerouted.
+"""
+
+import sys
+from pathlib import Path
+from typing import Callable, NamedTuple, Optional, Union
+
+from bitstream import Bitstream
+from clb_netlist import PERIPHERAL_INPUT_ATTRS, SIG_ZERO, active_mask, lut_input_signal
+from data_model import (
+    BITSTREAM_LAYOUT,
+    BLEXY,
+    FASM,
+    FLOPSEL,
+    PPS_OUT_NUM,
+    VAR_ORDER,
+)
+
+_LUT_INPUTS = tuple(f"LUT_I_{v}" for v in VAR_ORDER)
+
+
+class FieldChange(NamedTuple):
+    # layout name (``BLE3.LUT_CONFIG``, ``MUX0.CLBIN`` ...), ``OE2``, ``TIMR0_IN``
+    name: str
+    old: object
+    new: object
+    equivalent: bool = False  # LUT init/input change without functional effect
+
+
+def _flopsel(v):
+    return v if v is None or isinstance(v, FLOPSEL) else FLOPSEL(bool(v))
+
+
+def _layout_getter(name: str) -> Callable[[FASM], object]:
+    head, _, attr = name.partition(".")
+    if head.startswith("BLE"):
+        ble = BLEXY(int(head[3:]))
+        if attr == "FLOPSEL":
+            return lambda cfg: _flopsel(getattr(cfg.LUTS.get(ble), attr, None))
+        return lambda cfg: getattr(cfg.LUTS.get(ble), attr, None)
+    if head.startswith("MUX"):
+        idx = int(head[3:])
+        return lambda cfg: getattr(cfg.MUXS.get(idx), attr, None)
+    if head.startswith("PPS_OUT"):
+        typ = PPS_OUT_NUM[int(head[7:])]
+        return lambda cfg: getattr(cfg.PPS_OUT.get(typ), "OUT", None)
+    if head.startswith("IRQ_OUT"):
+        idx = int(head[7:])
+        return lambda cfg: getattr(cfg.IRQ_OUT.get(idx), "OUT", None)
+    if head == "COUNTER":
+        return lambda cfg: getattr(cfg.COUNTER, attr, None)
+    return lambda cfg: getattr(cfg, name, None)
+
+
+def _oe_getter(idx: int) -> Callable[[FASM], object]:
+    return lambda cfg: getattr(cfg, "OE", {}).get(idx)
+
+
+def _attr_getter(attr: str) -> Callable[[FASM], object]:
+    return lambda cfg: getattr(cfg, attr, None)
+
+
+# (name, image mask or None for FASM only settings, getter), in report order
+_FIELDS: tuple[tuple[str, Optional[int], Callable[[FASM], object]], ...] = (
+    *((name, f.mask, _layout_getter(name)) for name, f in BITSTREAM_LAYOUT.items()),
+    *((f"OE{i}", None, _oe_getter(i)) for i in range(8)),
+    *((attr, None, _attr_getter(attr)) for attr in PERIPHERAL_INPUT_ATTRS),
+)
+
+
+def _lut(cfg: FASM, ble: BLEXY) -> tuple[int, tuple[int, ...]]:
+    """Truth table and input signals of *ble*, unconfigured LUTs read as 0."""
+    lut = cfg.LUTS.get(ble)
+    if lut is None or lut.LUT_CONFIG is None:
+        return 0, (SIG_ZERO,) * 4
+    sels = (getattr(lut, name) for name in _LUT_INPUTS)
+    signals = tuple(
+        lut_input_signal(port, None if sel is None else sel.value)
+        for port, sel in enumerate(sels)
+    )
+    return int(lut.LUT_CONFIG, 2), signals
+
+
+def lut_equivalent(
+    tt_a: int, signals_a: tuple[int, ...], tt_b: int, signals_b: tuple[int, ...]
+) -> bool:
+    """True when two LUTs compute the same function of their input signals
+    (``clb_netlist`` signal indices, port A first)."""
+    used_a = [p for p in range(4) if active_mask(tt_a) >> p & 1]
+    used_b = [p for p in range(4) if active_mask(tt_b) >> p & 1]
+    free = sorted(
+        {signals_a[p] for p in used_a} | {signals_b[p] for p in used_b} - {SIG_ZERO}
+    )
+    for assignment in range(1 << len(free)):
+        value = {s: assignment >> i & 1 for i, s in enumerate(free)}
+        value[SIG_ZERO] = 0
+        row_a = sum(value[signals_a[p]] << p for p in used_a)
+        row_b = sum(value[signals_b[p]] << p for p in used_b)
+        if (tt_a >> row_a ^ tt_b >> row_b) & 1:
+            return False
+    return True
+
+
+def diff_designs(
+    old: Union[Bitstream, FASM], new: Union[Bitstream, FASM]
+) -> list[FieldChange]:
+    """The fields that differ between *old* and *new*, in layout order."""
+    diff = None
+    if isinstance(old, Bitstream) and isinstance(new, Bitstream):
+        old._update_bitstream()
+        new._update_bitstream()
+        diff = old._bits ^ new._bits
+
+    changes = []
+    for name, mask, get in _FIELDS:
+        if diff is not None and mask is not None and not diff & mask:
+            continue
+        a, b = get(old), get(new)
+        if a != b:
+            changes.append(FieldChange(name, a, b))
+
+    lut_changes = {}
+    for i, c in enumerate(changes):
+        head, _, attr = c.name.partition(".")
+        if head.startswith("BLE") and (attr == "LUT_CONFIG" or attr in _LUT_INPUTS):
+            lut_changes.setdefault(int(head[3:]), []).append(i)
+    for ble, indices in lut_changes.items():
+        if lut_equivalent(*_lut(old, BLEXY(ble)), *_lut(new, BLEXY(ble))):
+            for i in indices:
+                changes[i] = changes[i]._replace(equivalent=True)
+    return changes
+
+
+def _show(v) -> str:
+    return "-" if v is None else getattr(v, "name", str(v))
+
+
+def format_diff(changes: list[FieldChange]) -> str:
+    """One ``name: old -> new`` line per change."""
+    return "\n".join(
+        f"{c.name}: {_show(c.old)} -> {_show(c.new)}"
+        + (" (equivalent)" if c.equivalent else "")
+        for c in changes
+    )
+
+
+def _load(path: Path) -> Union[Bitstream, FASM]:
+    return Bitstream(path) if path.suffix == ".json" else FASM(path)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        sys.exit(f"usage: {sys.argv[0]} OLD NEW (.json bitstream or .fasm)")
+    result = diff_designs(_load(Path(sys.argv[1])), _load(Path(sys.argv[2])))
+    if result:
+        print(format_diff(result))
+    sys.exit(1 if any(not c.equivalent for c in result) else 0)
@@ -0,0 +1,154 @@
+"""Designs and hypothesis strategies shared by the tests and benchmarks.
+
+Kept out of the ``test_*`` modules so importing them does not also import
+(and collect a second time) their test cases.
+"""
+
+import warnings
+
+from hypothesis import settings, strategies as st
+
+from bitstream import BITSTREAM_WORDS, Bitstream, _int_to_words
+from build_lut import LUT4, a
+from data_model import (
+    BITSTREAM_LAYOUT,
+    PPS_OUT_NUM,
+    BLE_CFG,
+    BLEXY,
+    CLB1IF0,
+    CLKDIV,
+    FLOPSEL,
+    LUT_IN_A,
+    LUT_IN_B,
+    LUT_IN_C,
+    LUT_IN_D,
+    CLBIN,
+    CLBInputSync,
+    IRQ_OUT0,
+    IRQ_OUT_NUM,
+    COUNTERIN,
+    CNTMUX,
+    COUNT_MUX_CFG_bits,
+    PPS_OUT0,
+    _CLB_ENUM,
+)
+
+# ``pytest --hypothesis-profile=ci`` runs the property tests with ten times
+# the examples (registered here, loaded by the test run, see conftest.py).
+settings.register_profile("ci", max_examples=1_000)
+
+
+def examples(ci: int) -> int:
+    """``max_examples`` of a test that sees *ci* examples under the ``ci``
+    profile, scaled down with the current profile otherwise."""
+    return max(1, ci * settings.default.max_examples // 1_000)
+
+
+enum = lambda e: st.sampled_from(list(e))
+bitstring16 = st.integers(0, 0xFFFF).map(lambda n: f"{n:016b}")
+
+
+@st.composite
+def bitstreams(draw):
+    bs = Bitstream()
+
+    bs.CLKDIV = draw(enum(CLKDIV))
+    for ble in BLEXY:
+        cfg = bs.LUTS[ble]
+        cfg.LUT_CONFIG = draw(bitstring16)
+        cfg.FLOPSEL = draw(enum(FLOPSEL))
+        cfg.LUT_I_A = draw(enum(LUT_IN_A))
+        cfg.LUT_I_B = draw(enum(LUT_IN_B))
+        cfg.LUT_I_C = draw(enum(LUT_IN_C))
+        cfg.LUT_I_D = draw(enum(LUT_IN_D))
+
+    for i in range(16):
+        bs.MUXS[i].CLBIN = draw(enum(CLBIN))
+        bs.MUXS[i].INSYNC = CLBInputSync(draw(st.integers(0, 7)))
+
+    for typ in PPS_OUT_NUM.values():
+        bs.PPS_OUT.setdefault(typ, typ()).OUT = draw(enum(_CLB_ENUM[typ().idx]))
+
+    for idx, typ in IRQ_OUT_NUM.items():
+        bs.IRQ_OUT.setdefault(idx, typ()).OUT = draw(enum(typ.__annotations__["OUT"]))
+
+    bs.COUNTER.CNT_STOP = draw(enum(COUNTERIN))
+    bs.COUNTER.CNT_RESET = draw(enum(COUNTERIN))
+    for attr in COUNT_MUX_CFG_bits:
+        setattr(bs.COUNTER, attr, draw(enum(CNTMUX)))
+
+    return bs
+
+
+def _field_values(name: str) -> tuple[int, ...] | None:
+    """Raw values the decoder accepts for field *name*, None for any."""
+    head, _, attr = name.partition(".")
+    if attr.startswith("LUT_I_"):
+        e = {"A": LUT_IN_A, "B": LUT_IN_B, "C": LUT_IN_C, "D": LUT_IN_D}[attr[-1]]
+    elif attr in ("CLBIN", "INSYNC"):
+        e = CLBIN if attr == "CLBIN" else CLBInputSync
+    elif head.startswith("PPS_OUT"):
+        e = _CLB_ENUM[int(head[7:])]
+    elif head.startswith("IRQ_OUT"):
+        e = IRQ_OUT_NUM[int(head[7:])].__annotations__["OUT"]
+    elif attr in ("CNT_STOP", "CNT_RESET"):
+        e = COUNTERIN
+    elif attr.startswith("COUNT_IS_"):
+        e = CNTMUX
+    elif name == "CLKDIV":
+        e = CLKDIV
+    else:
+        return None  # LUT_CONFIG, FLOPSEL
+    values = tuple(sorted({m.value for m in e}))
+    return None if len(values) == 1 << BITSTREAM_LAYOUT[name].width else values
+
+
+_RESTRICTED = [
+    (f, values)
+    for name, f in BITSTREAM_LAYOUT.items()
+    if (values := _field_values(name)) is not None
+]
+_IMAGE_BYTES = 2 * BITSTREAM_WORDS
+
+
+def _words_from_bytes(data: bytes) -> tuple[int, ...]:
+    bits = int.from_bytes(data[:_IMAGE_BYTES], "big")
+    for (f, values), pick in zip(_RESTRICTED, data[_IMAGE_BYTES:]):
+        bits = f.insert(bits, values[pick % len(values)])
+    return _int_to_words(bits)
+
+
+# Random images (unused bits included) with a valid value in every field,
+# from a single draw so tens of thousands of examples are cheap.
+_DRAW_BYTES = _IMAGE_BYTES + len(_RESTRICTED)
+word_arrays = st.integers(0, (1 << 8 * _DRAW_BYTES) - 1).map(
+    lambda n: _words_from_bytes(n.to_bytes(_DRAW_BYTES, "big"))
+)
+
+
+def example_design() -> Bitstream:
+    """IN0 -> BLE0 -> PPS_OUT0, BLE1 toggles, BLE2 = COUNT_IS_A1 -> CLB1IF0"""
+    bs = Bitstream()
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        bs.LUTS[BLEXY.BLE_0_X1Y2] = BLE_CFG(
+            LUT4(a).bitstream(), FLOPSEL.DISABLE, LUT_IN_A.IN0
+        )
+        bs.LUTS[BLEXY.BLE_1_X2Y2] = BLE_CFG(
+            LUT4(~a).bitstream(), FLOPSEL.ENABLE, LUT_IN_A.CLB_BLE_1
+        )
+        bs.LUTS[BLEXY.BLE_2_X3Y2] = BLE_CFG(
+            LUT4(a).bitstream(), FLOPSEL.DISABLE, LUT_IN_A.COUNT_IS_A1
+        )
+    bs.MUXS[0].CLBIN = CLBIN.CLBIN0PPS
+    bs.MUXS[0].INSYNC = CLBInputSync.DIRECT_IN
+    pps = PPS_OUT0()
+    pps.OUT = BLEXY.BLE_0_X1Y2
+    bs.PPS_OUT[PPS_OUT0] = pps
+    irq = IRQ_OUT0()
+    irq.OUT = CLB1IF0.CLB_BLE_2
+    bs.IRQ_OUT[0] = irq
+    bs.COUNTER.CNT_STOP = COUNTERIN.CLB_BLE_31
+    bs.COUNTER.CNT_RESET = COUNTERIN.CLB_BLE_30
+    bs.COUNTER.COUNT_IS_A1 = CNTMUX.CNT0_COUNT_IS_3
+    return bs
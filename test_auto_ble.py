@@ -0,0 +1,71 @@
+import unittest
+import warnings
+
+from hypothesis import given, strategies as st
+
+from auto_ble import LUT_IN, SIGNAL_PORTS, AutoBLE, assign_ports
+from build_lut import LUT4
+
+_BY_PORT = [[sig for sig in LUT_IN if sig._port == port] for port in "ABCD"]
+
+
+@st.composite
+def expressions(draw, signals):
+    """A random expression over *signals* and the value it has for each
+    assignment (bit ``k`` of the row is ``signals[k]``)."""
+    expr, tt = signals[0], 0b10
+    n = len(signals)
+    for k, sig in enumerate(signals[1:], 1):
+        inv = draw(st.booleans())
+        other = ~sig if inv else sig
+        other_tt = sum(((row >> k & 1) ^ inv) << row for row in range(1 << n))
+        tt = _expand(tt, k, n)
+        op = draw(st.sampled_from("&|^"))
+        if op == "&":
+            expr, tt = expr & other, tt & other_tt
+        elif op == "|":
+            expr, tt = expr | other, tt | other_tt
+        else:
+            expr, tt = expr ^ other, tt ^ other_tt
+    return (expr if not isinstance(expr, LUT_IN) else expr._expr()), tt
+
+
+def _expand(tt: int, k: int, n: int) -> int:
+    """Table over the first *k* signals as a table over *n*."""
+    return sum((tt >> (row & (1 << k) - 1) & 1) << row for row in range(1 << n))
+
+
+class AutoBLETest(unittest.TestCase):
+    @given(
+        st.permutations(range(4))
+        .flatmap(
+            lambda ports: st.tuples(*(st.sampled_from(_BY_PORT[p]) for p in ports))
+        )
+        .flatmap(lambda sigs: st.integers(1, 4).map(lambda n: list(sigs[:n])))
+        .flatmap(expressions)
+    )
+    def test_one_signal_per_port(self, expr_tt) -> None:
+        expr, _ = expr_tt
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")  # inputs the function ignores
+            cfg = AutoBLE(expr)
+        self.assertEqual(LUT4(expr).bitstream(), cfg.LUT_CONFIG)
+
+    @given(
+        st.lists(st.sampled_from(list(LUT_IN)), min_size=1, max_size=4, unique=True)
+        .map(lambda sigs: sorted(sigs))
+        .flatmap(expressions)
+    )
+    def test_signal_table(self, expr_tt) -> None:
+        expr, tt = expr_tt
+        self.assertEqual(tt, expr.sig_tt)
+
+    def test_shared_port(self) -> None:
+        expr = LUT_IN.IN0 & LUT_IN.IN1
+        self.assertEqual(0b1000, expr.sig_tt)  # not IN0 & IN0
+        with self.assertRaisesRegex(ValueError, "route-through"):
+            AutoBLE(expr)
+        self.assertEqual(0b0001, SIGNAL_PORTS["IN0"])
+        assignment = assign_ports([LUT_IN.IN0, LUT_IN.IN4, LUT_IN.IN1])
+        self.assertEqual((False, False, True), assignment.routed)
+        self.assertEqual(3, len(set(assignment.ports)))
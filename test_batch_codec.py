@@ -0,0 +1,77 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+from hypothesis import strategies as st, given, settings
+
+from batch_codec import decode_batch, encode_batch, write_json
+from data_model import COUNT_MUX_FIELDS
+from design_fixtures import bitstreams
+
+
+class BatchDecode(unittest.TestCase):
+    """decode_batch must agree with the per-object Bitstream decoder"""
+
+    @settings(max_examples=50, deadline=None)
+    @given(designs=st.lists(bitstreams(), min_size=1, max_size=8))
+    def test_matches_bitstream(self, designs) -> None:
+        for bs in designs:
+            bs._update_bitstream()
+        batch = decode_batch(np.array([bs._words() for bs in designs]))
+
+        for i, bs in enumerate(designs):
+            f = batch.fields[i]
+            for ble, cfg in bs.LUTS.items():
+                idx = ble.value
+                self.assertEqual(int(cfg.LUT_CONFIG, 2), f["lut_config"][idx])
+                self.assertEqual(cfg.FLOPSEL.value, f["flopsel"][idx])
+                self.assertEqual(
+                    [cfg.LUT_I_A, cfg.LUT_I_B, cfg.LUT_I_C, cfg.LUT_I_D],
+                    list(f["lut_inputs"][idx]),
+                )
+            for idx, mux in bs.MUXS.items():
+                self.assertEqual(mux.CLBIN, f["mux_clbin"][idx])
+                self.assertEqual(mux.INSYNC, f["mux_insync"][idx])
+            for pps in bs.PPS_OUT.values():
+                self.assertEqual(pps.OUT, f["pps_out"][pps.idx])
+            for idx, irq in bs.IRQ_OUT.items():
+                self.assertEqual(irq.OUT, f["irq_out"][idx])
+            self.assertEqual(bs.COUNTER.CNT_STOP, f["cnt_stop"])
+            self.assertEqual(bs.COUNTER.CNT_RESET, f["cnt_reset"])
+            self.assertEqual(
+                [getattr(bs.COUNTER, name) for name in COUNT_MUX_FIELDS],
+                list(f["count_mux"]),
+            )
+            self.assertEqual(bs.CLKDIV, f["clkdiv"])
+
+            reloaded = batch.bitstream(i)
+            self.assertEqual(bs._bitstream, reloaded._bitstream)
+
+
+class BatchEncode(unittest.TestCase):
+    """encode_batch must reproduce what Bitstream.save_bitstream writes"""
+
+    @settings(max_examples=50, deadline=None)
+    @given(designs=st.lists(bitstreams(), min_size=1, max_size=8))
+    def test_matches_bitstream(self, designs) -> None:
+        for bs in designs:
+            bs._update_bitstream()
+        words = np.array([bs._words() for bs in designs])
+        fields = decode_batch(words).fields
+        np.testing.assert_array_equal(encode_batch(fields), words)
+
+        with tempfile.TemporaryDirectory() as d:
+            batch_files = [Path(d) / f"{i}.batch.json" for i in range(len(designs))]
+            write_json(encode_batch(fields), batch_files)
+            for bs, batch_file in zip(designs, batch_files):
+                fn = Path(d) / "bs.json"
+                bs.save_bitstream(fn)
+                self.assertEqual(fn.read_text(), batch_file.read_text())
+
+    def test_keeps_unused_bits_of_base(self) -> None:
+        base = np.full((2, 102), 0xFFFF, dtype=np.uint16)
+        fields = decode_batch(np.zeros_like(base)).fields
+        words = encode_batch(fields, base)
+        self.assertTrue(words.any())
+        np.testing.assert_array_equal(decode_batch(words).fields, fields)
@@ -0,0 +1,20 @@
+import unittest
+
+from benchmarks import Result, compare, make_corpus, run_benchmarks
+
+
+class Benchmarks(unittest.TestCase):
+    def test_corpus_is_reproducible(self) -> None:
+        self.assertEqual(
+            [bs._bits for bs in make_corpus(5)], [bs._bits for bs in make_corpus(5)]
+        )
+
+    def test_every_benchmark_runs(self) -> None:
+        results = run_benchmarks(make_corpus(3), repeat=1, min_time=0)
+        self.assertIn("graph.dot", results)
+        self.assertTrue(all(r.ops_per_sec > 0 for r in results.values()))
+
+    def test_compare(self) -> None:
+        baseline = {"fast": Result(100.0, 1.0), "slow": Result(100.0, 1.0)}
+        results = {"fast": Result(95.0, 1.0), "slow": Result(80.0, 1.0)}
+        self.assertEqual(["slow"], compare(results, baseline, tolerance=0.1))
@@ -3,59 +3,9 @@ import unittest
 from pathlib import Path
 
 from hypothesis import strategies as st, given, settings
-from bitstream import Bitstream
-from data_model import (
-    PPS_OUT_NUM,
-    BLEXY,
-    CLKDIV,
-    FLOPSEL,
-    LUT_IN_A,
-    LUT_IN_B,
-    LUT_IN_C,
-    LUT_IN_D,
-    CLBIN,
-    CLBInputSync,
-    IRQ_OUT_NUM,
-    COUNTERIN,
-    CNTMUX,
-    COUNT_MUX_CFG_bits,
-    _CLB_ENUM,
-)
-
-enum = lambda e: st.sampled_from(list(e))
-bitstring16 = st.integers(0, 0xFFFF).map(lambda n: f"{n:016b}")
-
-
-@st.composite
-def bitstreams(draw):
-    bs = Bitstream()
-
-    bs.CLKDIV = draw(enum(CLKDIV))
-    for ble in BLEXY:
-        cfg = bs.LUTS[ble]
-        cfg.LUT_CONFIG = draw(bitstring16)
-        cfg.FLOPSEL = draw(enum(FLOPSEL))
-        cfg.LUT_I_A = draw(enum(LUT_IN_A))
-        cfg.LUT_I_B = draw(enum(LUT_IN_B))
-        cfg.LUT_I_C = draw(enum(LUT_IN_C))
-        cfg.LUT_I_D = draw(enum(LUT_IN_D))
-
-    for i in range(16):
-        bs.MUXS[i].CLBIN = draw(enum(CLBIN))
-        bs.MUXS[i].INSYNC = CLBInputSync(draw(st.integers(0, 7)))
-
-    for typ in PPS_OUT_NUM.values():
-        bs.PPS_OUT.setdefault(typ, typ()).OUT = draw(enum(_CLB_ENUM[typ().idx]))
-
-    for idx, typ in IRQ_OUT_NUM.items():
-        bs.IRQ_OUT.setdefault(idx, typ()).OUT = draw(enum(typ.__annotations__["OUT"]))
-
-    bs.COUNTER.CNT_STOP = draw(enum(COUNTERIN))
-    bs.COUNTER.CNT_RESET = draw(enum(COUNTERIN))
-    for attr in COUNT_MUX_CFG_bits:
-        setattr(bs.COUNTER, attr, draw(enum(CNTMUX)))
-
-    return bs
+from bitstream import Bitstream, _int_to_words, load_patch
+from data_model import BLEXY
+from design_fixtures import bitstreams, enum, examples, word_arrays
 
 
 class BitstreamRoundTrip(unittest.TestCase):
@@ -73,3 +23,102 @@ class BitstreamRoundTrip(unittest.TestCase):
                 {k: v for k, v in vars(bs).items() if k != "_bitstream"},
                 {k: v for k, v in vars(reloaded).items() if k != "_bitstream"},
             )
+
+
+class InMemoryRoundTrip(unittest.TestCase):
+    """Word arrays and JSON text survive decode/encode without touching disk"""
+
+    @settings(max_examples=examples(50_000), deadline=None)
+    @given(words=word_arrays)
+    def test_words(self, words) -> None:
+        bs = Bitstream.from_words(words)
+        self.assertEqual(words, bs.to_words())
+        text = bs.to_json_str()
+        self.assertEqual(words, _int_to_words(Bitstream._bits_from_json_str(text)))
+
+    @settings(max_examples=200, deadline=None)
+    @given(bs=bitstreams())
+    def test_objects(self, bs) -> None:
+        reloaded = Bitstream.from_json_str(bs.to_json_str())
+        self.assertEqual(bs.to_words(), reloaded.to_words())
+        self.assertEqual(vars(bs), vars(reloaded))
+
+
+class DirtyTracking(unittest.TestCase):
+    """Only edited fields are re-encoded, and the result matches a full encode"""
+
+    @settings(max_examples=100, deadline=None)
+    @given(bs=bitstreams(), other=bitstreams(), ble=enum(BLEXY), mux=st.integers(0, 15))
+    def test_incremental_matches_full_encode(self, bs, other, ble, mux) -> None:
+        bs._update_bitstream()
+        self.assertEqual([], bs.dirty_fields())
+
+        bs.LUTS[ble].LUT_CONFIG = other.LUTS[ble].LUT_CONFIG
+        bs.LUTS[ble].LUT_I_C = other.LUTS[ble].LUT_I_C
+        bs.MUXS[mux] = other.MUXS[mux]  # replaced objects are re-encoded whole
+        bs.COUNTER.CNT_STOP = other.COUNTER.CNT_STOP
+        self.assertEqual(
+            [
+                f"BLE{ble.value}.LUT_CONFIG",
+                f"BLE{ble.value}.LUT_I_C",
+                f"MUX{mux}.CLBIN",
+                f"MUX{mux}.INSYNC",
+                "COUNTER.CNT_STOP",
+            ],
+            bs.dirty_fields(),
+        )
+
+        bs._update_bitstream()
+        incremental = bs._bits
+        bs._forget_sync()
+        bs._update_bitstream()
+        self.assertEqual(bs._bits, incremental)
+
+    def test_changed_words(self) -> None:
+        bs = Bitstream()
+        for cfg in bs.LUTS.values():
+            cfg.LUT_CONFIG = "01" * 8
+        self.assertNotEqual([], bs.changed_words())
+        with tempfile.TemporaryDirectory() as d:
+            bs.save_bitstream(Path(d) / "bs.json")
+        self.assertEqual([], bs.changed_words())
+        saved = bs._words()
+
+        bs.LUTS[BLEXY.BLE_0_X1Y2].LUT_CONFIG = "1" * 16
+        self.assertEqual(["BLE0.LUT_CONFIG"], bs.dirty_fields())
+        words = bs.changed_words()
+        self.assertEqual(
+            [i for i, (a, b) in enumerate(zip(saved, bs._words())) if a != b], words
+        )
+        self.assertEqual([], bs.dirty_fields())
+
+
+class Patch(unittest.TestCase):
+    """Applying the saved patch to the base yields the new bitstream"""
+
+    def assertPatches(self, base: Bitstream, new: Bitstream) -> None:
+        with tempfile.TemporaryDirectory() as d:
+            fn = Path(d) / "patch.json"
+            new.save_patch(base, fn)
+            changes = load_patch(fn)
+        words = list(base._words())
+        for change in changes:
+            self.assertEqual(words[change.index], change.old)
+            words[change.index] = change.new
+        self.assertEqual(tuple(words), new._words())
+
+    @settings(max_examples=100, deadline=None)
+    @given(base=bitstreams(), new=bitstreams())
+    def test_unrelated_designs(self, base, new) -> None:
+        self.assertPatches(base, new)
+
+    @settings(max_examples=100, deadline=None)
+    @given(base=bitstreams(), ble=enum(BLEXY))
+    def test_single_lut_edit(self, base, ble) -> None:
+        base._update_bitstream()
+        new = Bitstream()
+        new._bits = base._bits
+        new._parse_bitstream()
+        new.LUTS[ble].LUT_CONFIG = f"{~int(base.LUTS[ble].LUT_CONFIG, 2) & 0xFFFF:016b}"
+        self.assertLessEqual(len(new.diff(base)), 3)  # a LUT spans 3 words
+        self.assertPatches(base, new)
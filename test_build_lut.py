@@ -0,0 +1,98 @@
+import operator
+import unittest
+
+from hypothesis import strategies as st, given
+
+from build_lut import LUT4, Expr, LUTCache, a, b, c, d, configure_lut_cache
+
+_T = 1
+
+
+def _at_least_t(n: int) -> bool:
+    return n >= _T
+
+
+_OPS = (operator.and_, operator.or_, operator.xor, operator.eq, operator.ne)
+
+
+def exprs():
+    """(Expr, reference predicate over the (a, b, c, d) tuple) pairs"""
+    leaves = st.sampled_from(
+        [(v, lambda bits, i=i: bits[i]) for i, v in enumerate((a, b, c, d))]
+    )
+
+    def extend(children):
+        inv = children.map(lambda x: (~x[0], lambda bits, f=x[1]: not f(bits)))
+        binary = st.tuples(st.sampled_from(range(len(_OPS))), children, children).map(
+            lambda t: (
+                _OPS[t[0]](t[1][0], t[2][0]),
+                lambda bits, op=_OPS[t[0]], l=t[1][1], r=t[2][1]: bool(
+                    op(l(bits), r(bits))
+                ),
+            )
+        )
+        return inv | binary
+
+    return st.recursive(leaves, extend, max_leaves=12)
+
+
+class TruthTable(unittest.TestCase):
+    @given(pair=exprs())
+    def test_matches_reference(self, pair) -> None:
+        expr, ref = pair
+        self.assertEqual(LUT4(expr).bitstream(), LUT4(Expr(ref)).bitstream())
+        self.assertEqual(
+            LUT4(expr).bitstream(),
+            LUT4(lambda *bits, f=ref: f(bits)).bitstream(),
+        )
+
+    def test_inputs(self) -> None:
+        self.assertEqual(LUT4(a).bitstream(), "1010101010101010")
+        self.assertEqual(LUT4(d).bitstream(), "1111111100000000")
+        self.assertEqual(LUT4(~(a ^ a)).bitstream(), "1" * 16)
+
+
+class Cache(unittest.TestCase):
+    def test_lru(self) -> None:
+        cache = LUTCache(maxsize=2)
+        for key in (1, 2, 1, 3, 2):
+            cache.get(key, lambda k=key: k)
+        # 2 was the least recently used entry when 3 was added
+        self.assertEqual(cache.info(), (1, 4, 2, 2))
+        cache.resize(0)
+        self.assertEqual(cache.get(4, lambda: 4), 4)
+        self.assertEqual(cache.info().currsize, 0)
+
+    def test_callable_reading_mutable_state(self) -> None:
+        class Cfg:
+            inv = False
+
+        cfg = Cfg()
+
+        def lut() -> int:
+            return LUT4(lambda a, b, c, d, k=cfg: (not a) if k.inv else a).tt
+
+        self.assertEqual(lut(), 0xAAAA)
+        cfg.inv = True
+        self.assertEqual(lut(), 0x5555)
+
+    def test_callable_calling_helper_that_reads_a_global(self) -> None:
+        global _T
+        tables = []
+        try:
+            for _T in (1, 3):
+                tables.append(LUT4(lambda a, b, c, d: _at_least_t(a + b + c + d)).tt)
+        finally:
+            _T = 1
+        self.assertEqual([0xFFFE, 0xE880], tables)
+
+    def test_callable_key_sees_captured_values(self) -> None:
+        configure_lut_cache(16)
+        self.addCleanup(configure_lut_cache, 0)
+
+        def lut(on_set):
+            return LUT4(lambda a, b, c, d, S=on_set: a + 2 * b + 4 * c + 8 * d in S)
+
+        self.assertEqual(lut({0, 3}).tt, 0b1001)
+        self.assertEqual(lut({0, 3}).tt, 0b1001)
+        self.assertEqual(lut({1}).tt, 0b0010)
@@ -0,0 +1,54 @@
+import unittest
+import warnings
+
+from hypothesis import given, settings
+
+from build_lut import LUT4, a
+from clb_analysis import analyze
+from clb_sim import CombinationalLoopError, compile_clb
+from data_model import BLE_CFG, BLEXY, FLOPSEL, LUT_IN_A
+from design_fixtures import bitstreams, example_design
+
+
+def _chain(bs, ble: BLEXY, src: LUT_IN_A, flop=FLOPSEL.DISABLE) -> None:
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        bs.LUTS[ble] = BLE_CFG(LUT4(a).bitstream(), flop, src)
+
+
+class Analysis(unittest.TestCase):
+    def test_depth_and_critical_path(self) -> None:
+        bs = example_design()
+        # IN0 -> BLE3 -> BLE4 -> BLE0 -> PPS_OUT0
+        _chain(bs, BLEXY.BLE_3_X4Y2, LUT_IN_A.IN0)
+        _chain(bs, BLEXY.BLE_4_X1Y3, LUT_IN_A.CLB_BLE_3)
+        _chain(bs, BLEXY.BLE_0_X1Y2, LUT_IN_A.CLB_BLE_4)
+        report = analyze(bs)
+        self.assertFalse(report.has_loops)
+        self.assertEqual(report.endpoints["PPS_OUT0"], 3)
+        self.assertEqual(report.endpoints["IRQ_OUT0"], 1)
+        self.assertEqual(report.endpoints["BLE1.D"], 1)
+        self.assertEqual(report.critical_endpoint, "PPS_OUT0")
+        self.assertEqual(report.critical_path, [3, 4, 0])
+
+    def test_loop(self) -> None:
+        bs = example_design()
+        _chain(bs, BLEXY.BLE_0_X1Y2, LUT_IN_A.CLB_BLE_4)
+        _chain(bs, BLEXY.BLE_4_X1Y3, LUT_IN_A.CLB_BLE_0)
+        report = analyze(bs)
+        self.assertEqual(report.loops, [(0, 4)])
+        self.assertIsNone(report.endpoints["PPS_OUT0"])
+        # a flip-flop breaks the loop
+        _chain(bs, BLEXY.BLE_4_X1Y3, LUT_IN_A.CLB_BLE_0, FLOPSEL.ENABLE)
+        self.assertFalse(analyze(bs).has_loops)
+
+    @settings(max_examples=100, deadline=None)
+    @given(bs=bitstreams())
+    def test_agrees_with_simulator(self, bs) -> None:
+        report = analyze(bs)
+        try:
+            compile_clb(bs)
+        except CombinationalLoopError:
+            self.assertTrue(report.has_loops)
+        else:
+            self.assertFalse(report.has_loops)
@@ -0,0 +1,45 @@
+import unittest
+
+from build_lut import LUT4, a, b
+from clb_graph import IncrementalDot, build_netlist_index, generate_dot_from_config
+from data_model import BLEXY, LUT_IN_B
+from design_fixtures import example_design
+
+
+class NetlistIndex(unittest.TestCase):
+    def test_drivers_and_consumers(self) -> None:
+        index = build_netlist_index(example_design())
+        self.assertEqual(index.drivers["PPS_OUT0"], 0)
+        self.assertEqual(index.drivers["IRQ_OUT0"], 2)
+        self.assertEqual(index.drivers["COUNTER.CNT_STOP"], 31)
+        self.assertEqual(index.drivers["COUNTER.CNT_RESET"], 30)
+        self.assertIn("BLE1.LUT_I_A", index.consumers[1])
+        self.assertTrue(index.ble_output_used(BLEXY.BLE_0_X1Y2.value))
+        # BLE1 only feeds its own LUT
+        self.assertFalse(index.ble_output_used(BLEXY.BLE_1_X2Y2.value))
+
+
+class Incremental(unittest.TestCase):
+    def test_update_patches_edited_ble(self) -> None:
+        bs = example_design()
+        graph = IncrementalDot(bs)
+        self.assertFalse(graph.update())
+
+        lut = bs.LUTS[BLEXY.BLE_3_X4Y2]
+        lut.LUT_CONFIG = LUT4(a ^ b).bitstream()
+        lut.LUT_I_B = LUT_IN_B.IN4
+        delta = graph.update()
+        self.assertEqual(graph.dot(), generate_dot_from_config(bs))
+        self.assertEqual(set(delta.nodes), {"clb3"})
+        self.assertEqual(len(delta.added_edges), 2)
+        self.assertFalse(delta.removed_edges)
+
+        lut.LUT_CONFIG = "0" * 16
+        delta = graph.update()
+        self.assertEqual(delta.nodes, {"clb3": None})
+        self.assertEqual(len(delta.removed_edges), 2)
+        self.assertEqual(graph.dot(), generate_dot_from_config(bs))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import copy
+import unittest
+
+from clb_netlist import (
+    SIG_BLE,
+    SIG_COUNT_IS,
+    SIG_IN,
+    SIG_ZERO,
+    SINK_PPS,
+    active_mask,
+    lut_input_signal,
+    netlist_of,
+    signal_from_name,
+    signal_name,
+)
+from data_model import BLEXY, LUT_IN_A, get_active_lut_inputs
+from design_fixtures import example_design
+
+
+class Netlist(unittest.TestCase):
+    def test_active_mask(self) -> None:
+        for tt in range(0, 1 << 16, 97):
+            active = get_active_lut_inputs(f"{tt:016b}")
+            expected = sum(1 << k for k, c in enumerate("ABCD") if active[c])
+            self.assertEqual(active_mask(tt), expected)
+
+    def test_signals(self) -> None:
+        net = netlist_of(example_design())
+        self.assertEqual(net.lut_src[0][0], SIG_IN + 0)
+        self.assertEqual(net.lut_src[1][0], SIG_BLE + 1)
+        self.assertEqual(net.lut_src[2][0], SIG_COUNT_IS + 0)
+        self.assertEqual(net.active[0], 0b0001)
+        self.assertTrue(net.is_flop(1))
+        self.assertEqual(net.pps[0], SIG_BLE + 0)
+        self.assertEqual(net.cnt_stop, SIG_BLE + 31)
+        self.assertIn((SIG_BLE + 0, SINK_PPS), net.edges)
+        self.assertNotIn(SIG_ZERO, {sig for sig, _ in net.edges})
+        self.assertEqual(SIG_BLE + 8, lut_input_signal(1, None))
+
+    def test_names(self) -> None:
+        self.assertEqual(signal_name(SIG_COUNT_IS + 3), "COUNT_IS_B2")
+        self.assertEqual(signal_from_name("CLB_BLE_7"), SIG_BLE + 7)
+        self.assertEqual(signal_from_name("BLE_7"), SIG_BLE + 7)
+        self.assertIsNone(signal_from_name("FOSC"))
+
+    def test_cache_follows_edits(self) -> None:
+        bs = example_design()
+        net = netlist_of(bs)
+        self.assertIs(netlist_of(bs), net)
+        bs.LUTS[BLEXY.BLE_0_X1Y2].LUT_I_A = LUT_IN_A.IN1
+        self.assertEqual(netlist_of(bs).lut_src[0][0], SIG_IN + 1)
+        self.assertNotIn("_netlist", vars(bs))
+        self.assertIsNot(netlist_of(copy.copy(bs)), netlist_of(bs))
+
+
+if __name__ == "__main__":
+    unittest.main()
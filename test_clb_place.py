@@ -0,0 +1,121 @@
+import unittest
+
+from hypothesis import assume, given, settings, strategies as st
+
+from auto_ble import LUT_IN
+from build_lut import a, b
+from clb_place import Cell, place, route_name
+from clb_sim import CLBSimulator
+from data_model import BLEXY
+
+_SWIN = [LUT_IN[f"CLBSWIN{k}"] for k in range(32)]
+
+
+@st.composite
+def netlists(draw):
+    """Acyclic netlists of up to 32 cells reading CLBSWIN bits and earlier
+    cells."""
+    n = draw(st.integers(1, 32))
+    cells = {}
+    for i in range(n):
+        sources = draw(
+            st.lists(
+                st.one_of(
+                    st.sampled_from(range(32)).map(_SWIN.__getitem__),
+                    *([st.sampled_from([f"c{j}" for j in range(i)])] if i else []),
+                ),
+                max_size=4,
+                unique=True,
+            )
+        )
+        cells[f"c{i}"] = Cell(draw(st.integers(0, 0xFFFF)), *sources)
+    return cells
+
+
+def _expected(cells, swin: int) -> dict[str, int]:
+    values: dict[str, int] = {}
+    for name, cell in cells.items():
+        row = 0
+        for v, src in cell.inputs:
+            if isinstance(src, str) and src in values:
+                bit = values[src]
+            else:  # a CLBSWIN bit, maybe read through a route-through cell
+                sig = src if isinstance(src, str) else src.name
+                bit = swin >> int(sig.rpartition("CLBSWIN")[2]) & 1
+            row |= bit << v
+        values[name] = cell.tt >> row & 1
+    return values
+
+
+class Place(unittest.TestCase):
+    @settings(max_examples=200, deadline=None)
+    @given(cells=netlists(), stimulus=st.lists(st.integers(0, 2**32 - 1), max_size=8))
+    def test_placed_design_computes_the_netlist(self, cells, stimulus) -> None:
+        try:
+            placement = place(cells)
+        except ValueError:
+            assume(False)
+        self.assertEqual(len(placement.bles), len(set(placement.bles.values())))
+        self.assertLessEqual(set(cells), set(placement.bles))
+        sim = CLBSimulator(placement.bitstream)
+        for swin in stimulus:
+            sim.step(swin=swin)
+            outputs = sim.ble_outputs()
+            for name, value in _expected(cells, swin).items():
+                self.assertEqual(value, outputs >> placement.bles[name].value & 1)
+
+    def test_flop_and_pins(self) -> None:
+        cells = {
+            "en": Cell(LUT_IN.CLBSWIN0 & LUT_IN.CLBSWIN8),
+            "q": Cell(a ^ b, "q", "en", flopsel=True),
+        }
+        reserved = [BLEXY(i) for i in range(8, 16)]
+        placement = place(cells, pinned={"q": BLEXY.BLE_20_X1Y7}, reserved=reserved)
+        self.assertEqual(BLEXY.BLE_20_X1Y7, placement.bles["q"])
+        self.assertNotIn(placement.bles["en"], reserved)
+        sim = CLBSimulator(placement.bitstream)
+        q = []
+        for en in (1, 1, 0, 1):
+            sim.step(swin=0x101 * en)
+            q.append(sim.ble_outputs() >> 20 & 1)
+        self.assertEqual([1, 0, 0, 1], q)
+
+    def test_route_through(self) -> None:
+        # CLBSWIN0-3 are all on port A, three of them need a route-through
+        s0, s1, s2, s3 = _SWIN[:4]
+        cells = {"y": Cell(s0 & s1 | s2 ^ s3), "z": Cell(a & b, s1, s2)}
+        self.assertEqual(3, len(cells["y"].routes))
+        placement = place(cells)
+        self.assertIn(route_name(s2), placement.bles)
+        self.assertEqual(2 + 3, len(set(placement.bles.values())))
+        sim = CLBSimulator(placement.bitstream)
+        for swin in range(16):
+            sim.step(swin=swin)
+            bits = [swin >> k & 1 for k in range(4)]
+            y = bits[0] & bits[1] | bits[2] ^ bits[3]
+            z = bits[1] & bits[2]
+            outputs = sim.ble_outputs()
+            self.assertEqual(y, outputs >> placement.bles["y"].value & 1)
+            self.assertEqual(z, outputs >> placement.bles["z"].value & 1)
+
+    def test_unplaceable(self) -> None:
+        # every cell must go to port A's group, which has only eight BLEs
+        cells = {f"x{i}": Cell(LUT_IN.IN0) for i in range(9)}
+        for i in range(9):
+            cells[f"y{i}"] = Cell(
+                lambda a, b, c, d: a and b and c and d,
+                f"x{i}",
+                LUT_IN.IN4,
+                LUT_IN.IN8,
+                LUT_IN.IN12,
+            )
+        with self.assertRaises(ValueError):
+            place(cells)
+        del cells["x8"], cells["y8"]
+        place(cells)
+        with self.assertRaises(ValueError):
+            place(cells, pinned={"x0": BLEXY.BLE_8_X1Y4})
+        with self.assertRaises(ValueError):
+            place({"y": Cell(a, "nope")})
+        with self.assertRaises(ValueError):
+            Cell(lambda *v: all(v), *_SWIN[:5])
@@ -0,0 +1,122 @@
+import random
+import unittest
+import warnings
+
+from hypothesis import strategies as st, given, settings
+
+from build_lut import LUT4, a, b
+from clb_sim import (
+    CLBSimulator,
+    CombinationalLoopError,
+    SimOutputs,
+    VectorSimulator,
+    compile_clb,
+    exhaustive_patterns,
+)
+from data_model import (
+    FASM,
+    BLE_CFG,
+    BLEXY,
+    CLBIN,
+    CLBInputSync,
+    FLOPSEL,
+    LUT_IN_A,
+    LUT_IN_B,
+)
+from design_fixtures import bitstreams, example_design
+
+
+class Simulator(unittest.TestCase):
+    def test_design(self) -> None:
+        sim = CLBSimulator(example_design())
+        outs = list(sim.run([{CLBIN.CLBIN0PPS: 1}, {}, {0: 1}] + [{}] * 6))
+        self.assertEqual([o.pps for o in outs], [1, 0, 1, 0, 0, 0, 0, 0, 0])
+        self.assertEqual([o.irq for o in outs], [0, 0, 0, 1, 0, 0, 0, 0, 0])
+        self.assertEqual(sim.count, 1)
+        self.assertEqual(sim.ble_outputs() >> 1 & 1, 1)  # toggled 9 times
+
+    def test_edge_detect(self) -> None:
+        bs = example_design()
+        bs.MUXS[0].INSYNC = CLBInputSync.SYNC | CLBInputSync.EDGE_DETECT
+        sim = CLBSimulator(bs)
+        level = [0, 1, 1, 1, 0, 1, 1]
+        outs = [sim.step({CLBIN.CLBIN0PPS: v}).pps for v in level]
+        self.assertEqual(outs, [0, 0, 1, 0, 0, 0, 1])
+
+    def test_loop(self) -> None:
+        bs = example_design()
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            bs.LUTS[BLEXY.BLE_8_X1Y4] = BLE_CFG(
+                LUT4(a & b).bitstream(),
+                FLOPSEL.DISABLE,
+                LUT_IN_A.CLB_BLE_0,
+                LUT_IN_B.CLB_BLE_8,
+            )
+        with self.assertRaises(CombinationalLoopError) as ctx:
+            compile_clb(bs)
+        self.assertEqual(ctx.exception.bles, (8,))
+
+    @settings(max_examples=100, deadline=None)
+    @given(bs=bitstreams())
+    def test_fasm_compiles_the_same(self, bs) -> None:
+        fasm = FASM(bs.to_fasm().splitlines())
+        try:
+            expected = compile_clb(bs)
+        except CombinationalLoopError:
+            with self.assertRaises(CombinationalLoopError):
+                compile_clb(fasm)
+            return
+        self.assertEqual(compile_clb(fasm), expected)
+
+
+class Vector(unittest.TestCase):
+    """VectorSimulator lanes must match independent CLBSimulator runs"""
+
+    WIDTH = 16
+
+    @settings(max_examples=100, deadline=None)
+    @given(
+        bs=bitstreams(),
+        seed=st.integers(0, 2**32 - 1),
+        use_numpy=st.booleans(),
+    )
+    def test_matches_scalar(self, bs, seed, use_numpy) -> None:
+        try:
+            prog = compile_clb(bs)
+        except CombinationalLoopError:
+            return
+        rnd = random.Random(seed)
+        vec = VectorSimulator(prog, self.WIDTH, use_numpy=use_numpy)
+        scalar = [CLBSimulator(prog) for _ in range(self.WIDTH)]
+        swin = {k: rnd.getrandbits(self.WIDTH) for k in range(32)}
+        vec.step(swin={k: vec.lanes(v) for k, v in swin.items()})
+        for lane, sim in enumerate(scalar):
+            sim.step(swin=sum((v >> lane & 1) << k for k, v in swin.items()))
+
+        for _ in range(8):
+            inputs = {src: rnd.getrandbits(self.WIDTH) for src in range(32)}
+            out = vec.step({k: vec.lanes(v) for k, v in inputs.items()})
+            for lane, sim in enumerate(scalar):
+                expected = sim.step({k: v >> lane & 1 for k, v in inputs.items()})
+                for name in SimOutputs._fields:
+                    got = sum(
+                        (vec.to_int(v) >> lane & 1) << n
+                        for n, v in enumerate(getattr(out, name))
+                    )
+                    self.assertEqual(got, getattr(expected, name))
+        self.assertEqual(vec.count, [sim.count for sim in scalar])
+
+    def test_exhaustive(self) -> None:
+        bs = example_design()
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            bs.LUTS[BLEXY.BLE_0_X1Y2] = BLE_CFG(
+                LUT4(a ^ b).bitstream(), FLOPSEL.DISABLE, LUT_IN_A.IN0, LUT_IN_B.IN4
+            )
+        bs.MUXS[4].CLBIN = CLBIN.CLBIN1PPS
+        bs.MUXS[4].INSYNC = CLBInputSync.DIRECT_IN
+        in0, in4 = exhaustive_patterns(2)
+        sim = VectorSimulator(bs, 4)
+        out = sim.step({CLBIN.CLBIN0PPS: in0, CLBIN.CLBIN1PPS: in4})
+        self.assertEqual(out.pps[0], 0b0110)
@@ -0,0 +1,66 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import corpus_check
+from corpus_check import discover_cases, run
+from data_model import BLEXY
+from design_fixtures import example_design
+
+
+class CorpusCheck(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.base = Path(tmp.name)
+        for name in ("good", "bad", "no_fasm"):
+            (self.base / name).mkdir()
+        bs = example_design()
+        bs.save_bitstream(self.base / "good" / "design.result.json")
+        bs.save_fasm(self.base / "good" / "design.fasm")
+        bs.save_bitstream(self.base / "no_fasm" / "design.result.json")
+        bs.save_fasm(self.base / "bad" / "design.fasm")
+        bs.LUTS[BLEXY.BLE_0_X1Y2].LUT_CONFIG = "1" * 16
+        bs.save_bitstream(self.base / "bad" / "design.result.json")
+
+    def statuses(self, **kwargs) -> dict[str, tuple[str, bool]]:
+        return {
+            r.dir_path.name: (r.status, r.cached)
+            for r in run(self.base, jobs=2, **kwargs)
+        }
+
+    def test_discovery(self) -> None:
+        self.assertEqual(
+            ["bad", "good"], [c.dir_path.name for c in discover_cases(self.base)]
+        )
+
+    def test_results_and_cache(self) -> None:
+        cache = self.base / "cache.json"
+        self.assertEqual(
+            {"good": ("pass", False), "bad": ("fail", False)},
+            self.statuses(cache_file=cache),
+        )
+        self.assertEqual(
+            {"good": ("pass", True), "bad": ("fail", True)},
+            self.statuses(cache_file=cache),
+        )
+        (self.base / "good" / "design.fasm").touch()
+        example_design().save_bitstream(self.base / "bad" / "design.result.json")
+        self.assertEqual(
+            {"good": ("pass", True), "bad": ("pass", False)},
+            self.statuses(cache_file=cache),
+        )
+
+    def test_code_change_invalidates_cache(self) -> None:
+        cache = self.base / "cache.json"
+        self.statuses(cache_file=cache)
+        with mock.patch.object(corpus_check, "_CHECK_VERSION", "edited"):
+            self.assertEqual(
+                {"good": ("pass", False), "bad": ("fail", False)},
+                self.statuses(cache_file=cache),
+            )
+
+    def test_failure_message(self) -> None:
+        (bad,) = [r for r in run(self.base, jobs=1) if r.status == "fail"]
+        self.assertIn("BLE0.LUT_CONFIG", bad.message)
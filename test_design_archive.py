@@ -0,0 +1,78 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from hypothesis import given, settings, strategies as st
+
+from batch_codec import decode_batch
+from bitstream import Bitstream
+from design_archive import Archive, ArchiveWriter, BitstreamView, write_archive
+from design_fixtures import example_design, word_arrays
+
+
+class DesignArchive(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = Path(tmp.name) / "corpus.clba"
+
+    @settings(max_examples=50, deadline=None)
+    @given(designs=st.lists(word_arrays, max_size=20))
+    def test_round_trip(self, designs) -> None:
+        meta = [{"n": i} for i in range(len(designs))]
+        self.assertEqual(len(designs), write_archive(self.path, designs, meta))
+        with Archive(self.path) as archive:
+            self.assertEqual(len(designs), len(archive))
+            for i in reversed(range(len(designs))):  # random access
+                self.assertEqual(designs[i], archive.words(i))
+                self.assertEqual({"n": i}, archive.meta(i))
+            self.assertEqual(
+                designs, [tuple(row) for row in archive.word_array().tolist()]
+            )
+
+    def test_bitstreams(self) -> None:
+        bs = example_design()
+        with ArchiveWriter(self.path) as w:
+            self.assertEqual(0, w.append(bs))
+            self.assertEqual(1, w.append(bs.to_words()))
+        with Archive(self.path) as archive:
+            self.assertEqual(bs.to_words(), archive[1].to_words())
+            self.assertEqual(bs.to_words(), archive[-1].to_words())
+            self.assertIsNone(archive.meta(0))
+            self.assertEqual(bytes(archive.record(0)), bytes(archive.record(1)))
+            batch = decode_batch(archive.word_array())
+            self.assertEqual(bs.to_words(), batch.bitstream(0).to_words())
+            with self.assertRaises(IndexError):
+                archive.words(2)
+
+    @settings(max_examples=50, deadline=None)
+    @given(designs=st.lists(word_arrays, min_size=1, max_size=5))
+    def test_view(self, designs) -> None:
+        write_archive(self.path, designs)
+        with Archive(self.path) as archive:
+            views = [archive.view(i) for i in range(len(archive))]
+            rows = archive.word_array()
+        for i, (words, view) in enumerate(zip(designs, views)):
+            bs = Bitstream.from_words(words)
+            for slots, cfgs in (
+                (view.LUTS, bs.LUTS),
+                (view.MUXS, bs.MUXS),
+                (view.PPS_OUT, bs.PPS_OUT),
+                (view.IRQ_OUT, bs.IRQ_OUT),
+            ):
+                self.assertEqual(set(cfgs), set(slots))
+                for key, cfg in cfgs.items():
+                    for name in dir(slots[key]):
+                        self.assertEqual(getattr(cfg, name), getattr(slots[key], name))
+            for name in dir(view.COUNTER):
+                self.assertEqual(getattr(bs.COUNTER, name), getattr(view.COUNTER, name))
+            self.assertEqual(bs.CLKDIV, view.CLKDIV)
+            self.assertEqual(words, view.words())
+            self.assertEqual(words, view.to_bitstream().to_words())
+            self.assertEqual(words, BitstreamView(rows[i]).words())
+            self.assertEqual(words, BitstreamView(rows[i].astype("<u2")).words())
+
+    def test_not_an_archive(self) -> None:
+        self.path.write_bytes(b"{}" * 40)
+        with self.assertRaises(ValueError):
+            Archive(self.path)
@@ -0,0 +1,80 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from clb_graph import generate_dot_from_config
+from data_model import BLEXY, OESELn
+import design_cache
+from design_cache import DesignCache, design_key
+from design_fixtures import example_design
+
+
+class Cache(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+
+    def test_keyed_by_content(self) -> None:
+        bs = example_design()
+        bs.save_bitstream(self.dir / "a.json")
+        bs.save_bitstream(self.dir / "b.json")
+        calls = []
+
+        def compute(design):
+            calls.append(design)
+            return generate_dot_from_config(design)
+
+        with DesignCache(self.dir / "cache.sqlite") as cache:
+            first = cache.get(self.dir / "a.json", "dot", compute)
+            self.assertEqual(first, cache.get(self.dir / "b.json", "dot", compute))
+            self.assertEqual(first, cache.get(bs, "dot", compute))
+            self.assertEqual(1, len(calls))
+        self.assertEqual(design_key(bs), design_key(bs._words()))
+
+        with DesignCache(self.dir / "cache.sqlite") as cache:  # survives reopening
+            self.assertEqual(first, cache.dot(self.dir / "a.json"))
+            lut = cache.fields(bs)["BLE0.LUT_CONFIG"]
+            self.assertEqual(bs.LUTS[BLEXY.BLE_0_X1Y2].LUT_CONFIG, f"{lut:016b}")
+            self.assertEqual([], cache.analysis(bs).loops)
+
+    def test_settings_outside_the_image_bypass_the_cache(self) -> None:
+        bs = example_design()
+        with DesignCache(self.dir / "cache.sqlite") as cache:
+            cache.dot(bs)
+            bs.OE[0] = OESELn.BLE_31
+            self.assertEqual(generate_dot_from_config(bs), cache.dot(bs))
+
+    def test_code_change_invalidates(self) -> None:
+        bs = example_design()
+        bs.save_bitstream(self.dir / "a.json")
+        kind = f"dot:main@{design_cache._DOT_VERSION}"
+        with DesignCache(self.dir / "cache.sqlite") as cache:
+            cache.get(self.dir / "a.json", kind, lambda bs: "stale")
+            self.assertEqual("stale", cache.dot(self.dir / "a.json"))
+            with mock.patch.object(design_cache, "_DOT_VERSION", "edited"):
+                dot = cache.dot(self.dir / "a.json")
+        self.assertEqual(generate_dot_from_config(bs), dot)
+
+    def test_shared_between_connections(self) -> None:
+        path = self.dir / "cache.sqlite"
+        with DesignCache(path) as first, DesignCache(path) as second:
+
+            def compute(bs):
+                # the other worker stores the same result in the meantime
+                second.get([0] * 102, "a", lambda bs: b"second")
+                return b"first"
+
+            self.assertEqual(b"first", first.get([0] * 102, "a", compute))
+            self.assertEqual(b"first", second.get([0] * 102, "a", lambda bs: b""))
+            second.get([1] * 102, "a", lambda bs: b"other")
+            self.assertEqual(first.size, second.size)
+
+    def test_eviction(self) -> None:
+        with DesignCache(self.dir / "cache.sqlite", max_bytes=100) as cache:
+            cache.get([0] * 102, "a", lambda bs: b"x" * 60)
+            cache.get([0] * 102, "b", lambda bs: b"y" * 60)
+            self.assertLessEqual(cache.size, 100)
+            self.assertEqual(b"z", cache.get([0] * 102, "a", lambda bs: b"z"))
+            self.assertEqual(b"y" * 60, cache.get([0] * 102, "b", lambda bs: b""))
@@ -0,0 +1,98 @@
+import unittest
+import warnings
+
+from hypothesis import given, settings
+
+from build_lut import LUT4, a, b
+from clb_sim import CLBSimulator
+from data_model import (
+    BITSTREAM_LAYOUT,
+    BLE_CFG,
+    BLEXY,
+    FLOPSEL,
+    LUT_IN_A,
+    LUT_IN_B,
+    OESELn,
+    FASM,
+)
+from design_diff import diff_designs, format_diff
+from design_fixtures import bitstreams, example_design
+
+BLE0 = BLEXY.BLE_0_X1Y2
+
+
+def _set_lut(bs, expr, **inputs) -> None:
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        bs.LUTS[BLE0] = BLE_CFG(
+            LUT4(expr).bitstream(), FLOPSEL.DISABLE, LUT_IN_A.IN0, **inputs
+        )
+
+
+class DesignDiff(unittest.TestCase):
+    @settings(max_examples=100, deadline=None)
+    @given(old=bitstreams(), new=bitstreams())
+    def test_matches_layout_fields(self, old, new) -> None:
+        changes = diff_designs(old, new)
+        expected = [
+            name
+            for name, f in BITSTREAM_LAYOUT.items()
+            if f.extract(old._bits) != f.extract(new._bits)
+        ]
+        self.assertEqual(expected, [c.name for c in changes])
+        self.assertEqual([], diff_designs(old, old))
+
+    def test_ignored_input_rerouted(self) -> None:
+        old, new = example_design(), example_design()
+        _set_lut(old, a, LUT_I_B=LUT_IN_B.IN4)
+        _set_lut(new, a, LUT_I_B=LUT_IN_B.IN5)
+        (change,) = diff_designs(old, new)
+        self.assertEqual("BLE0.LUT_I_B", change.name)
+        self.assertTrue(change.equivalent)
+
+        _set_lut(new, a & b, LUT_I_B=LUT_IN_B.IN5)
+        changes = diff_designs(old, new)
+        self.assertEqual(["BLE0.LUT_CONFIG", "BLE0.LUT_I_B"], [c.name for c in changes])
+        self.assertFalse(any(c.equivalent for c in changes))
+
+    def test_init_differs_on_unconnected_input(self) -> None:
+        old, new = FASM([]), FASM([])
+        _set_lut(old, a)
+        _set_lut(new, a | b)  # only differs where B (unset, i.e. BLE 8) is 1
+        (change,) = diff_designs(old, new)
+        self.assertEqual("BLE0.LUT_CONFIG", change.name)
+        self.assertFalse(change.equivalent)
+
+    def test_unset_select_is_select_zero(self) -> None:
+        old, new = FASM([]), FASM([])
+        _set_lut(old, a & b)
+        _set_lut(new, a & b, LUT_I_B=LUT_IN_B.CLB_BLE_8)
+        (change,) = diff_designs(old, new)
+        self.assertEqual("BLE0.LUT_I_B", change.name)
+        self.assertTrue(change.equivalent)
+        self.assertTrue(format_diff([change]).endswith("(equivalent)"))
+
+    def test_unset_select_agrees_with_simulator(self) -> None:
+        designs = []
+        for sel in (None, LUT_IN_A.CLB_BLE_0):
+            design = FASM([])
+            design.LUTS[BLE0] = BLE_CFG("1" * 16, FLOPSEL.DISABLE)
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")  # LUT_I_A is used but unset
+                design.LUTS[BLEXY(1)] = BLE_CFG(
+                    LUT4(a).bitstream(), FLOPSEL.DISABLE, sel
+                )
+            designs.append(design)
+        (change,) = diff_designs(*designs)
+        self.assertEqual("BLE1.LUT_I_A", change.name)
+        self.assertTrue(change.equivalent)
+        for design in designs:
+            sim = CLBSimulator(design)
+            sim.step()
+            self.assertEqual(1, sim.ble_outputs() >> 1 & 1)
+
+    def test_fasm_only_settings(self) -> None:
+        old, new = example_design(), example_design()
+        new.OE[2] = OESELn.BLE_31
+        new.TIMR0_IN = "CLB_BLE_3"
+        self.assertEqual(["OE2", "TIMR0_IN"], [c.name for c in diff_designs(old, new)])
@@ -0,0 +1,84 @@
+import unittest
+import warnings
+
+from hypothesis import given, settings
+
+from data_model import (
+    FASM,
+    FASMParseError,
+    FASMWarning,
+    BLEXY,
+    CLKDIV,
+    CLBIN,
+    CLBInputSync,
+    FLOPSEL,
+    LUT_IN_A,
+    LUT_IN_B,
+    iter_fasm_lines,
+)
+from design_fixtures import bitstreams
+
+SAMPLE = """\
+# comment
+
+BLE_X1Y2.BLE0.FLOPSEL.ENABLE
+BLE_X1Y2.BLE0.LUT.INIT[15:0] = 16'b1110101111110100
+BLE_X1Y2.BLE0_LI0.LO_0_1
+BLE_X1Y2.BLE0_LI1.IN4
+MUX3.CLBIN[5:0] = 6'b000101
+MUX3.INSYNC[2:0] = 3'b100
+CLKDIV[2:0] = 3'b010"""
+
+
+class FasmReader(unittest.TestCase):
+    def test_parse_lines(self) -> None:
+        fasm = FASM(SAMPLE.splitlines())
+        ble = fasm.LUTS[BLEXY.BLE_0_X1Y2]
+        self.assertEqual(ble.FLOPSEL, FLOPSEL.ENABLE)
+        # last line of a file without a trailing newline must keep all 16 bits
+        self.assertEqual(ble.LUT_CONFIG, "1110101111110100")
+        self.assertEqual(ble.LUT_I_A, LUT_IN_A.CLB_BLE_1)
+        self.assertEqual(ble.LUT_I_B, LUT_IN_B.IN4)
+        self.assertEqual(fasm.MUXS[3].CLBIN, CLBIN.HFINTOSC)
+        self.assertEqual(fasm.MUXS[3].INSYNC, CLBInputSync.SYNC)
+        self.assertEqual(fasm.CLKDIV, CLKDIV.DIV_BY_4)
+
+    def test_records(self) -> None:
+        records = list(iter_fasm_lines(SAMPLE.splitlines()))
+        self.assertEqual(records[0].lineno, 3)
+        self.assertEqual(records[0].kind, "BLE_X")
+        self.assertEqual(records[-1].kind, "CLKDIV")
+
+    def test_error_has_line_number(self) -> None:
+        with self.assertRaises(FASMParseError) as ctx:
+            FASM(SAMPLE.splitlines() + ["MUX1.CLBIN[5:0] = 6'b2"])
+        self.assertEqual(ctx.exception.lineno, 10)
+        self.assertIn(":10:", str(ctx.exception))
+
+    def test_unhandled_line_warns(self) -> None:
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            FASM(["SOMETHING_ELSE.X", "BLE_X1Y2.BLE0.BOGUS"])
+        self.assertEqual(
+            [str(w.message).split(":")[1] for w in caught if w.category is FASMWarning],
+            ["1", "2"],
+        )
+
+
+class FasmWriter(unittest.TestCase):
+    def test_fasm_round_trip(self) -> None:
+        fasm = FASM(SAMPLE.splitlines())
+        text = fasm.to_fasm()
+        self.assertEqual(text.splitlines(), sorted(text.splitlines()))
+        self.assertEqual(FASM(text.splitlines()).to_fasm(), text)
+
+    @settings(max_examples=200, deadline=None)
+    @given(bs=bitstreams())
+    def test_bitstream_round_trip(self, bs) -> None:
+        fasm = FASM(bs.to_fasm().splitlines())
+        self.assertEqual(dict(bs.LUTS), dict(fasm.LUTS))
+        self.assertEqual(dict(bs.MUXS), dict(fasm.MUXS))
+        self.assertEqual(bs.PPS_OUT, fasm.PPS_OUT)
+        self.assertEqual(bs.IRQ_OUT, fasm.IRQ_OUT)
+        self.assertEqual(bs.COUNTER, fasm.COUNTER)
+        self.assertEqual(bs.CLKDIV, fasm.CLKDIV)